@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ClaimsUser
+from .tokens import FLAGS_CLAIM, SELECTION_CLAIM, VERSION_CLAIM, current_profile_version, publish_profile_version
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that builds the user from the profile claims of the
+    access token instead of loading it, while the claims are current (see
+    accounts.tokens).  Tokens without claims, or issued against an older
+    profile version, load the user and its profile in one query.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        version = validated_token.get(VERSION_CLAIM)
+        if version is not None and version == current_profile_version(user_id):
+            return ClaimsUser.from_claims(
+                user_id, validated_token.get(FLAGS_CLAIM, 0), validated_token.get(SELECTION_CLAIM), version
+            )
+
+        user = User.objects.select_related('profile').filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        profile = getattr(user, 'profile', None)
+        if profile is not None:
+            # Repair a published version that does not match the database
+            publish_profile_version(user.id, profile.version)
+        return user
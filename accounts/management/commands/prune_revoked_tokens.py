@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from accounts.revocation import prune
+
+
+class Command(BaseCommand):
+    help = 'Delete revoked refresh tokens that have expired; run it on a schedule, e.g. daily'
+
+    def handle(self, *args, **options):
+        deleted = prune()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} expired revoked tokens'))
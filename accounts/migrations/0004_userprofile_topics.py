@@ -0,0 +1,38 @@
+# Generated by Django 5.0.2 on 2026-10-17 01:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_userprofile_exam_year_userprofile_school_name'),
+        ('quiz', '0010_rename_total_questions_quiz_num_of_questions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='selected_topic_ids',
+            field=models.JSONField(blank=True, default=list, help_text='Cached ids of the selected topics, kept in sync with topics'),
+        ),
+        migrations.CreateModel(
+            name='UserTopic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_topics', to='accounts.userprofile')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_topics', to='quiz.topic')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='topics',
+            field=models.ManyToManyField(blank=True, related_name='selected_by', through='accounts.UserTopic', to='quiz.topic'),
+        ),
+        migrations.AddConstraint(
+            model_name='usertopic',
+            constraint=models.UniqueConstraint(fields=('profile', 'topic'), name='unique_user_topic'),
+        ),
+    ]
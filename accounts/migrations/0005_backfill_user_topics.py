@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.models import Q
+
+
+def backfill_user_topics(apps, schema_editor):
+    """
+    Resolve the JSON topic selection of existing profiles into topic ids.
+    Names that no longer match a topic are dropped.
+    """
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    UserTopic = apps.get_model('accounts', 'UserTopic')
+    Topic = apps.get_model('quiz', 'Topic')
+
+    for profile in UserProfile.objects.exclude(selected_topics={}).iterator():
+        selected_topics = profile.selected_topics
+        if not isinstance(selected_topics, dict):
+            continue
+
+        topic_filter = Q()
+        for subject_name, topic_names in selected_topics.items():
+            if isinstance(topic_names, list):
+                topic_filter |= Q(subject__name=subject_name) & Q(name__in=topic_names)
+        if not topic_filter:
+            continue
+
+        topic_ids = sorted(set(Topic.objects.filter(topic_filter).values_list('id', flat=True)))
+        UserTopic.objects.bulk_create(
+            [UserTopic(profile=profile, topic_id=topic_id) for topic_id in topic_ids],
+            ignore_conflicts=True
+        )
+        profile.selected_topic_ids = topic_ids
+        profile.save(update_fields=['selected_topic_ids'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_userprofile_topics'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_topics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.2 on 2026-10-17 02:27
+
+import django.contrib.auth.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_backfill_user_topics'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimsUser',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('auth.user',),
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Bumped on every save, see accounts.tokens'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.db import transaction
+from django.utils.functional import cached_property
+from .tokens import cached_selection, forget_profile_version, publish_profile_version, remember_selection, STAFF, SUPERUSER, TOPICS_SELECTED
 
 # Create your models here.
 
@@ -10,14 +12,131 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     is_user_topics_selected = models.BooleanField(default=False)
     selected_topics = models.JSONField(default=dict, blank=True, help_text="Dictionary of selected subjects and their topics")
+    topics = models.ManyToManyField('quiz.Topic', through='UserTopic', related_name='selected_by', blank=True)
+    selected_topic_ids = models.JSONField(default=list, blank=True, help_text="Cached ids of the selected topics, kept in sync with topics")
     school_name = models.CharField(max_length=255, blank=True, null=True)
     exam_year = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=0, editable=False, help_text="Bumped on every save, see accounts.tokens")
 
     def __str__(self):
         return f"{self.user.username}'s profile"
 
+    def save(self, *args, **kwargs):
+        """
+        Save and bump the version, so tokens carrying the old profile claims
+        are no longer trusted.
+        """
+        if not self._state.adding:
+            self.version = models.F('version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
+        if not isinstance(self.version, int):
+            self.refresh_from_db(fields=['version'])
+        publish_profile_version(self.user_id, self.version)
+
+    def set_selected_topics(self, selected_topics, topic_ids):
+        """
+        Replace the user's topic selection with already validated topic ids.
+        """
+        topic_ids = sorted(set(topic_ids))
+        with transaction.atomic():
+            self.user_topics.exclude(topic_id__in=topic_ids).delete()
+            UserTopic.objects.bulk_create(
+                [UserTopic(profile=self, topic_id=topic_id) for topic_id in topic_ids],
+                ignore_conflicts=True
+            )
+            self.selected_topics = selected_topics
+            self.selected_topic_ids = topic_ids
+            self.is_user_topics_selected = True
+            self.save()
+
+class UserTopic(models.Model):
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='user_topics')
+    topic = models.ForeignKey('quiz.Topic', on_delete=models.CASCADE, related_name='user_topics')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'topic'], name='unique_user_topic'),
+        ]
+
+    def __str__(self):
+        return f"{self.profile.user.username} - {self.topic.name}"
+
+class RevokedToken(models.Model):
+    """
+    Append-only list of revoked refresh tokens, read by accounts.revocation.
+    Rows are only needed until the token expires; prune_revoked_tokens
+    deletes them after that.
+    """
+    jti = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+class ProfileSnapshot:
+    """
+    Read-only profile of a ``ClaimsUser``: the flags and version come from the
+    token, the topic selection from the cache (or, once, the database).
+    """
+
+    def __init__(self, user_id, flags, digest, version):
+        self.user_id = user_id
+        self.is_user_topics_selected = bool(flags & TOPICS_SELECTED)
+        self.digest = digest
+        self.version = version
+
+    @cached_property
+    def selection(self):
+        selection = cached_selection(self.digest)
+        if selection is None:
+            selection = UserProfile.objects.filter(user_id=self.user_id).values_list(
+                'selected_topics', 'selected_topic_ids'
+            ).first() or ({}, [])
+            remember_selection(*selection)
+        return selection
+
+    @property
+    def selected_topics(self):
+        return self.selection[0]
+
+    @property
+    def selected_topic_ids(self):
+        return self.selection[1]
+
+class ClaimsUser(User):
+    """
+    A user built from the claims of an access token, without a query.  Fields
+    not in the claims are deferred and load on first access, the profile is a
+    ``ProfileSnapshot`` and it cannot be saved.
+    """
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, user_id, flags, digest, version, using='default'):
+        user = cls.from_db(
+            using, ['id', 'is_active', 'is_staff', 'is_superuser'],
+            [user_id, True, bool(flags & STAFF), bool(flags & SUPERUSER)]
+        )
+        user._profile_snapshot = ProfileSnapshot(user_id, flags, digest, version)
+        return user
+
+    @property
+    def profile(self):
+        return self._profile_snapshot
+
+    def save(self, *args, **kwargs):
+        raise NotImplementedError("Claims users are read-only; load the User to change it")
+
+    def delete(self, *args, **kwargs):
+        raise NotImplementedError("Claims users are read-only; load the User to change it")
+
 @receiver(post_save, sender=User)
 def create_or_update_user_profile(sender, instance, created, **kwargs):
     """
@@ -34,3 +153,8 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     instance.profile.save()
+
+@receiver(post_delete, sender=UserProfile)
+def forget_deleted_profile(sender, instance, **kwargs):
+    # Tokens of a deleted user fall back to the database lookup, which fails
+    forget_profile_version(instance.user_id)
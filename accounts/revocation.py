@@ -0,0 +1,173 @@
+"""
+Revoked refresh tokens.
+
+Rotation (``ROTATE_REFRESH_TOKENS`` with ``BLACKLIST_AFTER_ROTATION``) revokes
+the refresh token it was given, so every refresh checks its token against all
+revoked ones.  The ids (``jti``) of revoked tokens are appended to the
+``RevokedToken`` table.  Every process keeps a Bloom filter over them, topped
+up from the table by id at most every ``ACCOUNTS_REVOCATION_SYNC_INTERVAL``
+seconds and rebuilt when ``prune_revoked_tokens`` deletes expired rows.
+
+A check hashes the jti against the filter, a few microseconds however many
+tokens were revoked.  Only a hit, a revoked token or a rare false positive, is
+confirmed in the database.  A token revoked by another process since the last
+sync passes the filter, but revoking it again fails on the unique jti, so a
+refresh token is still only accepted once however refreshes race.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from quiz.versions import bump_version, get_version
+
+# Bumped when rows are deleted, which a Bloom filter cannot forget
+REVOCATION_VERSION = 'revoked-tokens'
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class BloomFilter:
+    """
+    Set membership with no false negatives and about ``error_rate`` false
+    positives while it holds at most ``capacity`` keys.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _hash(self, key):
+        # Double hashing: the k positions are first + i * step of one digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def add(self, key):
+        first, step = self._hash(key)
+        bits, size = self.bits, self.size
+        for number in range(self.hashes):
+            position = (first + number * step) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        first, step = self._hash(key)
+        bits, size = self.bits, self.size
+        for number in range(self.hashes):
+            position = (first + number * step) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def full(self):
+        return self.count > self.capacity
+
+
+class RevocationStore:
+    """
+    This process's view of the revoked tokens: a Bloom filter over the
+    ``RevokedToken`` rows up to ``last_id``.
+    """
+
+    def __init__(self, capacity=None, error_rate=None, sync_interval=None):
+        self.capacity = capacity or getattr(settings, 'ACCOUNTS_REVOCATION_CAPACITY', 1000000)
+        self.error_rate = error_rate or getattr(settings, 'ACCOUNTS_REVOCATION_ERROR_RATE', 0.001)
+        if sync_interval is None:
+            sync_interval = getattr(settings, 'ACCOUNTS_REVOCATION_SYNC_INTERVAL', 1.0)
+        self.sync_interval = sync_interval
+        self.filter = None
+        self.version = None
+        self.last_id = 0
+        self.synced_at = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Rebuild the filter from every row, growing it past the rows there are."""
+        from .models import RevokedToken
+
+        self.version = get_version(REVOCATION_VERSION)
+        rows = RevokedToken.objects.count()
+        bloom = BloomFilter(max(self.capacity, rows * 2), self.error_rate)
+        last_id = 0
+        for row_id, jti in RevokedToken.objects.order_by('id').values_list('id', 'jti').iterator(chunk_size=10000):
+            bloom.add(jti)
+            last_id = row_id
+        self.filter, self.last_id = bloom, last_id
+
+    def sync(self, force=False):
+        """
+        Add the rows appended by any process since the last sync, at most
+        once per sync interval unless ``force``.
+        """
+        from .models import RevokedToken
+
+        now = time.monotonic()
+        if not force and self.synced_at is not None and now - self.synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if self.filter is None or self.version != get_version(REVOCATION_VERSION):
+                self.load()
+            else:
+                rows = RevokedToken.objects.filter(id__gt=self.last_id).order_by('id').values_list('id', 'jti')
+                for row_id, jti in rows.iterator(chunk_size=10000):
+                    self.filter.add(jti)
+                    self.last_id = row_id
+                if self.filter.full:
+                    self.load()
+            self.synced_at = now
+
+    def is_revoked(self, jti):
+        from .models import RevokedToken
+
+        self.sync()
+        if jti not in self.filter:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, jti, expires_at):
+        """
+        Revoke ``jti`` until ``expires_at``.  False if it was already revoked,
+        by this or any other process.
+        """
+        from .models import RevokedToken
+
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        self.sync()
+        self.filter.add(jti)
+        return True
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RevocationStore()
+    return _store
+
+
+def prune(now=None):
+    """
+    Delete the rows of tokens that have expired, which are rejected on
+    their expiry anyway, and have every process rebuild its filter.
+    Returns the number of rows deleted.
+    """
+    from .models import RevokedToken
+
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    if deleted:
+        bump_version(REVOCATION_VERSION)
+    return deleted
@@ -2,7 +2,11 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from rest_framework.validators import UniqueValidator
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from django.db.models import Q
 from .models import UserProfile
+from .tokens import ProfileRefreshToken
+from quiz.models import Topic
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -71,4 +75,44 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField(required=True)
-    password = serializers.CharField(required=True, write_only=True) 
\ No newline at end of file
+    password = serializers.CharField(required=True, write_only=True) 
+
+class UserTopicsSerializer(serializers.Serializer):
+    selected_topics = serializers.DictField(
+        child=serializers.ListField(child=serializers.CharField()),
+        required=False,
+        default=dict
+    )
+
+    def validate(self, attrs):
+        """
+        Resolve the subject name -> topic names selection to topic ids,
+        rejecting names that do not match an existing topic.
+        """
+        selected_topics = attrs['selected_topics']
+        topic_filter = Q()
+        for subject_name, topic_names in selected_topics.items():
+            topic_filter |= Q(subject__name=subject_name) & Q(name__in=topic_names)
+
+        found = {}
+        if topic_filter:
+            for topic_id, name, subject_name in Topic.objects.filter(topic_filter).values_list('id', 'name', 'subject__name'):
+                found[(subject_name, name)] = topic_id
+
+        unknown = [
+            f"{subject_name}: {topic_name}"
+            for subject_name, topic_names in selected_topics.items()
+            for topic_name in topic_names
+            if (subject_name, topic_name) not in found
+        ]
+        if unknown:
+            raise serializers.ValidationError({"selected_topics": f"Unknown topics: {', '.join(unknown)}"})
+
+        attrs['topic_ids'] = list(found.values())
+        return attrs
+
+class ProfileTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh whose new access token carries the current profile claims
+    """
+    token_class = ProfileRefreshToken
@@ -1,3 +1,173 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from quiz.models import Subject, Topic, Quiz
+from . import revocation
+from .models import ClaimsUser, RevokedToken, UserTopic
+from .revocation import BloomFilter, RevocationStore
+from .tokens import ProfileRefreshToken
 
-# Create your tests here.
+
+class UserTopicsViewTest(TestCase):
+    def setUp(self):
+        maths = Subject.objects.create(name='Mathematics')
+        self.algebra = Topic.objects.create(name='Algebra', subject=maths)
+        self.geometry = Topic.objects.create(name='Geometry', subject=maths)
+        self.user = User.objects.create_user(username='student', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_post_stores_topic_ids(self):
+        selection = {'Mathematics': ['Algebra', 'Geometry']}
+        response = self.client.post('/api/auth/topics/', {'selected_topics': selection}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.selected_topic_ids, sorted([self.algebra.id, self.geometry.id]))
+        self.assertEqual(UserTopic.objects.filter(profile=self.user.profile).count(), 2)
+
+        response = self.client.get('/api/auth/topics/')
+        self.assertEqual(response.data, {'selected_topics': selection, 'is_user_topics_selected': True})
+
+    def test_reselecting_replaces_topics(self):
+        self.client.post('/api/auth/topics/', {'selected_topics': {'Mathematics': ['Algebra', 'Geometry']}}, format='json')
+        self.client.post('/api/auth/topics/', {'selected_topics': {'Mathematics': ['Geometry']}}, format='json')
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.selected_topic_ids, [self.geometry.id])
+        self.assertEqual(list(self.user.profile.topics.all()), [self.geometry])
+
+    def test_unknown_topic_is_rejected(self):
+        response = self.client.post('/api/auth/topics/', {'selected_topics': {'Mathematics': ['Calculus']}}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Mathematics: Calculus', str(response.data['selected_topics']))
+        self.user.profile.refresh_from_db()
+        self.assertFalse(self.user.profile.is_user_topics_selected)
+
+
+class ClaimsAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        maths = Subject.objects.create(name='Mathematics')
+        self.algebra = Topic.objects.create(name='Algebra', subject=maths)
+        Quiz.objects.create(title='Algebra', topic=self.algebra, class_level='Grade 10', difficulty='Easy')
+        self.user = User.objects.create_user(username='student', password='pass12345')
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/auth/login/', {'username': 'student', 'password': 'pass12345'}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        return response.data
+
+    def select_algebra(self):
+        response = self.client.post('/api/auth/topics/', {'selected_topics': {'Mathematics': ['Algebra']}}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_current_tokens_need_no_auth_queries(self):
+        self.login()
+        access = self.select_algebra()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/topics/')
+        self.assertEqual(response.data, {'selected_topics': {'Mathematics': ['Algebra']}, 'is_user_topics_selected': True})
+
+        self.client.get('/api/quizzes/random_mixed_quizzes/')
+        # Only the sampled quizzes are read
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/quizzes/random_mixed_quizzes/')
+        self.assertEqual(response.data['fetched_count'], 1)
+
+    def test_stale_tokens_reload_the_profile(self):
+        self.login()
+        self.select_algebra()
+        # Still the token from before the selection, so the claims are stale
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/auth/topics/')
+        self.assertEqual(response.data['selected_topics'], {'Mathematics': ['Algebra']})
+
+    def test_deactivated_user_is_rejected(self):
+        self.login()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/topics/').status_code, 401)
+
+    def test_refresh_carries_current_claims(self):
+        tokens = self.login()
+        self.select_algebra()
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        with self.assertNumQueries(0):
+            self.assertTrue(self.client.get('/api/auth/topics/').data['is_user_topics_selected'])
+
+    def test_profile_versions_are_kept_apart_from_the_stamps(self):
+        stamp_key = f'version:profile:{self.user.id}'
+        caches['versions'].delete(stamp_key)
+        self.login()
+        self.user.profile.refresh_from_db()
+        self.assertEqual(caches['profile_versions'].get(f'profile-version:{self.user.id}'), self.user.profile.version)
+        self.assertIsNone(caches['versions'].get(stamp_key))
+
+    def test_claims_user_is_read_only(self):
+        token = ProfileRefreshToken.for_user(self.user).access_token
+        user = ClaimsUser.from_claims(self.user.id, token['pf'], token['sel'], token['pv'])
+        self.assertEqual(user.username, 'student')
+        self.assertFalse(user.is_staff)
+        with self.assertRaises(NotImplementedError):
+            user.save()
+
+
+class RevocationTest(TestCase):
+    def setUp(self):
+        # Start from an empty filter, as the test database is
+        revocation._store = None
+        User.objects.create_user(username='student', password='pass12345')
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': token}, format='json')
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000, 0.01)
+        for number in range(1000):
+            bloom.add(f'jti-{number}')
+        self.assertTrue(all(f'jti-{number}' in bloom for number in range(1000)))
+        false_positives = sum(f'other-{number}' in bloom for number in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_rotation_revokes_the_old_refresh_token(self):
+        login = self.client.post('/api/auth/login/', {'username': 'student', 'password': 'pass12345'}, format='json')
+        rotated = self.refresh(login.data['refresh'])
+        self.assertEqual(rotated.status_code, 200)
+        self.assertNotEqual(rotated.data['refresh'], login.data['refresh'])
+
+        self.assertEqual(self.refresh(login.data['refresh']).status_code, 401)
+        self.assertEqual(self.refresh(rotated.data['refresh']).status_code, 200)
+        self.assertEqual(RevokedToken.objects.count(), 2)
+
+    def test_processes_see_each_others_revocations(self):
+        expires_at = timezone.now() + timedelta(days=1)
+        first, second = RevocationStore(1000, sync_interval=0), RevocationStore(1000, sync_interval=0)
+        self.assertFalse(second.is_revoked('abc'))
+        self.assertTrue(first.revoke('abc', expires_at))
+        self.assertTrue(second.is_revoked('abc'))
+        self.assertFalse(second.revoke('abc', expires_at))
+
+    def test_prune_forgets_expired_tokens(self):
+        store = RevocationStore(1000, sync_interval=0)
+        store.revoke('expired', timezone.now() - timedelta(seconds=1))
+        store.revoke('live', timezone.now() + timedelta(days=1))
+
+        output = StringIO()
+        call_command('prune_revoked_tokens', stdout=output)
+        self.assertIn('Pruned 1 expired revoked tokens', output.getvalue())
+        self.assertFalse(store.is_revoked('expired'))
+        self.assertTrue(store.is_revoked('live'))
+        self.assertNotIn('expired', store.filter)
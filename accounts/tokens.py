@@ -0,0 +1,155 @@
+"""
+Profile claims carried by the JWTs.
+
+Tokens carry what the API reads about a user on every request: the user id,
+the profile flags, a digest of the topic selection and the version of the
+profile they were issued against.  While that version is current,
+``ClaimsJWTAuthentication`` builds the user from the claims without a query.
+
+``UserProfile.save()`` bumps the version (saving a user saves its profile
+too) and publishes it in the ``ACCOUNTS_PROFILE_VERSION_CACHE`` cache, a
+file based cache shared by every worker on the host, so every worker sees
+the bump.  It is kept apart from the ``versions`` cache, where culling the
+per-user entries would also drop the global stamps; a culled profile version
+is read again from the database.  The selection itself is cached under its
+digest, which never goes stale.
+"""
+import hashlib
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+VERSION_CLAIM = 'pv'
+FLAGS_CLAIM = 'pf'
+SELECTION_CLAIM = 'sel'
+
+# Bits of the flags claim
+TOPICS_SELECTED = 1
+STAFF = 2
+SUPERUSER = 4
+
+
+def selection_digest(selected_topics, topic_ids):
+    """Short digest of a topic selection, the topic ids and their names."""
+    payload = json.dumps([sorted(topic_ids), selected_topics], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _selection_key(digest):
+    return f'profile-selection:{digest}'
+
+
+def remember_selection(selected_topics, topic_ids):
+    """Cache a selection under its digest and return the digest."""
+    digest = selection_digest(selected_topics, topic_ids)
+    cache.set(_selection_key(digest), (selected_topics, topic_ids), None)
+    return digest
+
+
+def cached_selection(digest):
+    """``(selected_topics, topic ids)`` cached under ``digest``, or None."""
+    return cache.get(_selection_key(digest))
+
+
+def _versions():
+    return caches[getattr(settings, 'ACCOUNTS_PROFILE_VERSION_CACHE', 'profile_versions')]
+
+
+def _version_key(user_id):
+    return f'profile-version:{user_id}'
+
+
+def publish_profile_version(user_id, version):
+    _versions().set(_version_key(user_id), version, None)
+
+
+def forget_profile_version(user_id):
+    _versions().delete(_version_key(user_id))
+
+
+def current_profile_version(user_id):
+    """
+    Version of the profile of ``user_id``, from the profile versions cache or,
+    when it is not there, the database.  None if the user has no profile.
+    """
+    from .models import UserProfile
+
+    version = _versions().get(_version_key(user_id))
+    if version is None:
+        version = UserProfile.objects.filter(user_id=user_id).values_list('version', flat=True).first()
+        if version is not None:
+            publish_profile_version(user_id, version)
+    return version
+
+
+def profile_claims(user):
+    """The profile claims of ``user``, whose profile must be up to date."""
+    profile = user.profile
+    flags = (
+        (TOPICS_SELECTED if profile.is_user_topics_selected else 0)
+        | (STAFF if user.is_staff else 0)
+        | (SUPERUSER if user.is_superuser else 0)
+    )
+    return {
+        VERSION_CLAIM: profile.version,
+        FLAGS_CLAIM: flags,
+        SELECTION_CLAIM: remember_selection(profile.selected_topics, profile.selected_topic_ids),
+    }
+
+
+class ProfileRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the profile claims, which the access tokens made
+    from it copy.  Decoding one re-reads the claims, so a refresh never hands
+    out an access token that is already stale.
+
+    Revocation goes through accounts.revocation instead of simplejwt's
+    blacklist app: ``blacklist()`` revokes the token, and a revoked token
+    no longer verifies.
+    """
+
+    def __init__(self, token=None, verify=True):
+        super().__init__(token, verify)
+        if token is not None:
+            self.restamp()
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.payload.update(profile_claims(user))
+        return token
+
+    def verify(self):
+        from .revocation import get_store
+
+        super().verify()
+        if get_store().is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        """Revoke this token; it fails if the token was already revoked."""
+        from .revocation import get_store
+
+        if not get_store().revoke(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload['exp'])):
+            raise TokenError(_("Token is blacklisted"))
+
+    def outstand(self):
+        # Rotation records the new token in simplejwt's blacklist app, which is optional
+        if apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+            return super().outstand()
+        return None
+
+    def restamp(self):
+        from django.contrib.auth.models import User
+
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.select_related('profile').filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is not None and getattr(user, 'profile', None) is not None:
+            self.payload.update(profile_claims(user))
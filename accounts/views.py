@@ -2,12 +2,12 @@ from django.shortcuts import render
 from rest_framework import generics, status
 from rest_framework.response import Response
 from django.contrib.auth import authenticate
-from .serializers import RegisterSerializer, LoginSerializer, UserSerializer
+from .serializers import RegisterSerializer, LoginSerializer, UserSerializer, UserTopicsSerializer
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from .models import UserProfile
+from .tokens import ProfileRefreshToken
 from quiz.models import Subject, Topic
 
 # Create your views here.
@@ -21,7 +21,7 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
         
-        refresh = RefreshToken.for_user(user)
+        refresh = ProfileRefreshToken.for_user(user)
         user_serializer = UserSerializer(user)
         return Response({
             "user": user_serializer.data,
@@ -46,7 +46,7 @@ class LoginView(generics.GenericAPIView):
         )
         
         if user:
-            refresh = RefreshToken.for_user(user)
+            refresh = ProfileRefreshToken.for_user(user)
             user_serializer = UserSerializer(user)
             return Response({
                 "refresh": str(refresh),
@@ -63,22 +63,26 @@ class UserTopicsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        # Validate the selection and resolve it to topic ids
+        serializer = UserTopicsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
         try:
-            # Get the user's profile
-            profile = request.user.profile
-            
-            # Get the selected topics data
-            selected_topics_data = request.data.get('selected_topics', {})
+            # request.user may be built from the token; writes need the rows
+            profile = UserProfile.objects.select_related('user').get(user_id=request.user.id)
             
-            # Store the data directly since it's already in the correct format
-            profile.selected_topics = selected_topics_data
-            profile.is_user_topics_selected = True
-            profile.save()
+            # Store the ids for the feeds and the selection for display
+            profile.set_selected_topics(
+                serializer.validated_data['selected_topics'],
+                serializer.validated_data['topic_ids']
+            )
 
             return Response({
                 "message": "Topics updated successfully",
                 "selected_topics": profile.selected_topics,
-                "is_user_topics_selected": profile.is_user_topics_selected
+                "is_user_topics_selected": profile.is_user_topics_selected,
+                # The old access token no longer matches the profile
+                "access": str(ProfileRefreshToken.for_user(profile.user).access_token)
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -60,10 +60,13 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'quiz.middleware.DeferredVersionsMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
 
+TEST_RUNNER = 'backend.test_runner.TestRunner'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -145,15 +148,48 @@ MEDIA_URL = '/media/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Small version stamps shared by every worker on the host, used to
+    # invalidate in-process caches (see quiz/versions.py)
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('VERSION_CACHE_DIR', default=str(BASE_DIR / '.cache' / 'versions')),
+        # A handful of global stamps; culling would invalidate them all at once
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Profile version of every active user, for the JWT claims check (see
+    # accounts/tokens.py).  Culled entries are read again from the database
+    'profile_versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('PROFILE_VERSION_CACHE_DIR', default=str(BASE_DIR / '.cache' / 'profile_versions')),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+QUIZ_VERSION_CACHE = 'versions'
+
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication that trusts the profile claims of current tokens instead of loading the user
+        'accounts.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        # Same output as JSONRenderer, rendered with orjson when it is installed
+        'quiz.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # JWT Settings
@@ -166,4 +202,63 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': 'your-secret-key-here',  # Change this to a secure secret key
     'AUTH_HEADER_TYPES': ('Bearer',),
-}
\ No newline at end of file
+    # Refreshed access tokens carry the current profile claims (see accounts.tokens)
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.ProfileTokenRefreshSerializer',
+}
+
+ACCOUNTS_PROFILE_VERSION_CACHE = 'profile_versions'  # Cache the profile versions are published in
+
+# Revoked refresh tokens (see accounts/revocation.py); prune them with manage.py prune_revoked_tokens
+ACCOUNTS_REVOCATION_CAPACITY = 1000000  # Revoked tokens the Bloom filter of each process is sized for before it grows
+ACCOUNTS_REVOCATION_ERROR_RATE = 0.001  # Share of live tokens that need a database check
+ACCOUNTS_REVOCATION_SYNC_INTERVAL = 1.0  # Seconds between reads of the tokens revoked by other processes
+
+# List endpoints
+QUIZ_PAGE_SIZE = 20  # Default page size of the keyset paginated quiz and question lists
+QUIZ_LIST_METADATA_TIMEOUT = 60  # Seconds the quiz list counts are cached
+QUIZ_STREAM_CHUNK_SIZE = 500  # Rows fetched at a time by streamed (NDJSON) question lists
+QUIZ_SEARCH_MAX_RESULTS = 100  # Results /api/search/ returns at most (?search= filters are not capped)
+
+# Quiz feed settings
+QUIZ_FEED_SIZE = 10  # Number of quizzes returned by the random feed endpoints
+QUIZ_FEED_WASSCE_RATIO = 0.6  # Share of WASSCE quizzes in the mixed feed
+
+# Question generation settings
+QUIZ_GENERATION_CONCURRENCY = 8  # Maximum OpenAI calls in flight per batch
+QUIZ_GENERATION_TIMEOUT = 30  # Per-call timeout in seconds
+QUIZ_GENERATION_QUESTIONS_PER_COMPLETION = 5  # Questions requested in one completion
+QUIZ_GENERATION_JOB_MAX_ATTEMPTS = 3  # Empty rounds before a generation job fails
+QUIZ_GENERATION_JOB_STALE_AFTER = 600  # Seconds before a running job with no progress is reclaimed
+QUIZ_IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # Seconds the response to a request with an Idempotency-Key is replayed to retries
+QUIZ_GENERATION_TRANSPORT = config('GENERATION_TRANSPORT', default='openai')  # openai, fake, record or replay
+QUIZ_GENERATION_CASSETTE_DIR = config('GENERATION_CASSETTE_DIR', default=str(BASE_DIR / 'cassettes'))  # Recorded completions
+QUIZ_GENERATION_FAKE = {  # Behaviour of the fake transport
+    'latency': config('GENERATION_FAKE_LATENCY', default=0.5, cast=float),
+    'jitter': config('GENERATION_FAKE_JITTER', default=0.5, cast=float),
+    'error_rate': config('GENERATION_FAKE_ERROR_RATE', default=0.0, cast=float),
+    'timeout_rate': config('GENERATION_FAKE_TIMEOUT_RATE', default=0.0, cast=float),
+    'invalid_rate': config('GENERATION_FAKE_INVALID_RATE', default=0.0, cast=float),
+    'seed': config('GENERATION_FAKE_SEED', default=0, cast=int),
+}
+
+# Cache of generated questions, pooled per subject, topic, difficulty and class level
+QUIZ_GENERATION_CACHE_POOL_SIZE = config('GENERATION_CACHE_POOL_SIZE', default=20, cast=int)  # Questions generated for a key before it serves hits (0 disables the cache)
+QUIZ_GENERATION_CACHE_TTL = 60 * 60 * 24  # Seconds a cached question stays valid
+QUIZ_GENERATION_CACHE_MAX_KEYS = 500  # Keys kept in memory per process
+# Kept in the user's cache directory rather than the source tree
+QUIZ_GENERATION_CACHE_PATH = config(
+    'GENERATION_CACHE_PATH',
+    default=str(Path(config('XDG_CACHE_HOME', default=str(Path.home() / '.cache'))) / 'quiz-backend' / 'generations.sqlite3')
+)
+
+# Rendered subject and topic responses, invalidated through the catalog version
+QUIZ_CATALOG_CACHE = 'default'
+QUIZ_CATALOG_CACHE_TIMEOUT = 60 * 60  # Seconds a rendered response is kept
+
+# Ready-question buffer behind generate_next_question
+QUIZ_BUFFER_LOW_WATER = 3  # Refill when fewer questions than this are buffered
+QUIZ_BUFFER_TARGET = 10  # Number of questions a refill tops the buffer up to
+
+# Duplicate detection for generated questions
+QUIZ_DEDUP_THRESHOLD = 0.7  # Estimated Jaccard similarity that counts as a near-duplicate
+QUIZ_DEDUP_MAX_TOPICS = 64  # Topic indexes kept in memory per process
@@ -0,0 +1,24 @@
+"""
+Test runner that keeps the test run away from the developer's cache files.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    ``DiscoverRunner`` that points the generation cache at a temporary file,
+    removed after the run.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(prefix='quiz-tests-')
+        settings.QUIZ_GENERATION_CACHE_PATH = os.path.join(self.cache_dir, 'generations.sqlite3')
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
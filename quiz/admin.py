@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Subject, Topic, Quiz, Question
+from .models import Subject, Topic, Quiz, Question, GenerationJob
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
@@ -23,3 +23,9 @@ class QuestionAdmin(admin.ModelAdmin):
     list_display = ['question_text', 'quiz', 'correct_answer', 'created_at']
     list_filter = ['quiz', 'created_at']
     search_fields = ['question_text']
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'quiz', 'kind', 'status', 'generated_count', 'num_questions', 'attempts', 'created_at']
+    list_filter = ['status', 'kind']
+    readonly_fields = ['question_ids', 'failures', 'worker', 'locked_at', 'finished_at']
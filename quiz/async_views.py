@@ -0,0 +1,48 @@
+"""
+Async API views.
+
+DRF dispatches synchronously, so a view waiting on the OpenAI API holds a
+worker thread for the whole call.  ``AsyncAPIView`` runs the authentication,
+permission and throttle checks on a thread, since they may query the
+database, and awaits the handler on the event loop.  Under ASGI a request
+waiting on an awaited completion then holds no thread, and one worker can
+keep hundreds of them in flight.
+
+Handlers are ``async def`` methods and use the async ORM (``aget``,
+``afirst``...) or ``sync_to_async`` for anything that queries.  Under WSGI,
+and in the test client, Django runs the view with ``async_to_sync``, so it
+still works there, one request per thread.
+"""
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    async def dispatch(self, request, *args, **kwargs):
+        """``APIView.dispatch`` with the checks on a thread and an awaited handler"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            # OPTIONS is answered by the sync handler of APIView
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
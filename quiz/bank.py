@@ -0,0 +1,282 @@
+"""
+Question bank import and export.
+
+Questions travel as flat rows (``FIELDS``) in JSON Lines or CSV, naming their
+subject, topic and quiz by natural key instead of by id, so a bank can be
+moved between databases.  A quiz is identified by its topic, difficulty and
+type, the same key ``generate_quizzes`` upserts on.
+
+Both directions stream: export reads questions with ``.iterator()`` and
+import validates and inserts one chunk of rows at a time, so memory stays
+constant whatever the size of the file.  Rows are deduplicated on
+``content_hash`` against the chunk and the database.
+"""
+import csv
+import json
+import os
+
+from django.db import transaction
+from rest_framework import serializers
+
+from .dedup import content_hash
+from .models import Question, Quiz, Subject, Topic
+
+FORMATS = ('jsonl', 'csv')
+
+FIELDS = [
+    'subject', 'topic', 'quiz', 'difficulty', 'class_level', 'is_wassce_related',
+    'question', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer', 'explanation', 'is_ai_generated',
+]
+
+# Class level of quizzes created by an import, as in generate_quizzes
+CLASS_LEVELS = {'Easy': 'Grade 10', 'Medium': 'Grade 11', 'Hard': 'Grade 12'}
+
+
+def guess_format(path, format=None):
+    """Return ``format``, or the format named by the extension of ``path``."""
+    if format:
+        return format
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension in ('jsonl', 'ndjson', 'json'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    raise ValueError(f'Cannot tell the format of {path}; pass --format')
+
+
+def question_row(question):
+    """
+    Return a question as an export row.  Expects ``quiz__topic__subject`` to
+    be selected with the question.
+    """
+    quiz = question.quiz
+    topic = quiz.topic
+    return {
+        'subject': topic.subject.name if topic else '',
+        'topic': topic.name if topic else '',
+        'quiz': quiz.title,
+        'difficulty': quiz.difficulty,
+        'class_level': quiz.class_level,
+        'is_wassce_related': quiz.is_wassce_related,
+        'question': question.question_text,
+        'option_a': question.option_a,
+        'option_b': question.option_b,
+        'option_c': question.option_c,
+        'option_d': question.option_d,
+        'correct_answer': question.correct_answer,
+        'explanation': question.explanation,
+        'is_ai_generated': question.is_ai_generated,
+    }
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    """Yield the questions of ``queryset`` as export rows, in id order."""
+    if queryset is None:
+        queryset = Question.objects.all()
+    questions = queryset.select_related('quiz__topic__subject').order_by('id')
+    for question in questions.iterator(chunk_size=chunk_size):
+        yield question_row(question)
+
+
+def write_rows(rows, stream, format):
+    """Write ``rows`` to ``stream`` and return how many were written."""
+    written = 0
+    if format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    else:
+        for row in rows:
+            stream.write(json.dumps(row, ensure_ascii=False))
+            stream.write('\n')
+            written += 1
+    return written
+
+
+def read_rows(stream, format):
+    """
+    Yield ``(line number, row)`` from ``stream``.  A JSON line that does not
+    parse is yielded as ``None`` so it is reported with the invalid rows.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+class QuestionRowSerializer(serializers.Serializer):
+    subject = serializers.CharField(max_length=100)
+    topic = serializers.CharField(max_length=100)
+    quiz = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    difficulty = serializers.ChoiceField(choices=Quiz.DIFFICULTY_CHOICES)
+    class_level = serializers.ChoiceField(choices=Quiz.CLASS_LEVEL_CHOICES, required=False, allow_blank=True)
+    is_wassce_related = serializers.BooleanField(default=True)
+    question = serializers.CharField()
+    option_a = serializers.CharField(max_length=500)
+    option_b = serializers.CharField(max_length=500)
+    option_c = serializers.CharField(max_length=500)
+    option_d = serializers.CharField(max_length=500)
+    correct_answer = serializers.ChoiceField(choices=['A', 'B', 'C', 'D'])
+    explanation = serializers.CharField(allow_blank=True, required=False, default='')
+    is_ai_generated = serializers.BooleanField(default=False)
+
+    def to_internal_value(self, data):
+        # CSV cells are strings, so an empty cell means the column was left out
+        data = {key: value for key, value in data.items() if value is not None and (value != '' or key == 'explanation')}
+        return super().to_internal_value(data)
+
+
+class QuestionImporter:
+    """
+    Validate rows and insert them in chunks of ``batch_size``, each chunk in
+    its own transaction.
+
+    Subjects, topics and quizzes are looked up by natural key and cached for
+    the run; missing ones are created unless ``create_missing`` is false, in
+    which case their rows are rejected.
+    """
+
+    def __init__(self, batch_size=500, create_missing=True, max_errors=20):
+        self.batch_size = batch_size
+        self.create_missing = create_missing
+        self.max_errors = max_errors
+        self.created = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self._subjects = {}
+        self._topics = {}
+        self._quizzes = {}
+
+    def import_rows(self, rows, progress=None):
+        """
+        Import ``(line number, row)`` pairs.  ``progress`` is called with the
+        importer after every chunk.
+        """
+        batch = []
+        for line_number, row in rows:
+            question = self.build_question(line_number, row)
+            if question is None:
+                continue
+            batch.append(question)
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+                if progress:
+                    progress(self)
+        if batch:
+            self.flush(batch)
+            if progress:
+                progress(self)
+        return self
+
+    def reject(self, line_number, reason):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(f'line {line_number}: {reason}')
+
+    def build_question(self, line_number, row):
+        if row is None:
+            self.reject(line_number, 'not a JSON object')
+            return None
+        serializer = QuestionRowSerializer(data=row)
+        if not serializer.is_valid():
+            reason = '; '.join(f'{field}: {" ".join(str(error) for error in errors)}' for field, errors in serializer.errors.items())
+            self.reject(line_number, reason)
+            return None
+        data = serializer.validated_data
+        quiz = self.resolve_quiz(data)
+        if quiz is None:
+            self.reject(line_number, f'unknown quiz {data["subject"]} / {data["topic"]} ({data["difficulty"]})')
+            return None
+        return Question(
+            quiz=quiz,
+            question_text=data['question'],
+            option_a=data['option_a'],
+            option_b=data['option_b'],
+            option_c=data['option_c'],
+            option_d=data['option_d'],
+            correct_answer=data['correct_answer'],
+            explanation=data['explanation'],
+            is_ai_generated=data['is_ai_generated'],
+            content_hash=content_hash(data['question'])
+        )
+
+    def resolve_subject(self, name):
+        if name not in self._subjects:
+            subject = Subject.objects.filter(name=name).order_by('id').first()
+            if subject is None and self.create_missing:
+                subject = Subject.objects.create(name=name)
+            self._subjects[name] = subject
+        return self._subjects[name]
+
+    def resolve_topic(self, subject_name, name):
+        key = (subject_name, name)
+        if key not in self._topics:
+            subject = self.resolve_subject(subject_name)
+            topic = None
+            if subject is not None:
+                topic = Topic.objects.filter(subject=subject, name=name).order_by('id').first()
+                if topic is None and self.create_missing:
+                    topic = Topic.objects.create(subject=subject, name=name)
+            self._topics[key] = topic
+        return self._topics[key]
+
+    def resolve_quiz(self, data):
+        key = (data['subject'], data['topic'], data['difficulty'], data['is_wassce_related'])
+        if key not in self._quizzes:
+            topic = self.resolve_topic(data['subject'], data['topic'])
+            quiz = None
+            if topic is not None:
+                lookup = {'topic': topic, 'difficulty': data['difficulty'], 'is_wassce_related': data['is_wassce_related']}
+                quiz = Quiz.objects.filter(**lookup).first()
+                if quiz is None and self.create_missing:
+                    quiz = Quiz.objects.create(
+                        title=data.get('quiz') or f'{data["subject"]}: {data["topic"]} ({data["difficulty"]})',
+                        class_level=data.get('class_level') or CLASS_LEVELS[data['difficulty']],
+                        **lookup
+                    )
+            self._quizzes[key] = quiz
+        return self._quizzes[key]
+
+    def flush(self, batch):
+        """Insert the questions of ``batch`` that are not already in their quiz."""
+        existing = set(
+            Question.objects.filter(
+                quiz_id__in={question.quiz_id for question in batch},
+                content_hash__in={question.content_hash for question in batch}
+            ).values_list('quiz_id', 'content_hash')
+        )
+        fresh = []
+        for question in batch:
+            key = (question.quiz_id, question.content_hash)
+            if key in existing:
+                self.duplicates += 1
+                continue
+            existing.add(key)
+            fresh.append(question)
+        if not fresh:
+            return
+        stored = Question.objects.filter(
+            quiz_id__in={question.quiz_id for question in fresh},
+            content_hash__in={question.content_hash for question in fresh}
+        )
+        with transaction.atomic():
+            # Another import may have inserted some of them since the lookup
+            # above, so conflicts are skipped and the chunk recounted
+            before = stored.count()
+            Question.objects.bulk_create(fresh, ignore_conflicts=True)
+            inserted = stored.count() - before
+        self.created += inserted
+        self.duplicates += len(fresh) - inserted
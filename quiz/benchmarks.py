@@ -0,0 +1,448 @@
+"""
+Micro-benchmarks for the hot API paths.
+
+Each endpoint is requested through the DRF test client as an authenticated
+student, so the numbers include routing, authentication, the queries and
+serialization but no network.  For every endpoint the runner reports the
+p50/p95/p99 latency, the number of queries per request and the memory
+allocated per request (peak, measured with tracemalloc on separate runs so
+tracing does not slow down the timed ones).
+
+Load data with ``manage.py seed_benchmark_data`` first, then run
+``manage.py run_benchmarks --output results.json``.
+
+``manage.py benchmark_serializers`` compares the DRF serializers and JSON
+renderer with the compiled fast paths on in-memory rows, no database needed.
+
+``manage.py benchmark_capacity`` measures how many live generations one
+server process keeps in flight.  It starts the project under gunicorn (sync
+WSGI workers with a thread per request) and under uvicorn (ASGI, where
+``generate_next_question`` is an async view), with the fake transport
+answering every completion after ``--latency`` seconds (5 by default, about
+what a real completion takes), and sends waves of concurrent
+``generate_next_question`` requests for a quiz with no buffered or stored
+questions, so every request waits on a completion.  For every concurrency
+level it reports the throughput, the latency percentiles,
+``completions_in_flight``, the completions the server was waiting on at once
+on average over the wave (throughput times the completion latency), and
+``requests_in_flight``, the requests it was serving at once (throughput times
+the mean request latency).  A gunicorn worker tops out at its thread count
+however many students wait; a uvicorn worker keeps climbing with the
+concurrency until the CPU time of the requests themselves saturates it.
+
+The same waves are sent to the sync ``questions`` endpoint of a quiz with
+stored questions, which waits on nothing but the database.  Under uvicorn a
+sync view runs on a thread through ``sync_to_async``, so this shows what the
+views that stayed sync cost when the project is served by uvicorn, next to
+the same view under gunicorn.  The load is generated from the same host, so
+give it a CPU of its own for numbers that measure the server alone.
+
+Run it against a file or server database the server processes can share
+(e.g. the one ``seed_benchmark_data`` filled)::
+
+    manage.py benchmark_capacity --concurrency 10 50 100 200 --output capacity.json
+    manage.py benchmark_capacity --server uvicorn --endpoint questions
+"""
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+from django.conf import settings
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.tokens import ProfileRefreshToken
+
+from . import renderers
+from .fast_serializers import question_serializer, quiz_serializer
+from .models import Question, Quiz, Subject, Topic
+from .renderers import FastJSONRenderer
+from .serializers import QuestionSerializer, QuizSerializer
+
+
+class Endpoint:
+    """
+    A benchmarked request.  ``path`` is a string, or a callable taking a
+    random.Random that returns one (e.g. to pick a random quiz).
+    """
+
+    def __init__(self, name, path, method='get', data=None):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.data = data
+
+    def request(self, client, rng):
+        path = self.path(rng) if callable(self.path) else self.path
+        if self.method == 'get':
+            return client.get(path)
+        return getattr(client, self.method)(path, self.data, format='json')
+
+
+def random_quiz_path(suffix):
+    quiz_ids = []
+
+    def path(rng):
+        if not quiz_ids:
+            quiz_ids.extend(Quiz.objects.order_by().values_list('id', flat=True))
+        return f'/api/quizzes/{rng.choice(quiz_ids)}/{suffix}'
+    return path
+
+
+def default_endpoints():
+    return [
+        Endpoint('random_mixed_quizzes', '/api/quizzes/random_mixed_quizzes/'),
+        Endpoint('quiz_list', '/api/quizzes/'),
+        Endpoint('topics_by_subject', '/api/topics/by_subject/'),
+        Endpoint('quiz_question', random_quiz_path('question/?count=10')),
+    ]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def benchmark_endpoint(client, endpoint, iterations=50, warmup=5, memory_iterations=5, seed=0):
+    """
+    Request ``endpoint`` repeatedly and return its latency, query and
+    memory figures.
+    """
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        endpoint.request(client, rng)
+
+    timings, query_counts, status_codes = [], [], set()
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = endpoint.request(client, rng)
+            timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(queries))
+        status_codes.add(response.status_code)
+
+    peaks = []
+    for _ in range(memory_iterations):
+        tracemalloc.start()
+        try:
+            endpoint.request(client, rng)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'status_codes': sorted(status_codes),
+        'latency_ms': {
+            'p50': round(percentile(timings, 0.50), 3),
+            'p95': round(percentile(timings, 0.95), 3),
+            'p99': round(percentile(timings, 0.99), 3),
+            'mean': round(statistics.mean(timings), 3),
+            'max': round(max(timings), 3),
+        },
+        'queries': {
+            'median': statistics.median(query_counts),
+            'max': max(query_counts),
+        },
+        'peak_memory_kb': round(statistics.median(peaks) / 1024, 1) if peaks else None,
+        'response_bytes': len(response.content),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(user, endpoints=None, iterations=50, warmup=5, memory_iterations=5, seed=0, label=None):
+    """
+    Benchmark ``endpoints`` (default: ``default_endpoints()``) as ``user``
+    and return the results with enough context to compare runs.
+    """
+    client = APIClient()
+    client.force_authenticate(user)
+    endpoints = endpoints or default_endpoints()
+
+    return {
+        'label': label,
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'database': connection.vendor,
+        'dataset': {
+            'subjects': Subject.objects.count(),
+            'topics': Topic.objects.count(),
+            'quizzes': Quiz.objects.count(),
+            'questions': Question.objects.count(),
+        },
+        'settings': {'iterations': iterations, 'warmup': warmup, 'memory_iterations': memory_iterations, 'seed': seed},
+        'endpoints': {
+            endpoint.name: benchmark_endpoint(client, endpoint, iterations, warmup, memory_iterations, seed)
+            for endpoint in endpoints
+        },
+    }
+
+
+def benchmark_user(username=None):
+    """The seeded student to run the benchmarks as."""
+    if username:
+        return User.objects.get(username=username)
+    user = User.objects.filter(profile__is_user_topics_selected=True).order_by('id').first()
+    if user is None:
+        raise User.DoesNotExist('No student with a topic selection. Run seed_benchmark_data first.')
+    return user
+
+
+def sample_instances(count):
+    """
+    ``count`` unsaved quizzes and questions with every serialized field set,
+    for the serializer benchmark.
+    """
+    now = datetime.now(timezone.utc)
+    subject = Subject(id=1, name='Mathematics')
+    topic = Topic(id=1, name='Algebra', subject=subject)
+    quizzes, questions = [], []
+    for number in range(1, count + 1):
+        quiz = Quiz(
+            id=number, title=f'WASSCE Practice (Easy) - Mathematics: Algebra {number}', topic=topic,
+            class_level='Grade 10', difficulty='Easy', description='Foundational concepts and problem-solving. ' * 4,
+            num_of_questions=10, question_total=10, ai_question_total=4, created_at=now, updated_at=now
+        )
+        quizzes.append(quiz)
+        questions.append(Question(
+            id=number, quiz=quiz, question_text=f'Question {number}: what is the value of x when 2x + 3 = 7?',
+            option_a='1', option_b='2', option_c='3', option_d='4', correct_answer='B',
+            explanation='Subtract 3 from both sides and divide by 2.', is_ai_generated=True,
+            content_hash='0' * 40, created_at=now, updated_at=now
+        ))
+    return quizzes, questions
+
+
+def _median_ms(function, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def benchmark_serializers(sizes=(10, 100, 10000), iterations=20):
+    """
+    Time serializing and rendering lists of ``sizes`` quizzes and questions
+    with the DRF serializers and ``JSONRenderer`` against the fast
+    serializers and ``FastJSONRenderer``, and check they produce the same
+    bytes.
+    """
+    drf_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+    cases = [('quiz', QuizSerializer, quiz_serializer), ('question', QuestionSerializer, question_serializer)]
+    results = {name: {} for name, _, _ in cases}
+    for size in sizes:
+        quizzes, questions = sample_instances(size)
+        rows = {'quiz': quizzes, 'question': questions}
+        # Small lists are timed more often so every size runs for a similar time
+        repeats = max(3, iterations * 100 // size)
+        for name, serializer_class, fast_serializer in cases:
+            items = rows[name]
+            drf = lambda: drf_renderer.render(serializer_class(items, many=True).data)
+            fast = lambda: fast_renderer.render(fast_serializer.many(items))
+            drf_ms = _median_ms(drf, repeats)
+            fast_ms = _median_ms(fast, repeats)
+            results[name][size] = {
+                'drf_ms': round(drf_ms, 3),
+                'fast_ms': round(fast_ms, 3),
+                'serialize_only_drf_ms': round(_median_ms(lambda: serializer_class(items, many=True).data, repeats), 3),
+                'serialize_only_fast_ms': round(_median_ms(lambda: fast_serializer.many(items), repeats), 3),
+                'speedup': round(drf_ms / fast_ms, 1) if fast_ms else None,
+                'identical': drf() == fast(),
+            }
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'orjson': renderers.orjson is not None,
+        'results': results,
+    }
+
+
+SERVER_COMMANDS = {
+    'gunicorn': 'gunicorn backend.wsgi:application --bind 127.0.0.1:{port} --workers {workers} --threads {threads}',
+    'uvicorn': 'uvicorn backend.asgi:application --host 127.0.0.1 --port {port} --workers {workers} --log-level warning',
+}
+
+
+def start_server(server, port, env, workers=1, threads=8, timeout=30):
+    """Start ``server`` on ``port`` and wait until it answers."""
+    command = SERVER_COMMANDS[server].format(port=port, workers=workers, threads=threads).split()
+    process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{server} exited with status {process.returncode}')
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/api/', timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'{server} did not answer on port {port} within {timeout}s')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+# Endpoints benchmark_capacity loads, by name: the async view that waits on a
+# completion, and a sync view for comparison
+CAPACITY_ENDPOINTS = {
+    'generate_next_question': ('POST', '/api/quizzes/{quiz}/generate_next_question/'),
+    'questions': ('GET', '/api/quizzes/{quiz}/questions/'),
+}
+
+
+async def _load(method, url, token, concurrency, rounds, timeout):
+    """
+    ``concurrency`` clients each sending ``rounds`` requests to ``url`` one
+    after another.
+    """
+    latencies, status_codes = [], Counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {'Authorization': f'Bearer {token}'}
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=timeout) as client:
+        async def student():
+            for _ in range(rounds):
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, url, json={} if method == 'POST' else None)
+                except httpx.HTTPError as e:
+                    status_codes[type(e).__name__] += 1
+                    continue
+                status_codes[str(response.status_code)] += 1
+                if response.status_code == 200:
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(student() for _ in range(concurrency)))
+        return latencies, status_codes, time.perf_counter() - started
+
+
+def measure_capacity(url, token, concurrency, rounds=1, latency=5.0, timeout=600, method='POST'):
+    """
+    Throughput and latency of ``concurrency`` concurrent students.  ``latency``
+    is the completion latency of the endpoint, None if it waits on none.
+    """
+    latencies, status_codes, elapsed = asyncio.run(_load(method, url, token, concurrency, rounds, timeout))
+    throughput = len(latencies) / elapsed
+    return {
+        'concurrency': concurrency,
+        'requests': concurrency * rounds,
+        'status_codes': dict(sorted(status_codes.items())),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(throughput, 2),
+        'completions_in_flight': round(throughput * latency, 1) if latency else None,
+        'requests_in_flight': round(throughput * statistics.mean(latencies) / 1000, 1) if latencies else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 1),
+            'p95': round(percentile(latencies, 0.95), 1),
+            'p99': round(percentile(latencies, 0.99), 1),
+        } if latencies else None,
+    }
+
+
+def benchmark_capacity(user, servers=('gunicorn', 'uvicorn'), endpoints=tuple(CAPACITY_ENDPOINTS),
+                       concurrency=(10, 50, 100, 200), rounds=1, latency=5.0, workers=1, threads=8, port=8765,
+                       label=None, stored_questions=20):
+    """
+    Compare the requests to ``endpoints`` that ``servers`` keep in flight at
+    each level of ``concurrency``, as ``user``.  A quiz with no questions
+    (for generate_next_question) and one with ``stored_questions`` questions
+    are created for the run and deleted afterwards.
+    """
+    if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+        raise ValueError('The servers cannot share an in-memory database')
+
+    subject, _ = Subject.objects.get_or_create(name='Capacity Benchmark')
+    topic, _ = Topic.objects.get_or_create(subject=subject, name='Live Generation')
+    empty_quiz, _ = Quiz.objects.get_or_create(
+        topic=topic, difficulty='Easy', is_wassce_related=False,
+        defaults={'title': 'Capacity Benchmark', 'class_level': 'Grade 10'}
+    )
+    stocked_quiz, created = Quiz.objects.get_or_create(
+        topic=topic, difficulty='Medium', is_wassce_related=False,
+        defaults={'title': 'Capacity Benchmark (stored questions)', 'class_level': 'Grade 10'}
+    )
+    if created:
+        Question.objects.bulk_create([
+            Question.from_generated(stocked_quiz, {
+                'question': f'Capacity benchmark question {number}: which option is correct?',
+                'options': {letter: f'Option {letter} of question {number}' for letter in 'ABCD'},
+                'correct_answer': 'ABCD'[number % 4],
+                'explanation': f'Option {"ABCD"[number % 4]} is correct.'
+            })
+            for number in range(stored_questions)
+        ])
+    quizzes = {'generate_next_question': empty_quiz, 'questions': stocked_quiz}
+    token = str(ProfileRefreshToken.for_user(user).access_token)
+    env = dict(
+        os.environ,
+        GENERATION_TRANSPORT='fake',
+        GENERATION_FAKE_LATENCY=str(latency),
+        GENERATION_FAKE_JITTER='0',
+        GENERATION_FAKE_ERROR_RATE='0',
+        GENERATION_FAKE_TIMEOUT_RATE='0',
+        GENERATION_FAKE_INVALID_RATE='0',
+        # Every request has to wait on a completion, not on the cache
+        GENERATION_CACHE_POOL_SIZE='0',
+    )
+
+    results = {}
+    try:
+        for server in servers:
+            process = start_server(server, port, env, workers, threads)
+            try:
+                results[server] = {}
+                for endpoint in endpoints:
+                    method, path = CAPACITY_ENDPOINTS[endpoint]
+                    url = f'http://127.0.0.1:{port}{path.format(quiz=quizzes[endpoint].id)}'
+                    # Only generate_next_question waits on a completion
+                    endpoint_latency = latency if endpoint == 'generate_next_question' else None
+                    results[server][endpoint] = [
+                        measure_capacity(url, token, level, rounds, endpoint_latency, method=method)
+                        for level in concurrency
+                    ]
+            finally:
+                stop_server(process)
+    finally:
+        subject.delete()
+
+    return {
+        'label': label,
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'database': connection.vendor,
+        'settings': {
+            'rounds': rounds, 'latency': latency, 'workers': workers, 'threads': threads,
+            'stored_questions': stored_questions,
+        },
+        'servers': results,
+    }
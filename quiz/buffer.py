@@ -0,0 +1,123 @@
+"""
+Per-quiz buffer of ready, unserved questions behind generate_next_question.
+
+Serving a question pops it from the buffer (a primary key delete, so two
+requests can never get the same question).  Whenever the buffer drops below
+``QUIZ_BUFFER_LOW_WATER`` a ``fill_buffer`` generation job is queued to top it
+back up to ``QUIZ_BUFFER_TARGET``.  When the buffer is empty the endpoint falls
+back to a bank question the student has not seen yet.
+
+Every request is recorded as served from the ``buffer`` (a hit), from the
+``bank`` or ``generated`` live (both misses) in a ``BufferOutcome`` row, so
+the buffer can be sized from the hit rates of all workers.
+"""
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .jobs import coalesce_generation
+from .models import BufferedQuestion, BufferOutcome, GenerationJob
+
+OUTCOMES = tuple(outcome for outcome, _ in BufferOutcome.OUTCOME_CHOICES)
+
+
+def low_water():
+    return getattr(settings, 'QUIZ_BUFFER_LOW_WATER', 3)
+
+
+def target_size():
+    return getattr(settings, 'QUIZ_BUFFER_TARGET', 10)
+
+
+def pop_question(quiz, exclude=None, scan=10):
+    """
+    Remove and return the oldest buffered question of ``quiz``, or None if
+    the buffer is empty.  Questions that ``exclude`` (a NearDuplicateIndex,
+    e.g. of the student's previous questions) flags as duplicates are left
+    in the buffer for other students.
+    """
+    items = BufferedQuestion.objects.filter(quiz=quiz).order_by('id').values_list('id', 'payload')[:scan]
+    for buffered_id, payload in items:
+        if exclude is not None and exclude.is_duplicate(payload['question']):
+            continue
+        # Another request may have popped the same row in the meantime
+        deleted, _ = BufferedQuestion.objects.filter(pk=buffered_id).delete()
+        if deleted:
+            return payload
+    return None
+
+
+def buffer_depth(quiz):
+    return BufferedQuestion.objects.filter(quiz=quiz).count()
+
+
+def ensure_refill(quiz, depth=None):
+    """
+    Queue a refill job if the buffer is below the low-water mark and no
+    refill is already pending or running.  Returns the job, if one was queued.
+    """
+    depth = buffer_depth(quiz) if depth is None else depth
+    if depth >= low_water():
+        return None
+    refill_pending = GenerationJob.objects.filter(
+        quiz=quiz, kind='fill_buffer', status__in=['pending', 'running']
+    ).exists()
+    if refill_pending:
+        return None
+    # The job tops the buffer up to the target size as it stands when the job
+    # runs, since more questions may be served before a worker picks it up
+    job, created = coalesce_generation(quiz, target_size(), kind='fill_buffer', target_count=target_size())
+    return job if created else None
+
+
+def pick_bank_question(quiz, seen_texts=(), exclude=None, tries=5):
+    """
+    Return a random stored question of ``quiz`` whose text is not in
+    ``seen_texts`` and not flagged by ``exclude``, or None if the student has
+    seen them all.
+    """
+    question_ids = list(
+        quiz.questions.exclude(question_text__in=list(seen_texts)).order_by().values_list('id', flat=True)
+    )
+    random.shuffle(question_ids)
+    for question_id in question_ids[:tries]:
+        question_data = quiz.questions.get(pk=question_id).as_generated()
+        if exclude is None or not exclude.is_duplicate(question_data['question']):
+            return question_data
+    return None
+
+
+def record_outcome(quiz_id, outcome):
+    """
+    Count where a generate_next_question request for the quiz was served from.
+    """
+    counted = BufferOutcome.objects.filter(quiz_id=quiz_id, outcome=outcome).update(count=F('count') + 1)
+    if counted:
+        return
+    try:
+        with transaction.atomic():
+            BufferOutcome.objects.create(quiz_id=quiz_id, outcome=outcome, count=1)
+    except IntegrityError:
+        # Another request created the row in the meantime
+        BufferOutcome.objects.filter(quiz_id=quiz_id, outcome=outcome).update(count=F('count') + 1)
+
+
+def get_stats(quiz=None):
+    """
+    Return the buffer counters and hit rate, for one quiz or for all quizzes.
+    """
+    rows = BufferOutcome.objects.all() if quiz is None else BufferOutcome.objects.filter(quiz=quiz)
+    counts = dict(rows.order_by().values('outcome').annotate(total=Sum('count')).values_list('outcome', 'total'))
+    stats = {outcome: counts.get(outcome, 0) for outcome in OUTCOMES}
+    total = sum(stats.values())
+    stats.update({
+        'requests': total,
+        'hit_rate': round(stats['buffer'] / total, 3) if total else None,
+        'low_water': low_water(),
+        'target': target_size(),
+    })
+    if quiz is not None:
+        stats['depth'] = buffer_depth(quiz)
+    return stats
@@ -0,0 +1,72 @@
+"""
+Cache of rendered catalog responses (subjects and topics).
+
+The catalog changes rarely but is fetched on every app launch, so the
+rendered JSON of those endpoints is stored in the ``QUIZ_CATALOG_CACHE`` cache
+under a key that includes the ``catalog`` version stamp.  ``quiz.signals``
+bumps the stamp once a save or delete of a subject, topic or quiz commits.
+The stamp lives in the ``versions`` cache, a file based cache by default, so
+a change made through any worker on the same host makes every worker's cached
+responses there unreachable at once.  Workers on other hosts keep their own
+stamp, and with it their cached responses and ETags, so a deployment on
+several hosts must point the ``versions`` cache at a backend they share
+(Redis, Memcached, ...).  A hit is served without touching the database.
+
+Responses carry an ETag derived from the same stamp and URL, so clients that
+already have the current catalog get a 304 without a cache lookup.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .etags import etag_matches, make_etag, not_modified
+from .versions import get_version
+
+CATALOG_VERSION = 'catalog'
+
+
+def _cache():
+    return caches[getattr(settings, 'QUIZ_CATALOG_CACHE', 'default')]
+
+
+def cached_catalog_response(view, request, build, *args, **kwargs):
+    """
+    Return the rendered response of ``build(request, *args, **kwargs)`` for
+    this view action and URL from the cache, rendering and storing it first
+    on a miss, or 304 if the client's copy is current.  Only successful JSON
+    responses are cached.
+    """
+    version = get_version(CATALOG_VERSION)
+    path = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+    etag = make_etag(CATALOG_VERSION, version, view.basename, view.action, request.accepted_renderer.format, path)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    if request.accepted_renderer.format != 'json':
+        response = build(request, *args, **kwargs)
+    else:
+        response = _cached_response(view, request, build, f'catalog:{version}:{view.basename}:{view.action}:{path}',
+                                    *args, **kwargs)
+    if response.status_code == 200:
+        response['ETag'] = etag
+    return response
+
+
+def _cached_response(view, request, build, key, *args, **kwargs):
+    cache = _cache()
+    cached = cache.get(key)
+    if cached is not None:
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+
+    response = build(request, *args, **kwargs)
+    if response.status_code != 200:
+        return response
+    content = request.accepted_renderer.render(
+        response.data, request.accepted_media_type, view.get_renderer_context()
+    )
+    content_type = request.accepted_media_type
+    cache.set(key, (content, content_type), getattr(settings, 'QUIZ_CATALOG_CACHE_TIMEOUT', 60 * 60))
+    return HttpResponse(content, content_type=content_type)
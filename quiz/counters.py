@@ -0,0 +1,128 @@
+"""
+Denormalized counters.
+
+``Quiz.question_total`` / ``Quiz.ai_question_total`` count the questions of a
+quiz and ``Topic.quiz_count`` / ``Subject.quiz_count`` the quizzes of a topic
+or subject, so list endpoints can show real counts without a COUNT per row.
+
+The counters are adjusted with ``F()`` updates in the same transaction as the
+change, from ``Question.save``/``delete``, ``QuestionQuerySet.bulk_create``/
+``delete``, ``QuizQuerySet.bulk_create`` and the quiz signals.  Changes that
+bypass those paths (``QuerySet.update()``, raw SQL) can make them drift;
+``manage.py reconcile_counters`` recounts everything and fixes the drift.
+"""
+from collections import Counter
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+
+def adjust_question_counts(deltas):
+    """
+    Apply ``{quiz_id: (total delta, ai delta)}`` to the quiz counters.
+    """
+    from .models import Quiz
+
+    now = timezone.now()
+    for quiz_id, (total, ai_total) in deltas.items():
+        if quiz_id is None or (not total and not ai_total):
+            continue
+        # updated_at moves too, so ETags derived from it change
+        Quiz.objects.filter(pk=quiz_id).update(
+            question_total=F('question_total') + total,
+            ai_question_total=F('ai_question_total') + ai_total,
+            updated_at=now
+        )
+
+
+def question_deltas(rows):
+    """
+    Turn ``(quiz_id, is_ai_generated, count)`` rows into counter deltas.
+    Negative counts are removals.
+    """
+    deltas = {}
+    for quiz_id, is_ai_generated, count in rows:
+        total, ai_total = deltas.get(quiz_id, (0, 0))
+        deltas[quiz_id] = (total + count, ai_total + (count if is_ai_generated else 0))
+    return deltas
+
+
+def recount_questions(quiz_ids):
+    """Set the question counters of ``quiz_ids`` from an actual count."""
+    from .models import Quiz
+
+    for quiz in _question_counts(Quiz.objects.filter(pk__in=set(quiz_ids))):
+        Quiz.objects.filter(pk=quiz.pk).update(
+            question_total=quiz.actual_total,
+            ai_question_total=quiz.actual_ai_total,
+            updated_at=timezone.now()
+        )
+
+
+def adjust_quiz_counts(deltas):
+    """
+    Apply ``{topic_id: delta}`` to the topic counters and the counters of
+    their subjects.
+    """
+    from .models import Subject, Topic
+
+    for topic_id, delta in deltas.items():
+        if topic_id is None or not delta:
+            continue
+        Topic.objects.filter(pk=topic_id).update(quiz_count=F('quiz_count') + delta)
+        Subject.objects.filter(topics__id=topic_id).update(quiz_count=F('quiz_count') + delta)
+
+
+def quiz_deltas(topic_ids, sign=1):
+    return {topic_id: sign * count for topic_id, count in Counter(topic_ids).items()}
+
+
+def recount_quizzes(topic_ids):
+    """Set the quiz counters of ``topic_ids`` and their subjects from an actual count."""
+    from .models import Subject, Topic
+
+    topic_ids = {topic_id for topic_id in topic_ids if topic_id is not None}
+    for topic in Topic.objects.filter(pk__in=topic_ids).annotate(actual=Count('quizzes')):
+        Topic.objects.filter(pk=topic.pk).update(quiz_count=topic.actual)
+    # Filtering on topics in the same query would only count the quizzes of those topics
+    subject_ids = Topic.objects.filter(pk__in=topic_ids).values('subject_id')
+    for subject in Subject.objects.filter(pk__in=subject_ids).annotate(actual=Count('topics__quizzes')):
+        Subject.objects.filter(pk=subject.pk).update(quiz_count=subject.actual)
+
+
+def _question_counts(quizzes):
+    return quizzes.annotate(
+        actual_total=Count('questions'),
+        actual_ai_total=Count('questions', filter=Q(questions__is_ai_generated=True))
+    )
+
+
+def reconcile(dry_run=False):
+    """
+    Recount every counter and fix the ones that drifted.  Returns the number
+    of drifted rows per model.
+    """
+    from .models import Quiz, Subject, Topic
+
+    drifted_quizzes = _question_counts(Quiz.objects.order_by()).exclude(
+        question_total=F('actual_total'), ai_question_total=F('actual_ai_total')
+    )
+    drifted_topics = Topic.objects.order_by().annotate(actual=Count('quizzes')).exclude(quiz_count=F('actual'))
+    drifted_subjects = Subject.objects.order_by().annotate(actual=Count('topics__quizzes')).exclude(quiz_count=F('actual'))
+
+    drift = {'quizzes': 0, 'topics': 0, 'subjects': 0}
+    for quiz in drifted_quizzes.only('id').iterator(chunk_size=2000):
+        drift['quizzes'] += 1
+        if not dry_run:
+            Quiz.objects.filter(pk=quiz.pk).update(
+                question_total=quiz.actual_total, ai_question_total=quiz.actual_ai_total, updated_at=timezone.now()
+            )
+    for topic in drifted_topics.only('id'):
+        drift['topics'] += 1
+        if not dry_run:
+            Topic.objects.filter(pk=topic.pk).update(quiz_count=topic.actual)
+    for subject in drifted_subjects.only('id'):
+        drift['subjects'] += 1
+        if not dry_run:
+            Subject.objects.filter(pk=subject.pk).update(quiz_count=subject.actual)
+    return drift
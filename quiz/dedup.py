@@ -0,0 +1,181 @@
+"""
+Duplicate detection for question text.
+
+Exact duplicates are caught by ``content_hash``, a hash of the normalized
+question text stored on every question and unique per quiz, so generated
+questions can be inserted with ``bulk_create(ignore_conflicts=True)``.
+
+Near-duplicates (the same question reworded slightly) are caught with MinHash
+signatures over word 3-shingles, bucketed with locality sensitive hashing:
+16 bands of 4 rows find candidates with an estimated Jaccard similarity above
+roughly 0.5, and a candidate counts as a duplicate when its estimated
+similarity reaches ``QUIZ_DEDUP_THRESHOLD``.  Signing and looking up a
+question takes well under a millisecond.
+
+``topic_index`` keeps one index per topic in process memory and brings it up
+to date incrementally by loading only the questions added since it was last
+refreshed.  Deleted questions stay in the index until the process restarts,
+which at worst rejects a question that was acceptable.
+"""
+import hashlib
+import random
+import re
+import struct
+import threading
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20250607)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_SIGNATURE = struct.Struct(f'>{NUM_PERM}Q')
+
+
+def normalize(text):
+    """Lower-case ``text`` and reduce it to words separated by single spaces."""
+    return ' '.join(re.sub(r'[^\w]+', ' ', text.lower()).split())
+
+
+def content_hash(text):
+    """Hash used to block exact duplicates, insensitive to case and punctuation."""
+    return hashlib.sha1(normalize(text).encode('utf-8')).hexdigest()
+
+
+def shingles(text):
+    words = normalize(text).split()
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(text):
+    """Return the MinHash signature of ``text`` packed into bytes."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for shingle in shingles(text)
+    ]
+    return _SIGNATURE.pack(*(
+        min((a * value + b) % _PRIME for value in hashes)
+        for a, b in _PERMUTATIONS
+    ))
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two packed signatures."""
+    return sum(x == y for x, y in zip(_SIGNATURE.unpack(first), _SIGNATURE.unpack(second))) / NUM_PERM
+
+
+def _bands(packed):
+    width = ROWS * 8
+    return [packed[band * width:(band + 1) * width] for band in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    """
+    Incremental MinHash/LSH index over question texts.
+
+    Args:
+        threshold (float): Estimated similarity at which a text counts as a
+            duplicate (default: ``QUIZ_DEDUP_THRESHOLD``)
+    """
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold if threshold is not None else getattr(settings, 'QUIZ_DEDUP_THRESHOLD', 0.7)
+        self.signatures = {}
+        self.hashes = {}
+        self.buckets = [defaultdict(set) for _ in range(BANDS)]
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def add(self, key, text):
+        packed = signature(text)
+        with self.lock:
+            self.signatures[key] = packed
+            self.hashes.setdefault(content_hash(text), key)
+            for band, bucket in zip(_bands(packed), self.buckets):
+                bucket[band].add(key)
+
+    def find(self, text):
+        """
+        Return ``(key, similarity)`` of the closest indexed text that is a
+        duplicate of ``text``, or None.
+        """
+        exact = self.hashes.get(content_hash(text))
+        if exact is not None:
+            return exact, 1.0
+
+        packed = signature(text)
+        with self.lock:
+            candidates = set()
+            for band, bucket in zip(_bands(packed), self.buckets):
+                candidates.update(bucket.get(band, ()))
+            scored = [(similarity(packed, self.signatures[key]), key) for key in candidates]
+
+        if not scored:
+            return None
+        score, key = max(scored, key=lambda item: item[0])
+        return (key, score) if score >= self.threshold else None
+
+    def is_duplicate(self, text):
+        return self.find(text) is not None
+
+
+def index_for_texts(texts, threshold=None):
+    """Build a throwaway index, e.g. over the previous questions of a request."""
+    index = NearDuplicateIndex(threshold)
+    for position, text in enumerate(texts):
+        index.add(('text', position), text)
+    return index
+
+
+class _TopicIndex:
+    def __init__(self):
+        self.index = NearDuplicateIndex()
+        self.last_question_id = 0
+
+
+_topic_indexes = OrderedDict()
+_topic_indexes_lock = threading.Lock()
+
+
+def topic_index(topic_id):
+    """
+    Return the index of all stored questions in ``topic_id``, loading the
+    questions added since the last call.
+    """
+    with _topic_indexes_lock:
+        entry = _topic_indexes.get(topic_id)
+        if entry is None:
+            entry = _topic_indexes[topic_id] = _TopicIndex()
+        _topic_indexes.move_to_end(topic_id)
+        while len(_topic_indexes) > getattr(settings, 'QUIZ_DEDUP_MAX_TOPICS', 64):
+            _topic_indexes.popitem(last=False)
+
+    from .models import Question
+
+    with entry.index.lock:
+        last_question_id = entry.last_question_id
+    new_questions = (
+        Question.objects
+        .filter(quiz__topic_id=topic_id, id__gt=last_question_id)
+        .order_by('id')
+        .values_list('id', 'question_text')
+    )
+    for question_id, question_text in new_questions.iterator(chunk_size=2000):
+        entry.index.add(question_id, question_text)
+        entry.last_question_id = max(entry.last_question_id, question_id)
+    return entry.index
+
+
+def clear_topic_indexes():
+    """Drop every cached topic index, e.g. between tests."""
+    with _topic_indexes_lock:
+        _topic_indexes.clear()
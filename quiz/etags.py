@@ -0,0 +1,49 @@
+"""
+Conditional GET support.
+
+Views compute an ETag from something cheap that changes whenever the
+response would (a version stamp, an ``updated_at`` aggregate) rather than by
+hashing the rendered body, so a client that sends a matching
+``If-None-Match`` gets a 304 before anything is serialized.
+"""
+import hashlib
+
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+
+
+def make_etag(*parts):
+    """Strong ETag derived from ``parts``."""
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    """
+    Whether ``If-None-Match`` matches ``etag``, using the weak comparison
+    RFC 9110 prescribes for this header.
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    tags = parse_etags(header)
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def not_modified(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+
+def conditional_response(request, etag, build, *args, **kwargs):
+    """
+    Return 304 if the client already has ``etag``, otherwise the response of
+    ``build(request, *args, **kwargs)`` with the ETag attached.
+    """
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response = build(request, *args, **kwargs)
+    if response.status_code == 200:
+        response['ETag'] = etag
+    return response
@@ -0,0 +1,115 @@
+"""
+Read-only fast paths for hot serializers.
+
+DRF resolves every field of every row through ``Field.get_attribute`` and
+``to_representation``.  ``FastSerializer`` walks the fields of a serializer
+once, compiles an ``attrgetter`` per field and keeps ``to_representation``
+only for the fields where it changes the value.  ISO 8601 datetimes are
+formatted inline with the current timezone looked up once per list, which is
+where DRF spends most of its time on these serializers.
+
+The output is the same dictionary the DRF serializer produces, key for key
+and in the same order, including the DRF quirks: a dotted ``source`` through
+a missing relation (a quiz without a topic) leaves its key out, and a
+``PrimaryKeyRelatedField`` reads the ``_id`` column without loading the
+related row.  Only plain read paths are compiled; serializers with method
+fields or nested serializers are not supported.
+"""
+from operator import attrgetter
+
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .serializers import QuestionSerializer, QuizSerializer
+
+# Fields whose to_representation returns model values unchanged
+IDENTITY_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+)
+
+# How a compiled field turns the model value into the output value
+IDENTITY, ISO_DATETIME, CONVERT = range(3)
+
+
+def is_iso_datetime(field):
+    """
+    Whether ``field`` is a plain ISO 8601 ``DateTimeField``, which can skip
+    DRF's per-value timezone lookup.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    return (
+        type(field) is serializers.DateTimeField and isinstance(output_format, str)
+        and output_format.lower() == ISO_8601 and not hasattr(field, 'timezone')
+    )
+
+
+class FastSerializer:
+    """
+    Compiled, read-only equivalent of ``serializer_class`` for model
+    instances.  Compiled on first use, as building the DRF fields needs the
+    app registry.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._fields = None
+
+    def compile(self):
+        model = self.serializer_class.Meta.model
+        fields = []
+        for name, field in self.serializer_class().fields.items():
+            if isinstance(field, serializers.SerializerMethodField) or isinstance(field, serializers.BaseSerializer):
+                raise TypeError(f'{self.serializer_class.__name__}.{name} cannot be compiled')
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                getter = attrgetter(model._meta.get_field(field.source).attname)
+                kind = IDENTITY
+            else:
+                getter = attrgetter('.'.join(field.source_attrs))
+                if type(field) in IDENTITY_FIELDS:
+                    kind = IDENTITY
+                elif is_iso_datetime(field):
+                    kind = ISO_DATETIME
+                else:
+                    kind = CONVERT
+            # Dotted sources can cross a nullable relation
+            fields.append((name, getter, kind, field.to_representation, len(field.source_attrs) > 1))
+        return fields
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            self._fields = self.compile()
+        return self._fields
+
+    def to_representation(self, instance, tz=None):
+        if tz is None:
+            tz = timezone.get_current_timezone()
+        data = {}
+        for name, getter, kind, convert, dotted in self.fields:
+            if dotted:
+                try:
+                    value = getter(instance)
+                except AttributeError:
+                    # DRF skips read-only fields it cannot reach
+                    continue
+            else:
+                value = getter(instance)
+            if value is None or kind == IDENTITY:
+                data[name] = value
+            elif kind == ISO_DATETIME and value.tzinfo is not None:
+                # DateTimeField.to_representation with the timezone looked up once
+                value = value.astimezone(tz).isoformat()
+                data[name] = value[:-6] + 'Z' if value.endswith('+00:00') else value
+            else:
+                data[name] = convert(value)
+        return data
+
+    def many(self, instances):
+        tz = timezone.get_current_timezone()
+        to_representation = self.to_representation
+        return [to_representation(instance, tz) for instance in instances]
+
+
+quiz_serializer = FastSerializer(QuizSerializer)
+question_serializer = FastSerializer(QuestionSerializer)
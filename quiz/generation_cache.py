@@ -0,0 +1,186 @@
+"""
+Cache of generated questions shared by every ``QuizGenerator`` in a process.
+
+Results are pooled per normalized (subject, topic, difficulty, class level)
+key.  A key only serves hits once its pool holds ``QUIZ_GENERATION_CACHE_POOL_SIZE``
+questions; until then every request is generated live and added to the pool,
+so students on a hot topic get a rotating selection of different questions
+rather than the same one.  Entries expire after ``QUIZ_GENERATION_CACHE_TTL``
+seconds, after which the pool warms up again with fresh generations, and the
+least recently used keys are evicted beyond ``QUIZ_GENERATION_CACHE_MAX_KEYS``.
+
+Every entry is also written to a SQLite file (``QUIZ_GENERATION_CACHE_PATH``)
+so pools survive restarts and are shared by the worker processes on a host.
+A key missing from memory is loaded from the file on first use.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+def cache_key(subject, topic, difficulty, class_level):
+    return '|'.join(' '.join(str(part).lower().split()) for part in (subject, topic, difficulty, class_level))
+
+
+class _Pool:
+    def __init__(self):
+        # (created_at, question) pairs, oldest first
+        self.entries = []
+        self.cursor = 0
+
+
+class GenerationCache:
+    """
+    LRU/TTL cache of generated question pools with optional disk persistence.
+
+    Args:
+        pool_size (int): Questions generated for a key before it serves hits
+        ttl (float): Seconds an entry stays valid
+        max_keys (int): Keys kept in memory
+        path (str): SQLite file the entries are persisted to, or None
+    """
+
+    def __init__(self, pool_size=20, ttl=86400, max_keys=500, path=None):
+        self.pool_size = pool_size
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.path = path
+        self.pools = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS generation_cache '
+                '(id INTEGER PRIMARY KEY, key TEXT NOT NULL, created_at REAL NOT NULL, payload TEXT NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS generation_cache_key ON generation_cache (key, created_at)')
+
+    def _pool(self, key, now):
+        """Return the live pool of ``key``, loading it from disk if needed. Called with the lock held."""
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = _Pool()
+            if self._db is not None:
+                rows = self._db.execute(
+                    'SELECT created_at, payload FROM generation_cache WHERE key = ? AND created_at > ? '
+                    'ORDER BY created_at DESC LIMIT ?',
+                    (key, now - self.ttl, self.pool_size)
+                ).fetchall()
+                pool.entries = [(created_at, json.loads(payload)) for created_at, payload in reversed(rows)]
+            while len(self.pools) > self.max_keys:
+                self.pools.popitem(last=False)
+                self.evictions += 1
+        self.pools.move_to_end(key)
+
+        fresh = [entry for entry in pool.entries if entry[0] > now - self.ttl]
+        self.expirations += len(pool.entries) - len(fresh)
+        pool.entries = fresh
+        return pool
+
+    def get(self, key, exclude=None):
+        """
+        Return a copy of the next pooled question of ``key`` in rotation, or
+        None on a miss.  ``exclude`` is a NearDuplicateIndex of questions the
+        caller must not get again.
+        """
+        with self.lock:
+            pool = self._pool(key, time.time())
+            if len(pool.entries) >= self.pool_size:
+                for offset in range(len(pool.entries)):
+                    position = (pool.cursor + offset) % len(pool.entries)
+                    question = pool.entries[position][1]
+                    if exclude is None or not exclude.is_duplicate(question['question']):
+                        pool.cursor = position + 1
+                        self.hits += 1
+                        return json.loads(json.dumps(question))
+            self.misses += 1
+            return None
+
+    def add(self, key, questions):
+        """Add freshly generated questions to the pool of ``key``."""
+        if not questions:
+            return
+        now = time.time()
+        with self.lock:
+            pool = self._pool(key, now)
+            pool.entries.extend((now, question) for question in questions)
+            # The newest questions replace the oldest once the pool is full
+            del pool.entries[:-self.pool_size]
+            if self._db is not None:
+                self._db.executemany(
+                    'INSERT INTO generation_cache (key, created_at, payload) VALUES (?, ?, ?)',
+                    [(key, now, json.dumps(question)) for question in questions]
+                )
+                self._db.execute(
+                    'DELETE FROM generation_cache WHERE key = ? AND (created_at <= ? OR id NOT IN '
+                    '(SELECT id FROM generation_cache WHERE key = ? ORDER BY created_at DESC, id DESC LIMIT ?))',
+                    (key, now - self.ttl, key, self.pool_size)
+                )
+
+    def clear(self):
+        with self.lock:
+            self.pools.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+            if self._db is not None:
+                self._db.execute('DELETE FROM generation_cache')
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+                'keys': len(self.pools),
+                'entries': sum(len(pool.entries) for pool in self.pools.values()),
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'pool_size': self.pool_size,
+                'ttl': self.ttl,
+                'persistent': self._db is not None,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_generation_cache():
+    """
+    Return the process-wide cache, or None if it is disabled by setting
+    ``QUIZ_GENERATION_CACHE_POOL_SIZE`` to 0.
+    """
+    global _cache
+    if getattr(settings, 'QUIZ_GENERATION_CACHE_POOL_SIZE', 20) <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = GenerationCache(
+                pool_size=getattr(settings, 'QUIZ_GENERATION_CACHE_POOL_SIZE', 20),
+                ttl=getattr(settings, 'QUIZ_GENERATION_CACHE_TTL', 86400),
+                max_keys=getattr(settings, 'QUIZ_GENERATION_CACHE_MAX_KEYS', 500),
+                path=getattr(settings, 'QUIZ_GENERATION_CACHE_PATH', None)
+            )
+        return _cache
+
+
+@receiver(setting_changed)
+def reset_generation_cache(setting, **kwargs):
+    global _cache
+    if setting.startswith('QUIZ_GENERATION_CACHE_'):
+        with _cache_lock:
+            _cache = None
@@ -0,0 +1,141 @@
+"""
+``Idempotency-Key`` support for POST endpoints that cost an LLM call.
+
+The first request with a key runs the view and stores its response; a retry
+with the same key (after a timeout, say) gets the stored response back with
+an ``Idempotent-Replayed: true`` header instead of running the view again.
+Keys are scoped to the user and expire after ``QUIZ_IDEMPOTENCY_KEY_TTL``
+seconds; ``manage.py prune_idempotency_keys`` deletes expired ones.
+
+A key reused for a different request is refused with 422, and a retry that
+arrives while the first request is still running gets 409.  Server errors
+are not stored, so the request can be retried.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def key_ttl():
+    return timedelta(seconds=getattr(settings, 'QUIZ_IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode('utf-8')).hexdigest()
+
+
+def prune():
+    """Delete expired keys.  Returns the number deleted."""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - key_ttl()).delete()
+    return deleted
+
+
+def claim_key(user_id, key, fingerprint):
+    """
+    Record that a request with ``key`` is running.  Returns None when it is
+    the first, or the stored ``IdempotencyKey`` of an earlier request.
+    """
+    IdempotencyKey.objects.filter(user_id=user_id, key=key, created_at__lt=timezone.now() - key_ttl()).delete()
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(user_id=user_id, key=key, fingerprint=fingerprint)
+        return None
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(user_id=user_id, key=key).first()
+
+
+def begin_request(request, key):
+    """
+    Claim ``key`` for ``request``.  Returns the response to send instead of
+    running the view (a replay or a refusal), or None to run it.
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    fingerprint = request_fingerprint(request)
+    stored = claim_key(request.user.id, key, fingerprint)
+    if stored is None:
+        return None
+    if stored.fingerprint != fingerprint:
+        return Response(
+            {'error': f'{HEADER} was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if stored.status_code is None:
+        return Response(
+            {'error': f'A request with this {HEADER} is still in progress'},
+            status=status.HTTP_409_CONFLICT
+        )
+    return Response(stored.response, status=stored.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def finish_request(request, key, response):
+    """
+    Store the response to the request that claimed ``key``, or release the
+    key when the view failed (``response`` None) or answered a server error.
+    """
+    stored_key = IdempotencyKey.objects.filter(user_id=request.user.id, key=key)
+    if response is None or response.status_code >= 500 or not isinstance(response, Response):
+        stored_key.delete()
+    else:
+        stored_key.update(status_code=response.status_code, response=response.data)
+
+
+def idempotent(view):
+    """
+    Decorate a view method, or an async one, to honour the
+    ``Idempotency-Key`` header.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return await view(self, request, *args, **kwargs)
+            response = await sync_to_async(begin_request)(request, key)
+            if response is not None:
+                return response
+            try:
+                response = await view(self, request, *args, **kwargs)
+            except Exception:
+                await sync_to_async(finish_request)(request, key, None)
+                raise
+            await sync_to_async(finish_request)(request, key, response)
+            return response
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(self, request, *args, **kwargs)
+        response = begin_request(request, key)
+        if response is not None:
+            return response
+        try:
+            response = view(self, request, *args, **kwargs)
+        except Exception:
+            finish_request(request, key, None)
+            raise
+        finish_request(request, key, response)
+        return response
+
+    return wrapper
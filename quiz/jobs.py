@@ -0,0 +1,258 @@
+"""
+Durable question generation jobs.
+
+Request handlers enqueue a ``GenerationJob`` and return straight away; the
+``run_generation_workers`` command claims pending jobs and calls the LLM.
+Jobs are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` (where the
+database supports it) followed by a compare-and-swap update, so any number of
+worker processes can share the queue without running a job twice.  A running
+job whose lock has not been refreshed for ``QUIZ_GENERATION_JOB_STALE_AFTER``
+seconds is considered abandoned and can be claimed again.
+
+Fill jobs are single-flight: a quiz has at most one unfinished job of each
+fill kind, and requests made while one is queued or running share it instead
+of paying for another batch (``coalesce_generation``).
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .dedup import content_hash, topic_index
+from .models import BufferedQuestion, GenerationJob, Question, Quiz
+from .services import GenerationFailure, QuizGenerator
+
+logger = logging.getLogger(__name__)
+
+# Failures kept on a job for the status endpoint
+MAX_RECORDED_FAILURES = 50
+
+# Job kinds of which a quiz has at most one unfinished job
+SINGLE_FLIGHT_KINDS = ('fill_quiz', 'fill_buffer')
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+def enqueue_generation(quiz, num_questions, kind='fill_quiz', target_count=None, requested_by=None):
+    """
+    Queue the generation of ``num_questions`` new questions for ``quiz``.
+    """
+    return GenerationJob.objects.create(
+        quiz=quiz,
+        kind=kind,
+        num_questions=num_questions,
+        target_count=target_count,
+        requested_by=requested_by,
+        max_attempts=getattr(settings, 'QUIZ_GENERATION_JOB_MAX_ATTEMPTS', 3)
+    )
+
+
+def _lock_quiz(quiz):
+    """Hold a write lock on the row of ``quiz`` until the transaction ends."""
+    if connection.vendor == 'sqlite':
+        # SQLite has no row locks.  Writing first takes the database write lock,
+        # so racing callers wait for it instead of failing to upgrade a read lock
+        Quiz.objects.filter(pk=quiz.pk).update(updated_at=F('updated_at'))
+    else:
+        list(Quiz.objects.select_for_update().filter(pk=quiz.pk).values_list('pk', flat=True))
+
+
+def coalesce_generation(quiz, num_questions, kind='fill_quiz', target_count=None, requested_by=None):
+    """
+    Queue a fill job for ``quiz`` unless one of ``kind`` is already pending
+    or running, in which case callers share that one.  Returns
+    ``(job, created)``.
+
+    Callers for the same quiz queue up on the quiz row lock, and the
+    ``unique_active_fill_job`` constraint settles races on databases without
+    row locks.  A shared job that is still pending is raised to the larger
+    target; a running one is left as it is.
+    """
+    active = GenerationJob.objects.filter(quiz=quiz, kind=kind, status__in=ACTIVE_STATUSES)
+    try:
+        with transaction.atomic():
+            _lock_quiz(quiz)
+            job = active.order_by('created_at').first()
+            if job is None:
+                return enqueue_generation(quiz, num_questions, kind, target_count, requested_by), True
+    except IntegrityError:
+        job = active.order_by('created_at').first()
+        if job is None:
+            raise
+
+    if target_count is not None and (job.target_count or 0) < target_count:
+        raised = GenerationJob.objects.filter(pk=job.pk, status='pending').update(
+            target_count=target_count,
+            num_questions=Greatest(F('num_questions'), num_questions),
+            updated_at=timezone.now()
+        )
+        if raised:
+            job.refresh_from_db()
+    return job, False
+
+
+def claim_job(worker):
+    """
+    Claim the oldest runnable job for ``worker``, or return None if the
+    queue is empty.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'QUIZ_GENERATION_JOB_STALE_AFTER', 600))
+    runnable = Q(status='pending') | Q(status='running', locked_at__lt=stale_before)
+
+    with transaction.atomic():
+        job = (
+            GenerationJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(runnable)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+
+        # Only one worker wins even where row locks are not supported
+        claimed = GenerationJob.objects.filter(
+            pk=job.pk, status=job.status, locked_at=job.locked_at
+        ).update(status='running', worker=worker, locked_at=now, updated_at=now)
+        if not claimed:
+            return None
+
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job, generator=None):
+    """
+    Generate the questions of a claimed job, saving progress after every
+    round so the status endpoint can report partial results.
+    """
+    generator = generator or QuizGenerator()
+    quiz = Quiz.objects.select_related('topic', 'topic__subject').get(pk=job.quiz_id)
+
+    if not quiz.topic:
+        return _finish(job, 'failed', 'Quiz must have a topic assigned to generate questions')
+
+    # Buffer jobs fill the ready-question buffer instead of the question bank
+    fills_buffer = job.kind == 'fill_buffer'
+    pool = quiz.buffered_questions if fills_buffer else quiz.questions
+
+    while job.generated_count < job.num_questions:
+        needed = job.num_questions - job.generated_count
+        if job.target_count is not None:
+            needed = min(needed, job.target_count - pool.count())
+        if needed <= 0:
+            break
+
+        batch = generator.generate_questions(
+            subject=quiz.topic.subject.name,
+            topic=quiz.topic.name,
+            difficulty=quiz.difficulty,
+            class_level=quiz.class_level,
+            num_questions=needed,
+            # Pooled generations are fine for serving but not new to the bank,
+            # and the pool only serves questions the topic does not have yet
+            use_cache=fills_buffer,
+            exclude=topic_index(quiz.topic_id) if fills_buffer else None
+        )
+        failures = list(batch.failures)
+        accepted = _reject_duplicates(job, quiz, batch, failures)
+        job.failures = (job.failures + [failure.as_dict() for failure in failures])[-MAX_RECORDED_FAILURES:]
+
+        if accepted and fills_buffer:
+            BufferedQuestion.objects.bulk_create(
+                [BufferedQuestion(quiz=quiz, payload=question_data) for question_data in accepted]
+            )
+            job.generated_count += len(accepted)
+        elif accepted:
+            created_ids = _insert_questions(quiz, accepted)
+            job.question_ids = job.question_ids + created_ids
+            job.generated_count += len(created_ids)
+
+            # Generated questions are WASSCE questions, unless the topic
+            # already has a WASSCE quiz at this difficulty
+            if not quiz.is_wassce_related and not Quiz.objects.filter(
+                topic_id=quiz.topic_id, difficulty=quiz.difficulty, is_wassce_related=True
+            ).exists():
+                quiz.is_wassce_related = True
+                quiz.save()
+        else:
+            job.attempts += 1
+            if job.attempts >= job.max_attempts:
+                return _finish(job, 'failed', f'No questions could be generated after {job.attempts} attempts')
+
+        # Refresh the lock so the job is not reclaimed while it is running
+        job.locked_at = timezone.now()
+        job.save()
+
+    return _finish(job, 'completed')
+
+
+def _reject_duplicates(job, quiz, batch, failures):
+    """
+    Drop generated questions that duplicate a stored question of the topic
+    or an earlier question of the same job.  Rejected questions are added to
+    ``failures`` and get generated again by the next round.
+    """
+    index = topic_index(quiz.topic_id)
+    accepted = []
+    for position, question_data in enumerate(batch):
+        match = index.find(question_data['question'])
+        if match is not None:
+            key, score = match
+            failures.append(GenerationFailure(
+                position, 'duplicate', f'Near-duplicate of {key} (similarity {score:.2f})', batch.elapsed
+            ))
+            continue
+        index.add(('job', job.pk, job.generated_count + len(accepted)), question_data['question'])
+        accepted.append(question_data)
+    return accepted
+
+
+def _insert_questions(quiz, questions_data):
+    """
+    Insert generated questions, skipping exact duplicates already in the quiz
+    (including ones inserted concurrently by another worker), and return the
+    ids of the new rows.
+    """
+    hashes = {content_hash(question_data['question']) for question_data in questions_data}
+    existing = set(
+        Question.objects.filter(quiz=quiz, content_hash__in=hashes).values_list('content_hash', flat=True)
+    )
+    Question.objects.bulk_create(
+        [Question.from_generated(quiz, question_data) for question_data in questions_data],
+        ignore_conflicts=True
+    )
+    return list(
+        Question.objects
+        .filter(quiz=quiz, content_hash__in=hashes - existing)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+
+
+def _finish(job, status, error=''):
+    job.status = status
+    job.error = error
+    job.finished_at = timezone.now()
+    job.save()
+    if status == 'failed':
+        logger.warning("Generation job %s failed: %s", job.pk, error)
+    return job
+
+
+def run_next_job(worker, generator=None):
+    """
+    Claim and run one job.  Returns the job, or None if the queue was empty.
+    """
+    job = claim_job(worker)
+    if job is None:
+        return None
+    try:
+        return run_job(job, generator)
+    except Exception as e:
+        logger.exception("Generation job %s crashed", job.pk)
+        return _finish(job, 'failed', str(e))
@@ -0,0 +1,182 @@
+"""
+Incremental parsing of JSON streamed from a chat completion.
+
+Completions arrive a few characters at a time.  ``JSONArrayStream`` finds the
+boundaries of the elements of a top-level JSON array as the text comes in, so
+each element can be decoded and used as soon as its closing brace arrives
+instead of after the whole completion.  ``JSONObjectStream`` does the same
+for the members of a top-level JSON object, so the fields of a single
+question can be shown while the rest is still being written.  Any text
+before the opening bracket or brace (e.g. a markdown code fence) is ignored.
+"""
+import json
+
+
+class JSONArrayStream:
+    """
+    Split a streamed JSON array into the raw text of its elements.
+
+    Usage::
+
+        stream = JSONArrayStream()
+        for chunk in chunks:
+            for item in stream.feed(chunk):
+                handle(json.loads(item))
+    """
+
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._buffer = []
+
+    def feed(self, text):
+        """
+        Consume the next piece of the stream and return the elements it
+        completed, as raw JSON strings.
+        """
+        completed = []
+        for char in text:
+            if self.finished:
+                break
+            if not self.started:
+                if char == '[':
+                    self.started = True
+                continue
+
+            if self._in_string:
+                self._buffer.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if self._depth == 0:
+                # Between elements: skip separators, close on the final bracket
+                if char == ']':
+                    self._flush(completed)
+                    self.finished = True
+                    continue
+                if char == ',':
+                    self._flush(completed)
+                    continue
+                if char.isspace() and not self._buffer:
+                    continue
+
+            self._buffer.append(char)
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._flush(completed)
+        return completed
+
+    def _flush(self, completed):
+        item = ''.join(self._buffer).strip()
+        self._buffer = []
+        if item:
+            completed.append(item)
+
+
+class JSONObjectStream:
+    """
+    Split a streamed JSON object into its members.
+
+    Usage::
+
+        stream = JSONObjectStream()
+        for chunk in chunks:
+            for key, value in stream.feed(chunk):
+                handle(key, json.loads(value))
+    """
+
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self._key = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._buffer = []
+
+    def feed(self, text):
+        """
+        Consume the next piece of the stream and return the members it
+        completed, as ``(key, raw JSON value)`` pairs.  String, object and
+        array values are complete at their closing quote or bracket, other
+        values at the comma or brace after them.
+        """
+        completed = []
+        for char in text:
+            if self.finished:
+                break
+            if not self.started:
+                if char == '{':
+                    self.started = True
+                continue
+
+            if self._in_string:
+                self._buffer.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 0 and self._key is not None:
+                        self._flush(completed)
+                continue
+
+            if self._depth == 0:
+                # Between members: read the key up to the colon, skip separators
+                if char in ',}':
+                    self._flush(completed)
+                    self.finished = char == '}'
+                    continue
+                if char == ':' and self._key is None:
+                    self._key = json.loads(''.join(self._buffer))
+                    self._buffer = []
+                    continue
+                if char.isspace() and not self._buffer:
+                    continue
+
+            self._buffer.append(char)
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._flush(completed)
+        return completed
+
+    def _flush(self, completed):
+        value = ''.join(self._buffer).strip()
+        self._buffer = []
+        if self._key is not None and value:
+            completed.append((self._key, value))
+            self._key = None
+
+
+def iter_json_array(chunks):
+    """
+    Yield each element of a streamed JSON array as soon as it is complete.
+    Elements that are not valid JSON are yielded as ``json.JSONDecodeError``
+    instances so the caller can count them as failures.
+    """
+    stream = JSONArrayStream()
+    for chunk in chunks:
+        for item in stream.feed(chunk):
+            try:
+                yield json.loads(item)
+            except json.JSONDecodeError as e:
+                yield e
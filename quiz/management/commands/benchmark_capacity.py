@@ -0,0 +1,60 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from quiz.benchmarks import CAPACITY_ENDPOINTS, SERVER_COMMANDS, benchmark_capacity, benchmark_user
+import json
+
+
+class Command(BaseCommand):
+    help = 'Compare the requests gunicorn (WSGI) and uvicorn (ASGI) workers keep in flight, async and sync views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', action='append', dest='servers', choices=sorted(SERVER_COMMANDS),
+                            help='Only run this server (repeatable)')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', choices=list(CAPACITY_ENDPOINTS),
+                            help='Only load this endpoint (repeatable; default: the async generate_next_question '
+                                 'and the sync questions list)')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 100, 200],
+                            help='Concurrent students to measure')
+        parser.add_argument('--rounds', type=int, default=1, help='Requests every student sends')
+        parser.add_argument('--latency', type=float, default=5.0, help='Seconds the fake transport takes per completion')
+        parser.add_argument('--workers', type=int, default=1, help='Server worker processes')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker')
+        parser.add_argument('--port', type=int, default=8765, help='Port the servers listen on')
+        parser.add_argument('--user', help='Username to run as (default: the first student with selected topics)')
+        parser.add_argument('--label', help='Free-form label stored with the results')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        try:
+            user = benchmark_user(options['user'])
+            results = benchmark_capacity(
+                user,
+                servers=options['servers'] or ['gunicorn', 'uvicorn'],
+                endpoints=options['endpoints'] or list(CAPACITY_ENDPOINTS),
+                concurrency=options['concurrency'],
+                rounds=options['rounds'],
+                latency=options['latency'],
+                workers=options['workers'],
+                threads=options['threads'],
+                port=options['port'],
+                label=options['label']
+            )
+        except (ObjectDoesNotExist, ValueError, RuntimeError) as e:
+            raise CommandError(str(e))
+
+        if not options['output']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        for server, endpoints in results['servers'].items():
+            for endpoint, levels in endpoints.items():
+                for level in levels:
+                    latency = level['latency_ms'] or {'p50': 0, 'p99': 0}
+                    self.stdout.write(
+                        f'{server:<10} {endpoint:<24} {level["concurrency"]:>5} concurrent  '
+                        f'{level["throughput_rps"]:>8.2f} req/s  {level["requests_in_flight"]:>6} in flight  '
+                        f'p50 {latency["p50"]:>9.1f}ms  p99 {latency["p99"]:>9.1f}ms  {level["status_codes"]}'
+                    )
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from quiz.benchmarks import benchmark_serializers
+import json
+
+
+class Command(BaseCommand):
+    help = 'Compare the DRF serializers and JSON renderer with the fast paths on lists of quizzes and questions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 10000], help='List lengths to time')
+        parser.add_argument('--iterations', type=int, default=20, help='Timing runs for a list of 100 items')
+        parser.add_argument('--output', help='Write the JSON results to this file')
+
+    def handle(self, *args, **options):
+        results = benchmark_serializers(sizes=options['sizes'], iterations=options['iterations'])
+
+        for name, sizes in results['results'].items():
+            for size, result in sizes.items():
+                self.stdout.write(
+                    f'{name:<9} {size:>6} items  DRF {result["drf_ms"]:>9.3f}ms  fast {result["fast_ms"]:>9.3f}ms  '
+                    f'{result["speedup"]:>5}x  {"identical" if result["identical"] else "DIFFERENT"}'
+                )
+        if not results['orjson']:
+            self.stdout.write(self.style.WARNING('orjson is not installed; rendering used the json module'))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
@@ -1,9 +1,11 @@
 from django.core.management.base import BaseCommand
 from quiz.models import Subject
+from quiz.versions import deferred_bumps
 
 class Command(BaseCommand):
     help = 'Create initial WASSCE subjects'
 
+    @deferred_bumps()
     def handle(self, *args, **options):
         subjects = [
             "Mathematics",
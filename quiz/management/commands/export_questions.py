@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from quiz.bank import FORMATS, export_rows, guess_format, write_rows
+from quiz.models import Question
+import time
+
+
+class Command(BaseCommand):
+    help = 'Stream the question bank to a JSON Lines or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to write, or - for standard output")
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: from the file extension)')
+        parser.add_argument('--subject', action='append', dest='subjects', help='Only export this subject (repeatable)')
+        parser.add_argument('--ai-only', action='store_true', help='Only export AI-generated questions')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at a time')
+
+    def handle(self, *args, **options):
+        path = options['output']
+        try:
+            format = guess_format(path, options['format']) if path != '-' else options['format'] or 'jsonl'
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        questions = Question.objects.all()
+        if options['subjects']:
+            questions = questions.filter(quiz__topic__subject__name__in=options['subjects'])
+        if options['ai_only']:
+            questions = questions.filter(is_ai_generated=True)
+
+        started = time.monotonic()
+        rows = export_rows(questions, chunk_size=options['chunk_size'])
+        if path == '-':
+            # The rows end their own lines
+            self.stdout.ending = ''
+            write_rows(rows, self.stdout, format)
+            return
+
+        with open(path, 'w', newline='', encoding='utf-8') as output:
+            written = write_rows(rows, output, format)
+        self.stdout.write(
+            self.style.SUCCESS(f'Exported {written} questions to {path} in {time.monotonic() - started:.1f}s')
+        )
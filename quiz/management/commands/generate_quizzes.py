@@ -1,10 +1,21 @@
-from django.core.management.base import BaseCommand
-from quiz.models import Subject, Topic, Quiz
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-import random
+from django.utils import timezone
+from quiz.models import Topic, Quiz
+from quiz.catalog import CATALOG_VERSION
+from quiz.sampling import INDEX_VERSION
+from quiz.versions import bump_version
+import time
+
+# The unique constraint the quizzes are upserted on
+UNIQUE_FIELDS = ['topic', 'difficulty', 'is_wassce_related']
+UPDATE_FIELDS = ['title', 'class_level', 'duration_minutes', 'description', 'num_of_questions', 'is_active', 'updated_at']
 
 class Command(BaseCommand):
-    help = 'Generate WASSCE practice quizzes in three difficulty levels per topic'
+    help = 'Generate WASSCE practice quizzes in three difficulty levels per topic. Safe to re-run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Topics per committed chunk')
 
     def get_wassce_duration(self, difficulty):
         """Return duration based on WASSCE practice difficulty"""
@@ -50,67 +61,76 @@ class Command(BaseCommand):
         Time allocated: {duration} minutes.
         This quiz is designed to help you systematically prepare for your WASSCE examination."""
 
+    def build_quizzes(self, topic, now):
+        """Return the unsaved Easy, Medium and Hard quizzes of a topic"""
+        quizzes = []
+        for difficulty in ['Easy', 'Medium', 'Hard']:
+            duration = self.get_wassce_duration(difficulty)
+            quizzes.append(Quiz(
+                title=self.generate_quiz_title(topic.subject.name, topic.name, difficulty),
+                topic=topic,
+                class_level=self.get_wassce_class_level(difficulty),
+                difficulty=difficulty,
+                duration_minutes=duration,
+                description=self.generate_description(topic.subject.name, topic.name, difficulty, duration),
+                num_of_questions=self.get_num_questions(difficulty),
+                is_active=True,
+                is_wassce_related=True,
+                # bulk_create does not run auto_now on conflicting rows
+                updated_at=now
+            ))
+        return quizzes
+
     def handle(self, *args, **options):
-        topics = Topic.objects.all()
-        difficulties = ['Easy', 'Medium', 'Hard']
-        quizzes_created = 0
-        
-        if not topics.exists():
+        batch_size = max(1, options['batch_size'])
+        topics = Topic.objects.select_related('subject').order_by('id')
+        total_topics = topics.count()
+        started = time.monotonic()
+
+        if not total_topics:
             self.stdout.write(self.style.ERROR('No topics found. Please run generate_topics first.'))
             return
 
+        created = updated = processed = 0
+        last_id = 0
         try:
-            with transaction.atomic():
-                for topic in topics:
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'\nGenerating WASSCE practice quizzes for {topic.subject.name} - {topic.name}'
-                        )
+            while True:
+                # Keyset chunks, each committed on its own so a failure only loses the current chunk
+                chunk = list(topics.filter(id__gt=last_id)[:batch_size])
+                if not chunk:
+                    break
+                now = timezone.now()
+                quizzes = [quiz for topic in chunk for quiz in self.build_quizzes(topic, now)]
+                with transaction.atomic():
+                    existing = Quiz.objects.filter(topic__in=chunk, is_wassce_related=True).count()
+                    Quiz.objects.bulk_create(
+                        quizzes, update_conflicts=True, unique_fields=UNIQUE_FIELDS, update_fields=UPDATE_FIELDS
                     )
-                    
-                    # Create one quiz for each difficulty level
-                    for difficulty in difficulties:
-                        duration = self.get_wassce_duration(difficulty)
-                        class_level = self.get_wassce_class_level(difficulty)
-                        num_questions = self.get_num_questions(difficulty)
-                        title = self.generate_quiz_title(topic.subject.name, topic.name, difficulty)
-                        description = self.generate_description(topic.subject.name, topic.name, difficulty, duration)
-                        
-                        quiz = Quiz.objects.create(
-                            title=title,
-                            topic=topic,
-                            class_level=class_level,
-                            difficulty=difficulty,
-                            duration_minutes=duration,
-                            description=description,
-                            num_of_questions=num_questions,
-                            is_active=True,
-                            is_wassce_related=True
-                        )
-                        
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f'    Created: {quiz.title} ({class_level}, {duration} mins, {num_questions} questions)'
-                            )
-                        )
-                        quizzes_created += 1
+                    chunk_created = Quiz.objects.filter(topic__in=chunk, is_wassce_related=True).count() - existing
+                created += chunk_created
+                updated += len(quizzes) - chunk_created
+                processed += len(chunk)
+                last_id = chunk[-1].id
+                self.stdout.write(f'  {processed}/{total_topics} topics: {created} created, {updated} updated')
+        except Exception as e:
+            raise CommandError(
+                f'Error creating quizzes after topic {last_id}: {e}. '
+                f'The {processed} topics before it were saved; run the command again to finish.'
+            ) from e
+        finally:
+            # Bulk upserts do not send the signals that invalidate the sampling index and catalog
+            if processed:
+                bump_version(INDEX_VERSION)
+                bump_version(CATALOG_VERSION)
 
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'\nSuccessfully created {quizzes_created} WASSCE practice quizzes!'
-                )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nCreated {created} and updated {updated} WASSCE practice quizzes '
+                f'across {total_topics} topics in {time.monotonic() - started:.1f}s'
             )
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'- One quiz per difficulty level (Easy, Medium, Hard) for each topic'
-                )
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'- One quiz per difficulty level (Easy, Medium, Hard) for each topic'
             )
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'- {quizzes_created} total quizzes across {len(topics)} topics'
-                )
-            )
-            
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error creating quizzes: {str(e)}'))
-            raise 
\ No newline at end of file
+        )
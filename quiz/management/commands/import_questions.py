@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from quiz.bank import FORMATS, QuestionImporter, guess_format, read_rows
+from quiz.versions import deferred_bumps
+import sys
+import time
+
+
+class Command(BaseCommand):
+    help = 'Stream questions from a JSON Lines or CSV file into the question bank, skipping duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='File to read, or - for standard input')
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Questions inserted per transaction')
+        parser.add_argument('--no-create', action='store_true', help='Reject rows whose subject, topic or quiz does not exist')
+        parser.add_argument('--max-errors', type=int, default=20, help='Invalid rows reported in detail')
+
+    @deferred_bumps()
+    def handle(self, *args, **options):
+        path = options['input']
+        try:
+            format = guess_format(path, options['format']) if path != '-' else options['format'] or 'jsonl'
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        importer = QuestionImporter(
+            batch_size=max(1, options['batch_size']),
+            create_missing=not options['no_create'],
+            max_errors=options['max_errors']
+        )
+        started = time.monotonic()
+
+        def progress(importer):
+            self.stdout.write(
+                f'  {importer.created} created, {importer.duplicates} duplicates, {importer.invalid} invalid'
+            )
+
+        if path == '-':
+            importer.import_rows(read_rows(sys.stdin, format), progress)
+        else:
+            try:
+                stream = open(path, newline='', encoding='utf-8')
+            except OSError as e:
+                raise CommandError(str(e))
+            with stream:
+                importer.import_rows(read_rows(stream, format), progress)
+
+        for error in importer.errors:
+            self.stdout.write(self.style.WARNING(f'Skipped {error}'))
+        if importer.invalid > len(importer.errors):
+            self.stdout.write(self.style.WARNING(f'... and {importer.invalid - len(importer.errors)} more invalid rows'))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nImported {importer.created} questions in {time.monotonic() - started:.1f}s '
+                f'({importer.duplicates} duplicates, {importer.invalid} invalid rows skipped)'
+            )
+        )
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from quiz.idempotency import prune
+
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses older than QUIZ_IDEMPOTENCY_KEY_TTL'
+
+    def handle(self, *args, **options):
+        deleted = prune()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} expired idempotency keys'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from quiz.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount the denormalized question and quiz counters and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the drifted rows')
+
+    def handle(self, *args, **options):
+        drift = reconcile(dry_run=options['dry_run'])
+        summary = ', '.join(f'{count} {name}' for name, count in drift.items())
+
+        if not any(drift.values()):
+            self.stdout.write(self.style.SUCCESS('All counters are correct'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Drifted counters: {summary}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Fixed drifted counters: {summary}'))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from quiz.benchmarks import benchmark_user, default_endpoints, run_benchmarks
+import json
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot API endpoints and report latency percentiles, queries and memory as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint first')
+        parser.add_argument('--memory-iterations', type=int, default=5, help='Requests traced for memory per endpoint')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Only run this endpoint (repeatable)')
+        parser.add_argument('--user', help='Username to run as (default: the first student with selected topics)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the randomly picked quizzes')
+        parser.add_argument('--label', help='Free-form label stored with the results')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        endpoints = default_endpoints()
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - {endpoint.name for endpoint in endpoints}
+            if unknown:
+                raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+            endpoints = [endpoint for endpoint in endpoints if endpoint.name in options['endpoints']]
+
+        try:
+            user = benchmark_user(options['user'])
+        except Exception as e:
+            raise CommandError(str(e))
+
+        results = run_benchmarks(
+            user,
+            endpoints,
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            memory_iterations=options['memory_iterations'],
+            seed=options['seed'],
+            label=options['label']
+        )
+
+        if not options['output']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        for name, result in results['endpoints'].items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f'{name:<24} p50 {latency["p50"]:>9.2f}ms  p95 {latency["p95"]:>9.2f}ms  p99 {latency["p99"]:>9.2f}ms  '
+                f'{result["queries"]["median"]:>4} queries  {result["peak_memory_kb"]:>9} KB'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
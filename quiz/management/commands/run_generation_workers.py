@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from quiz.jobs import run_next_job
+import os
+import socket
+import threading
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of workers that process queued question generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of worker threads in this process')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=(f'{prefix}:{number}', options['poll_interval'], options['once']),
+                name=f'generation-worker-{number}',
+                daemon=True
+            )
+            for number in range(options['workers'])
+        ]
+
+        self.stdout.write(self.style.SUCCESS(f'Starting {len(threads)} generation workers ({prefix})'))
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Stopping workers after their current job...'))
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
+
+    def work(self, worker, poll_interval, once):
+        """Claim and run jobs until stopped, or until the queue is empty with --once"""
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = run_next_job(worker)
+                if job is None:
+                    if once:
+                        break
+                    self.stop.wait(poll_interval)
+                    continue
+
+                style = self.style.SUCCESS if job.status == 'completed' else self.style.ERROR
+                self.stdout.write(style(
+                    f'[{worker}] Job {job.id} {job.status}: '
+                    f'{job.generated_count}/{job.num_questions} questions for quiz {job.quiz_id}'
+                ))
+        finally:
+            connection.close()
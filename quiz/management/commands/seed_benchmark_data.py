@@ -0,0 +1,147 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.models import UserProfile, UserTopic
+from quiz.models import Subject, Topic, Quiz, Question
+from quiz.catalog import CATALOG_VERSION
+from quiz.sampling import INDEX_VERSION
+from quiz.versions import bump_version_on_commit, deferred_bumps
+import random
+import time
+
+# Every seeded row is named with this prefix so it can be told apart and removed
+PREFIX = 'Benchmark'
+
+WORDS = (
+    'acid angle area atom balance cell charge circle current density energy equation force fraction function '
+    'gradient graph heat interest island light market mass matrix motion nation number oxygen percentage '
+    'pressure prime probability profit radius ratio reaction river sample sequence set slope solution '
+    'speed square temperature triangle vector velocity volume wave weight'
+).split()
+
+# A topic holds at most one quiz per difficulty and type
+QUIZ_SLOTS = [(difficulty, wassce) for wassce in (True, False) for difficulty in ('Easy', 'Medium', 'Hard')]
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load a reproducible synthetic question bank for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subjects', type=int, default=10, help='Number of subjects')
+        parser.add_argument('--topics', type=int, default=50, help='Topics per subject')
+        parser.add_argument('--quizzes', type=int, default=1000, help='Total number of quizzes')
+        parser.add_argument('--questions', type=int, default=50, help='Questions per quiz')
+        parser.add_argument('--users', type=int, default=10, help='Students with a topic selection')
+        parser.add_argument('--user-topics', type=int, default=20, help='Topics selected by each student')
+        parser.add_argument('--wassce-ratio', type=float, default=0.6, help='Share of WASSCE quizzes')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, so runs are reproducible')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded data first')
+
+    @deferred_bumps()
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        started = time.monotonic()
+
+        if options['clear']:
+            self.clear()
+
+        if options['quizzes'] > len(QUIZ_SLOTS) * options['subjects'] * options['topics']:
+            raise CommandError(f'At most {len(QUIZ_SLOTS)} quizzes per topic fit; add topics or lower --quizzes.')
+
+        if Subject.objects.filter(name__startswith=PREFIX).exists():
+            self.stdout.write(self.style.ERROR('Benchmark data already exists. Run again with --clear to replace it.'))
+            return
+
+        with transaction.atomic():
+            subjects = Subject.objects.bulk_create([
+                Subject(name=f'{PREFIX} Subject {number}') for number in range(options['subjects'])
+            ])
+            topics = Topic.objects.bulk_create([
+                Topic(name=f'{PREFIX} Topic {subject_number}.{number}', subject=subject)
+                for subject_number, subject in enumerate(subjects)
+                for number in range(options['topics'])
+            ], batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Created {len(subjects)} subjects and {len(topics)} topics'))
+
+        quiz_ids = []
+        used_slots = {}
+        for offset in range(0, options['quizzes'], batch_size):
+            quizzes = []
+            for number in range(offset, min(offset + batch_size, options['quizzes'])):
+                topic = topics[number % len(topics)]
+                free = [slot for slot in QUIZ_SLOTS if slot not in used_slots.setdefault(topic.id, set())]
+                wassce = rng.random() < options['wassce_ratio']
+                difficulty, wassce = rng.choice([slot for slot in free if slot[1] == wassce] or free)
+                used_slots[topic.id].add((difficulty, wassce))
+                quizzes.append(Quiz(
+                    title=f'{PREFIX} Quiz {number} - {topic.name}',
+                    topic=topic,
+                    class_level=rng.choice(['Grade 10', 'Grade 11', 'Grade 12']),
+                    difficulty=difficulty,
+                    duration_minutes=rng.choice([10, 15, 20]),
+                    description=f'Synthetic {difficulty.lower()} quiz on {topic.name}',
+                    is_wassce_related=wassce,
+                    num_of_questions=options['questions']
+                ))
+            quiz_ids.extend(quiz.id for quiz in Quiz.objects.bulk_create(quizzes))
+        self.stdout.write(self.style.SUCCESS(f'Created {len(quiz_ids)} quizzes'))
+
+        total_questions = len(quiz_ids) * options['questions']
+        questions = []
+        created_questions = 0
+        for quiz_id in quiz_ids:
+            for number in range(options['questions']):
+                words = ' '.join(rng.choice(WORDS) for _ in range(10))
+                questions.append(Question(
+                    quiz_id=quiz_id,
+                    question_text=f'Question {quiz_id}.{number}: which statement about {words} is correct?',
+                    option_a=' '.join(rng.choice(WORDS) for _ in range(4)),
+                    option_b=' '.join(rng.choice(WORDS) for _ in range(4)),
+                    option_c=' '.join(rng.choice(WORDS) for _ in range(4)),
+                    option_d=' '.join(rng.choice(WORDS) for _ in range(4)),
+                    correct_answer=rng.choice('ABCD'),
+                    explanation=' '.join(rng.choice(WORDS) for _ in range(20)),
+                    is_ai_generated=rng.random() < 0.5
+                ))
+                if len(questions) >= batch_size:
+                    created_questions += self.insert_questions(questions)
+                    questions = []
+                    self.stdout.write(f'  {created_questions}/{total_questions} questions')
+        if questions:
+            created_questions += self.insert_questions(questions)
+        self.stdout.write(self.style.SUCCESS(f'Created {created_questions} questions'))
+
+        for number in range(options['users']):
+            username = f'{PREFIX.lower()}_user_{number}'
+            user, created = User.objects.get_or_create(username=username)
+            if created:
+                user.set_password(username)
+                user.save()
+            selected = rng.sample(topics, min(options['user_topics'], len(topics)))
+            selected_topics = {}
+            for topic in selected:
+                selected_topics.setdefault(topic.subject.name, []).append(topic.name)
+            user.profile.set_selected_topics(selected_topics, [topic.id for topic in selected])
+        self.stdout.write(self.style.SUCCESS(f'Created {options["users"]} students with topic selections'))
+
+        # Bulk inserts do not send the signals that invalidate the sampling index and catalog
+        bump_version_on_commit(INDEX_VERSION, CATALOG_VERSION)
+        self.stdout.write(self.style.SUCCESS(f'\nSeeded benchmark data in {time.monotonic() - started:.1f}s'))
+
+    def insert_questions(self, questions):
+        with transaction.atomic():
+            Question.objects.bulk_create(questions)
+        return len(questions)
+
+    def clear(self):
+        UserTopic.objects.filter(profile__user__username__startswith=f'{PREFIX.lower()}_user_').delete()
+        UserProfile.objects.filter(user__username__startswith=f'{PREFIX.lower()}_user_').update(
+            selected_topics={}, selected_topic_ids=[], is_user_topics_selected=False
+        )
+        # Questions first, as a single DELETE instead of collecting millions of rows through the cascade
+        deleted, _ = Question.objects.filter(quiz__topic__subject__name__startswith=PREFIX).delete()
+        deleted += Subject.objects.filter(name__startswith=PREFIX).delete()[0]
+        bump_version_on_commit(INDEX_VERSION, CATALOG_VERSION)
+        self.stdout.write(self.style.WARNING(f'Deleted {deleted} rows of previous benchmark data'))
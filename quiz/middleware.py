@@ -0,0 +1,31 @@
+"""
+Request middleware for the quiz app.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .versions import adeferred_bumps, deferred_bumps
+
+
+class DeferredVersionsMiddleware:
+    """
+    Runs each request inside ``deferred_bumps()``, so a request that saves
+    many quizzes bumps the catalog and sampling index stamps once instead of
+    once per row.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with deferred_bumps():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        async with adeferred_bumps():
+            return await self.get_response(request)
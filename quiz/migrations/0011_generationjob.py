@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-17 01:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_rename_total_questions_quiz_num_of_questions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('fill_quiz', 'Fill quiz'), ('single_question', 'Single question')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('num_questions', models.PositiveIntegerField(help_text='Number of new questions to generate')),
+                ('target_count', models.PositiveIntegerField(blank=True, help_text='Total questions the quiz should not grow beyond', null=True)),
+                ('generated_count', models.PositiveIntegerField(default=0)),
+                ('question_ids', models.JSONField(blank=True, default=list, help_text='Questions created so far')),
+                ('failures', models.JSONField(blank=True, default=list)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Rounds that produced no usable question')),
+                ('max_attempts', models.PositiveIntegerField(default=3)),
+                ('error', models.TextField(blank=True)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generation_jobs', to='quiz.quiz')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generation_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='generationjob_status_idx')],
+            },
+        ),
+    ]
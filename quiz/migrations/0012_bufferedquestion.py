@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-17 01:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_generationjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='generationjob',
+            name='kind',
+            field=models.CharField(choices=[('fill_quiz', 'Fill quiz'), ('single_question', 'Single question'), ('fill_buffer', 'Fill buffer')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='BufferedQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField(help_text='Question in the QuizGenerator dictionary format')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buffered_questions', to='quiz.quiz')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
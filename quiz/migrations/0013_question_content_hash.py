@@ -0,0 +1,49 @@
+# Generated by Django 5.0.2 on 2026-10-17 01:53
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+
+def backfill_content_hash(apps, schema_editor):
+    """
+    Hash the text of existing questions. When a quiz already holds exact
+    duplicates only the oldest one gets a hash, so the unique constraint can
+    be added without deleting anything.
+    """
+    Question = apps.get_model('quiz', 'Question')
+    seen = set()
+    batch = []
+    for question in Question.objects.order_by('id').only('id', 'quiz_id', 'question_text').iterator(chunk_size=2000):
+        normalized = ' '.join(re.sub(r'[^\w]+', ' ', question.question_text.lower()).split())
+        content_hash = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+        if (question.quiz_id, content_hash) in seen:
+            continue
+        seen.add((question.quiz_id, content_hash))
+        question.content_hash = content_hash
+        batch.append(question)
+        if len(batch) >= 2000:
+            Question.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    Question.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0012_bufferedquestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Hash of the normalized question text', max_length=40, null=True),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='question',
+            constraint=models.UniqueConstraint(fields=('quiz', 'content_hash'), name='unique_question_content'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-17 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0013_question_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
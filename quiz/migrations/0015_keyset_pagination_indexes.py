@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-17 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0014_question_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['created_at', 'id'], name='question_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['created_at', 'id'], name='quiz_created_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.2 on 2026-10-17 02:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, outer_field, filter=None):
+    rows = model.objects.filter(**{outer_field: OuterRef('pk')})
+    if filter is not None:
+        rows = rows.filter(filter)
+    counts = rows.order_by().values(outer_field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    """
+    Fill the new counters with one correlated UPDATE per table.
+    """
+    Subject = apps.get_model('quiz', 'Subject')
+    Topic = apps.get_model('quiz', 'Topic')
+    Quiz = apps.get_model('quiz', 'Quiz')
+    Question = apps.get_model('quiz', 'Question')
+
+    Quiz.objects.update(
+        question_total=count_subquery(Question, 'quiz'),
+        ai_question_total=count_subquery(Question, 'quiz', Q(is_ai_generated=True))
+    )
+    Topic.objects.update(quiz_count=count_subquery(Quiz, 'topic'))
+    Subject.objects.update(quiz_count=count_subquery(Quiz, 'topic__subject'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0015_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='ai_question_total',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='AI-generated questions in the quiz'),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='question_total',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Questions in the quiz, maintained by quiz.counters'),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='quiz_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Maintained by quiz.counters'),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='quiz_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Maintained by quiz.counters'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.0.2 on 2026-10-17 02:07
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, outer_field, filter=None):
+    rows = model.objects.filter(**{outer_field: OuterRef('pk')})
+    if filter is not None:
+        rows = rows.filter(filter)
+    counts = rows.order_by().values(outer_field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+def merge_duplicate_quizzes(apps, schema_editor):
+    """
+    Fold quizzes sharing a topic, difficulty and type into the oldest one
+    before the constraint is added.  Their questions, buffered questions and
+    jobs move to the kept quiz; questions it already has are dropped.
+    """
+    Subject = apps.get_model('quiz', 'Subject')
+    Topic = apps.get_model('quiz', 'Topic')
+    Quiz = apps.get_model('quiz', 'Quiz')
+    Question = apps.get_model('quiz', 'Question')
+    BufferedQuestion = apps.get_model('quiz', 'BufferedQuestion')
+    GenerationJob = apps.get_model('quiz', 'GenerationJob')
+
+    groups = (
+        Quiz.objects.order_by().values('topic_id', 'difficulty', 'is_wassce_related')
+        .annotate(count=Count('id'), keep_id=Min('id')).filter(count__gt=1)
+    )
+    kept_ids = []
+    for group in groups:
+        duplicates = list(
+            Quiz.objects.filter(
+                topic_id=group['topic_id'], difficulty=group['difficulty'], is_wassce_related=group['is_wassce_related']
+            ).exclude(pk=group['keep_id']).values_list('id', flat=True)
+        )
+        hashes = set(
+            Question.objects.filter(quiz_id=group['keep_id'], content_hash__isnull=False)
+            .values_list('content_hash', flat=True)
+        )
+        for question in Question.objects.filter(quiz_id__in=duplicates).order_by('id').only('id', 'content_hash'):
+            if question.content_hash is not None and question.content_hash in hashes:
+                question.delete()
+                continue
+            hashes.add(question.content_hash)
+            Question.objects.filter(pk=question.pk).update(quiz_id=group['keep_id'])
+        BufferedQuestion.objects.filter(quiz_id__in=duplicates).update(quiz_id=group['keep_id'])
+        GenerationJob.objects.filter(quiz_id__in=duplicates).update(quiz_id=group['keep_id'])
+        Quiz.objects.filter(pk__in=duplicates).delete()
+        kept_ids.append(group['keep_id'])
+
+    if not kept_ids:
+        return
+    Quiz.objects.filter(pk__in=kept_ids).update(
+        question_total=count_subquery(Question, 'quiz'),
+        ai_question_total=count_subquery(Question, 'quiz', Q(is_ai_generated=True))
+    )
+    Topic.objects.update(quiz_count=count_subquery(Quiz, 'topic'))
+    Subject.objects.update(quiz_count=count_subquery(Quiz, 'topic__subject'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0016_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_quizzes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quiz',
+            constraint=models.UniqueConstraint(fields=('topic', 'difficulty', 'is_wassce_related'), name='unique_quiz_per_topic_level'),
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 5.0.2 on 2026-10-17 02:17
+
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models
+
+FTS_TABLE = 'quiz_searchdocument_fts'
+
+POSTGRES_INDEX = [
+    # Title words rank above body words; 'english' must match quiz.search.SEARCH_CONFIG
+    """
+    ALTER TABLE quiz_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', body), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX quiz_searchdocument_vector_idx ON quiz_searchdocument USING GIN (search_vector)',
+]
+
+SQLITE_INDEX = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, body, content='quiz_searchdocument', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER quiz_searchdocument_ai AFTER INSERT ON quiz_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER quiz_searchdocument_ad AFTER DELETE ON quiz_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER quiz_searchdocument_au AFTER UPDATE ON quiz_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Index the documents with the database's own full-text search.  Neither
+    index is part of the model, so they survive only as long as Django does
+    not rebuild the table; a later migration altering SearchDocument on
+    SQLite has to recreate the triggers.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_INDEX
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_INDEX[0])
+        except OperationalError:
+            # SQLite built without FTS5: searches fall back to icontains
+            return
+        statements = SQLITE_INDEX[1:]
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS quiz_searchdocument_vector_idx')
+        schema_editor.execute('ALTER TABLE quiz_searchdocument DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS quiz_searchdocument_{trigger}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def backfill_search_documents(apps, schema_editor):
+    Quiz = apps.get_model('quiz', 'Quiz')
+    Question = apps.get_model('quiz', 'Question')
+    SearchDocument = apps.get_model('quiz', 'SearchDocument')
+
+    documents = []
+    quizzes = Quiz.objects.order_by('id').values_list('id', 'title', 'description', 'topic__name', 'topic__subject__name')
+    for quiz_id, title, description, topic, subject in quizzes.iterator(chunk_size=2000):
+        body = '\n'.join(part for part in (description, topic, subject) if part)
+        documents.append(SearchDocument(kind='quiz', quiz_id=quiz_id, title=title, body=body))
+        if len(documents) >= 2000:
+            SearchDocument.objects.bulk_create(documents)
+            documents = []
+
+    questions = Question.objects.order_by('id').values_list('id', 'quiz_id', 'question_text', 'explanation')
+    for question_id, quiz_id, text, explanation in questions.iterator(chunk_size=2000):
+        documents.append(SearchDocument(kind='question', quiz_id=quiz_id, question_id=question_id, title=text, body=explanation))
+        if len(documents) >= 2000:
+            SearchDocument.objects.bulk_create(documents)
+            documents = []
+    SearchDocument.objects.bulk_create(documents)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0017_unique_quiz_per_topic_level'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('quiz', 'Quiz'), ('question', 'Question')], max_length=10)),
+                ('title', models.TextField()),
+                ('body', models.TextField(blank=True)),
+                ('question', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='quiz.question')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='quiz.quiz')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(condition=models.Q(('kind', 'quiz')), fields=('quiz',), name='unique_quiz_search_document'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,143 @@
+# Generated by Django 5.0.2 on 2026-10-17 02:21
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, outer_field, filter=None):
+    rows = model.objects.filter(**{outer_field: OuterRef('pk')})
+    if filter is not None:
+        rows = rows.filter(filter)
+    counts = rows.order_by().values(outer_field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+def fold_quiz(apps, keep_id, duplicate_id):
+    """Move the questions, buffer and jobs of one quiz into another, as in 0017."""
+    Quiz = apps.get_model('quiz', 'Quiz')
+    Question = apps.get_model('quiz', 'Question')
+    BufferedQuestion = apps.get_model('quiz', 'BufferedQuestion')
+    GenerationJob = apps.get_model('quiz', 'GenerationJob')
+    SearchDocument = apps.get_model('quiz', 'SearchDocument')
+
+    hashes = set(
+        Question.objects.filter(quiz_id=keep_id, content_hash__isnull=False).values_list('content_hash', flat=True)
+    )
+    for question in Question.objects.filter(quiz_id=duplicate_id).order_by('id').only('id', 'content_hash'):
+        if question.content_hash is not None and question.content_hash in hashes:
+            question.delete()
+            continue
+        hashes.add(question.content_hash)
+        Question.objects.filter(pk=question.pk).update(quiz_id=keep_id)
+        SearchDocument.objects.filter(question_id=question.pk).update(quiz_id=keep_id)
+    BufferedQuestion.objects.filter(quiz_id=duplicate_id).update(quiz_id=keep_id)
+    GenerationJob.objects.filter(quiz_id=duplicate_id).update(quiz_id=keep_id)
+    Quiz.objects.filter(pk=duplicate_id).delete()
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """
+    Fold subjects sharing a name, then topics sharing a subject and name, into
+    the oldest one before the constraints are added.  Quizzes move to the kept
+    topic, or fold into its quiz of the same difficulty and type; students who
+    picked a duplicate topic keep it selected under the kept one.
+    """
+    Subject = apps.get_model('quiz', 'Subject')
+    Topic = apps.get_model('quiz', 'Topic')
+    Quiz = apps.get_model('quiz', 'Quiz')
+    Question = apps.get_model('quiz', 'Question')
+    UserTopic = apps.get_model('accounts', 'UserTopic')
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+
+    subject_groups = (
+        Subject.objects.order_by().values('name').annotate(count=Count('id'), keep_id=Min('id')).filter(count__gt=1)
+    )
+    merged = False
+    for group in subject_groups:
+        duplicates = Subject.objects.filter(name=group['name']).exclude(pk=group['keep_id'])
+        Topic.objects.filter(subject__in=duplicates).update(subject_id=group['keep_id'])
+        duplicates.delete()
+        merged = True
+
+    topic_groups = (
+        Topic.objects.order_by().values('subject_id', 'name')
+        .annotate(count=Count('id'), keep_id=Min('id')).filter(count__gt=1)
+    )
+    renamed = {}
+    for group in topic_groups:
+        keep_id = group['keep_id']
+        duplicates = list(
+            Topic.objects.filter(subject_id=group['subject_id'], name=group['name'])
+            .exclude(pk=keep_id).values_list('id', flat=True)
+        )
+        for quiz in Quiz.objects.filter(topic_id__in=duplicates).order_by('id'):
+            kept = Quiz.objects.filter(
+                topic_id=keep_id, difficulty=quiz.difficulty, is_wassce_related=quiz.is_wassce_related
+            ).values_list('id', flat=True).first()
+            if kept is None:
+                Quiz.objects.filter(pk=quiz.pk).update(topic_id=keep_id)
+            else:
+                fold_quiz(apps, kept, quiz.pk)
+        for user_topic in UserTopic.objects.filter(topic_id__in=duplicates).order_by('id'):
+            if UserTopic.objects.filter(profile_id=user_topic.profile_id, topic_id=keep_id).exists():
+                user_topic.delete()
+            else:
+                UserTopic.objects.filter(pk=user_topic.pk).update(topic_id=keep_id)
+        Topic.objects.filter(pk__in=duplicates).delete()
+        renamed.update((topic_id, keep_id) for topic_id in duplicates)
+        merged = True
+
+    if renamed:
+        for profile in UserProfile.objects.exclude(selected_topic_ids=[]).only('id', 'selected_topic_ids'):
+            topic_ids = sorted({renamed.get(topic_id, topic_id) for topic_id in profile.selected_topic_ids})
+            if topic_ids != profile.selected_topic_ids:
+                UserProfile.objects.filter(pk=profile.pk).update(selected_topic_ids=topic_ids)
+
+    if not merged:
+        return
+    Quiz.objects.update(
+        question_total=count_subquery(Question, 'quiz'),
+        ai_question_total=count_subquery(Question, 'quiz', Q(is_ai_generated=True))
+    )
+    Topic.objects.update(quiz_count=count_subquery(Quiz, 'topic'))
+    Subject.objects.update(quiz_count=count_subquery(Quiz, 'topic__subject'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0018_search_documents'),
+        ('accounts', '0005_backfill_user_topics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='subject',
+            name='name',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='generationjob',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'running'])), fields=['quiz', 'kind'], name='generationjob_active_quiz_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['is_wassce_related', 'created_at', 'id'], name='quiz_wassce_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['title', 'id'], name='quiz_title_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['topic', 'is_wassce_related', 'difficulty', 'class_level'], name='quiz_feed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='topic',
+            constraint=models.UniqueConstraint(fields=('subject', 'name'), name='unique_topic_per_subject'),
+        ),
+    ]
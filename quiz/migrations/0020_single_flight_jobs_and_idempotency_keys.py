@@ -0,0 +1,65 @@
+# Generated by Django 5.0.2 on 2026-10-17 02:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.utils import timezone
+
+
+def finish_duplicate_fill_jobs(apps, schema_editor):
+    """
+    Leave one unfinished fill job per quiz and kind, the oldest, before the
+    constraint is added.  The others are marked failed.
+    """
+    GenerationJob = apps.get_model('quiz', 'GenerationJob')
+
+    active = GenerationJob.objects.filter(status__in=['pending', 'running'], kind__in=['fill_quiz', 'fill_buffer'])
+    groups = (
+        active.order_by().values('quiz_id', 'kind')
+        .annotate(count=Count('id'), keep_id=Min('id')).filter(count__gt=1)
+    )
+    for group in groups:
+        active.filter(quiz_id=group['quiz_id'], kind=group['kind']).exclude(pk=group['keep_id']).update(
+            status='failed', error=f'Superseded by job {group["keep_id"]}', finished_at=timezone.now()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0019_catalog_uniqueness_and_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('fingerprint', models.CharField(help_text='Hash of the method, path and body of the request', max_length=64)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, help_text='Empty while the request runs', null=True)),
+                ('response', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.RunPython(finish_duplicate_fill_jobs, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='generationjob',
+            name='generationjob_active_quiz_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='generationjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('kind__in', ['fill_quiz', 'fill_buffer']), ('status__in', ['pending', 'running'])), fields=('quiz', 'kind'), name='unique_active_fill_job'),
+        ),
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='idempotencykey',
+            constraint=models.UniqueConstraint(fields=('user', 'key'), name='unique_idempotency_key_per_user'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0020_single_flight_jobs_and_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BufferOutcome',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('outcome', models.CharField(choices=[('buffer', 'Buffer'), ('bank', 'Bank'), ('generated', 'Generated')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buffer_outcomes', to='quiz.quiz')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='bufferoutcome',
+            constraint=models.UniqueConstraint(fields=('quiz', 'outcome'), name='unique_buffer_outcome_per_quiz'),
+        ),
+    ]
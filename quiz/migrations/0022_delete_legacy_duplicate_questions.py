@@ -0,0 +1,53 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:31
+
+import hashlib
+import re
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, outer_field, filter=None):
+    rows = model.objects.filter(**{outer_field: OuterRef('pk')})
+    if filter is not None:
+        rows = rows.filter(filter)
+    counts = rows.order_by().values(outer_field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+def delete_duplicate_questions(apps, schema_editor):
+    """
+    Delete the exact duplicates 0013 left without a hash, which could not be
+    saved again without breaking ``unique_question_content``.  Questions that
+    no longer duplicate anything in their quiz get their hash instead.
+    """
+    Quiz = apps.get_model('quiz', 'Quiz')
+    Question = apps.get_model('quiz', 'Question')
+
+    quiz_ids = set()
+    for question in Question.objects.filter(content_hash__isnull=True).order_by('id').only('id', 'quiz_id', 'question_text'):
+        normalized = ' '.join(re.sub(r'[^\w]+', ' ', question.question_text.lower()).split())
+        content_hash = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+        if Question.objects.filter(quiz_id=question.quiz_id, content_hash=content_hash).exists():
+            Question.objects.filter(pk=question.pk).delete()
+            quiz_ids.add(question.quiz_id)
+        else:
+            Question.objects.filter(pk=question.pk).update(content_hash=content_hash)
+
+    if quiz_ids:
+        Quiz.objects.filter(pk__in=quiz_ids).update(
+            question_total=count_subquery(Question, 'quiz'),
+            ai_question_total=count_subquery(Question, 'quiz', Q(is_ai_generated=True))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0021_buffer_outcomes'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_questions, migrations.RunPython.noop),
+    ]
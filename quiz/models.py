@@ -1,22 +1,71 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count
 from django.utils import timezone
+from .counters import (
+    adjust_question_counts, adjust_quiz_counts, question_deltas, quiz_deltas, recount_questions, recount_quizzes
+)
+from .dedup import content_hash
+from .search import index_questions, index_quizzes, index_unindexed_questions
 
 # Create your models here.
 
-class Subject(models.Model):
-    name = models.CharField(max_length=100)
+class CounterFieldsMixin:
+    """
+    Leaves ``counter_fields`` out of ``save()`` of existing rows.  The
+    counters are changed with ``F()`` updates, so the values on an instance
+    may be stale and must not be written back.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+class Subject(CounterFieldsMixin, models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    quiz_count = models.PositiveIntegerField(default=0, editable=False, help_text="Maintained by quiz.counters")
+
+    counter_fields = ('quiz_count',)
     
     def __str__(self):
         return self.name
     
-class Topic(models.Model):
+class Topic(CounterFieldsMixin, models.Model):
     name = models.CharField(max_length=100)
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='topics')
+    quiz_count = models.PositiveIntegerField(default=0, editable=False, help_text="Maintained by quiz.counters")
+
+    counter_fields = ('quiz_count',)
+
+    class Meta:
+        constraints = [
+            # Topics are looked up by subject and name, e.g. when students pick their topics
+            models.UniqueConstraint(fields=['subject', 'name'], name='unique_topic_per_subject'),
+        ]
     
     def __str__(self):
         return self.name
 
-class Quiz(models.Model):
+class QuizQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic():
+            created = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # Skipped or updated rows are unknown, so count instead
+                recount_quizzes(obj.topic_id for obj in objs)
+            else:
+                adjust_quiz_counts(quiz_deltas(obj.topic_id for obj in objs))
+            # Inserted and updated rows get their primary keys set
+            index_quizzes(obj.pk for obj in objs)
+        return created
+
+class Quiz(CounterFieldsMixin, models.Model):
     CLASS_LEVEL_CHOICES = [
         ('Grade 10', 'Grade 10'),
         ('Grade 11', 'Grade 11'),
@@ -36,19 +85,73 @@ class Quiz(models.Model):
     description = models.TextField(blank=True)
     is_wassce_related = models.BooleanField(default=True)
     num_of_questions = models.PositiveIntegerField(default=0)
+    question_total = models.PositiveIntegerField(default=0, editable=False, help_text="Questions in the quiz, maintained by quiz.counters")
+    ai_question_total = models.PositiveIntegerField(default=0, editable=False, help_text="AI-generated questions in the quiz")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = QuizQuerySet.as_manager()
+    counter_fields = ('question_total', 'ai_question_total')
     
     class Meta:
         verbose_name_plural = "Quizzes"
         ordering = ['-created_at']
+        constraints = [
+            # One quiz per topic, difficulty and type, the key generate_quizzes upserts on
+            models.UniqueConstraint(fields=['topic', 'difficulty', 'is_wassce_related'], name='unique_quiz_per_topic_level'),
+        ]
+        indexes = [
+            # Keyset pagination of the quiz list, unfiltered, by type and by title
+            models.Index(fields=['created_at', 'id'], name='quiz_created_at_id_idx'),
+            models.Index(fields=['is_wassce_related', 'created_at', 'id'], name='quiz_wassce_created_idx'),
+            models.Index(fields=['title', 'id'], name='quiz_title_id_idx'),
+            # The feed filters; also covers the scan that builds the sampling index
+            models.Index(fields=['topic', 'is_wassce_related', 'difficulty', 'class_level'], name='quiz_feed_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.topic.name})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the quiz signals notice a move to another topic
+        instance._loaded_topic_id = instance.__dict__.get('topic_id')
+        return instance
+
     @property
     def question_count(self):
-        return self.questions.count()
+        return self.question_total
+
+class QuestionQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # save() is not called for bulk inserts, so fill in the hashes and
+        # adjust the quiz counters here
+        objs = list(objs)
+        for obj in objs:
+            if not obj.content_hash:
+                obj.content_hash = content_hash(obj.question_text)
+        with transaction.atomic():
+            created = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # Skipped or updated rows are unknown, so count instead
+                recount_questions(obj.quiz_id for obj in objs)
+                # Primary keys of the inserted rows are not reported
+                index_unindexed_questions(obj.quiz_id for obj in objs)
+            else:
+                adjust_question_counts(question_deltas((obj.quiz_id, obj.is_ai_generated, 1) for obj in objs))
+                index_questions(obj.pk for obj in objs)
+        return created
+
+    def delete(self):
+        with transaction.atomic():
+            removed = list(
+                self.order_by().values('quiz_id', 'is_ai_generated').annotate(count=Count('id'))
+                .values_list('quiz_id', 'is_ai_generated', 'count')
+            )
+            result = super().delete()
+            adjust_question_counts(question_deltas((quiz_id, is_ai, -count) for quiz_id, is_ai, count in removed))
+        return result
 
 class Question(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='questions')
@@ -60,14 +163,226 @@ class Question(models.Model):
     correct_answer = models.CharField(max_length=1)  # 'A', 'B', 'C', or 'D'
     explanation = models.TextField()
     is_ai_generated = models.BooleanField(default=False)
+    content_hash = models.CharField(max_length=40, null=True, blank=True, editable=False, help_text="Hash of the normalized question text")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     # expires_at = models.DateTimeField(null=True, blank=True)
+
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'content_hash'], name='unique_question_content'),
+        ]
+        indexes = [
+            # Keyset pagination of the question list
+            models.Index(fields=['created_at', 'id'], name='question_created_at_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.quiz.title} - {self.question_text[:50]}..."
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_counted = (instance.__dict__.get('quiz_id'), instance.__dict__.get('is_ai_generated'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.content_hash = content_hash(self.question_text)
+        adding = self._state.adding
+        counted = (self.quiz_id, self.is_ai_generated)
+        loaded = getattr(self, '_loaded_counted', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                adjust_question_counts(question_deltas([(*counted, 1)]))
+            elif loaded is not None and None not in loaded and loaded != counted:
+                # Moved to another quiz or flagged differently
+                adjust_question_counts(question_deltas([(*loaded, -1), (*counted, 1)]))
+        self._loaded_counted = counted
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            adjust_question_counts(question_deltas([(self.quiz_id, self.is_ai_generated, -1)]))
+        return result
+
+    @classmethod
+    def from_generated(cls, quiz, question_data):
+        """
+        Build an unsaved question from a QuizGenerator question dictionary.
+        """
+        return cls(
+            quiz=quiz,
+            question_text=question_data['question'],
+            option_a=question_data['options']['A'],
+            option_b=question_data['options']['B'],
+            option_c=question_data['options']['C'],
+            option_d=question_data['options']['D'],
+            correct_answer=question_data['correct_answer'],
+            explanation=question_data['explanation'],
+            is_ai_generated=True
+        )
+
+    def as_generated(self):
+        """
+        Return the question in the QuizGenerator dictionary format.
+        """
+        return {
+            'question': self.question_text,
+            'options': {
+                'A': self.option_a,
+                'B': self.option_b,
+                'C': self.option_c,
+                'D': self.option_d
+            },
+            'correct_answer': self.correct_answer,
+            'explanation': self.explanation
+        }
     
     # def save(self, *args, **kwargs):
     #     if not self.expires_at:
     #         # Set expiration to 24 hours from creation
     #         self.expires_at = timezone.now() + timezone.timedelta(hours=24)
-    #     super().save(*args, **kwargs)
\ No newline at end of file
+    #     super().save(*args, **kwargs)
+
+class GenerationJob(models.Model):
+    """
+    A queued request to generate questions for a quiz, run by the
+    ``run_generation_workers`` command.
+    """
+    KIND_CHOICES = [
+        ('fill_quiz', 'Fill quiz'),
+        ('single_question', 'Single question'),
+        ('fill_buffer', 'Fill buffer'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='generation_jobs')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, related_name='generation_jobs', null=True, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    num_questions = models.PositiveIntegerField(help_text="Number of new questions to generate")
+    target_count = models.PositiveIntegerField(null=True, blank=True, help_text="Total questions the quiz should not grow beyond")
+    generated_count = models.PositiveIntegerField(default=0)
+    question_ids = models.JSONField(default=list, blank=True, help_text="Questions created so far")
+    failures = models.JSONField(default=list, blank=True)
+    attempts = models.PositiveIntegerField(default=0, help_text="Rounds that produced no usable question")
+    max_attempts = models.PositiveIntegerField(default=3)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='generationjob_status_idx'),
+        ]
+        constraints = [
+            # One unfinished fill job per quiz and kind, shared by concurrent
+            # requests (see jobs.coalesce_generation); also indexes them
+            models.UniqueConstraint(
+                fields=['quiz', 'kind'],
+                condition=models.Q(status__in=['pending', 'running'], kind__in=['fill_quiz', 'fill_buffer']),
+                name='unique_active_fill_job'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job for {self.quiz.title} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+class BufferedQuestion(models.Model):
+    """
+    A generated question waiting to be served by generate_next_question.
+    Each buffered question is served at most once and then deleted.
+    """
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='buffered_questions')
+    payload = models.JSONField(help_text="Question in the QuizGenerator dictionary format")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.quiz.title} - {self.payload.get('question', '')[:50]}..."
+
+class BufferOutcome(models.Model):
+    """
+    How many generate_next_question requests for a quiz were served from each
+    source, counted with ``F()`` updates so every worker adds to the same row
+    (see quiz.buffer).
+    """
+    OUTCOME_CHOICES = [
+        ('buffer', 'Buffer'),
+        ('bank', 'Bank'),
+        ('generated', 'Generated'),
+    ]
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='buffer_outcomes')
+    outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'outcome'], name='unique_buffer_outcome_per_quiz'),
+        ]
+
+    def __str__(self):
+        return f"{self.quiz.title} - {self.outcome}: {self.count}"
+
+class IdempotencyKey(models.Model):
+    """
+    The response to a request sent with an ``Idempotency-Key`` header,
+    replayed when the client retries it (see quiz.idempotency).
+    """
+    key = models.CharField(max_length=255)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', null=True, blank=True)
+    fingerprint = models.CharField(max_length=64, help_text="Hash of the method, path and body of the request")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Empty while the request runs")
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+
+    def __str__(self):
+        return self.key
+
+class SearchDocument(models.Model):
+    """
+    Text of a quiz or question for full-text search, kept in sync by
+    ``quiz.search``.  On PostgreSQL the table also has a generated
+    ``search_vector`` tsvector column with a GIN index, on SQLite an FTS5
+    table indexes it; both are created by migration 0018 and are not part of
+    the model.
+    """
+    KIND_CHOICES = [
+        ('quiz', 'Quiz'),
+        ('question', 'Question'),
+    ]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='search_documents')
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='search_document', null=True, blank=True)
+    title = models.TextField()
+    body = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz'], condition=models.Q(kind='quiz'), name='unique_quiz_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.title[:50]}"
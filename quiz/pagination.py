@@ -0,0 +1,108 @@
+"""
+Keyset (seek) pagination.
+
+Pages are selected with ``WHERE (field, id) < (last field, last id)`` on an
+indexed ordering instead of ``OFFSET``, so every page costs the same however
+deep the client scrolls.  The cursor is an opaque token holding the ordering
+field and the position of the last row of the previous page.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination on ``(ordering field, id)``.
+
+    The ordering comes from the view's ``OrderingFilter`` when the client
+    picks one, otherwise from ``ordering``.  Ties are broken by ``id`` in the
+    same direction, so the position is always unique.
+    """
+    ordering = '-created_at'
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'QUIZ_PAGE_SIZE', 20)
+        try:
+            requested = int(request.query_params.get(self.page_size_query_param, page_size))
+        except ValueError:
+            return page_size
+        return max(1, min(requested, self.max_page_size))
+
+    def get_ordering(self, request, queryset, view):
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return ordering[0]
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = self.get_ordering(request, queryset, view)
+        descending = ordering.startswith('-')
+        self.field_name = ordering.lstrip('-')
+        self.field = queryset.model._meta.get_field(self.field_name)
+        direction = '-' if descending else ''
+        queryset = queryset.order_by(f'{direction}{self.field_name}', f'{direction}id')
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, last_id = cursor
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field_name}__{lookup}': value}) |
+                Q(**{self.field_name: value, f'id__{lookup}': last_id})
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            field_name, value, last_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            if field_name != self.field_name:
+                raise ValueError('Cursor is for another ordering')
+            return self.field.to_python(value), int(last_id)
+        except (TypeError, ValueError, ValidationError, binascii.Error, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row):
+        position = [self.field_name, self.field.value_to_string(row), row.pk]
+        return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'page_size': self.page_size,
+            'results': data,
+        })
+
+
+class QuestionKeysetPagination(KeysetPagination):
+    ordering = 'created_at'
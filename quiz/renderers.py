@@ -0,0 +1,60 @@
+"""
+JSON renderer backed by orjson when it is installed.
+
+``FastJSONRenderer`` produces the same bytes as DRF's ``JSONRenderer`` for
+the payloads this API returns (strings, numbers, booleans, lists and
+dictionaries), several times faster.  Anything orjson does not handle the way
+DRF's encoder does (datetimes, lazy strings, decimals) goes through DRF's
+encoder, and indented output, non-string keys, oversized integers and a
+missing orjson fall back to ``JSONRenderer``.  So do payloads with a float
+that orjson writes differently: NaN and infinities (``null`` where DRF
+refuses them) and floats that ``json`` writes with an exponent (``1e+16``,
+``1e-05``).
+"""
+import math
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency, pip install orjson
+    orjson = None
+
+# Types orjson does not know, or (datetimes) formats differently, use DRF's encoding
+_default = JSONEncoder().default
+
+
+def _has_unportable_float(data):
+    """Whether ``data`` holds a float that orjson and ``json`` render differently"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, float):
+            # repr() switches to an exponent outside [1e-4, 1e16)
+            if not math.isfinite(value) or (value and not 1e-4 <= abs(value) < 1e16):
+                return True
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or not self.strict or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if _has_unportable_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            # Same escaping as JSONRenderer, so the output is a strict JavaScript subset
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
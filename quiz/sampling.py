@@ -0,0 +1,240 @@
+"""
+Random quiz sampling for the feed endpoints.
+
+Rather than running ``ORDER BY RANDOM()`` over the filtered quiz/topic/subject
+join, the feeds draw quiz ids from an in-process index that groups every quiz
+into buckets keyed by topic, stratum (WASSCE or trivial), difficulty and class
+level.  Drawing k quizzes from the matching buckets is O(k log b) and the
+rows are then loaded with a single ``id IN (...)`` query.
+
+The index is rebuilt lazily whenever the ``quiz-index`` version is bumped,
+which ``quiz.signals`` does on every save or delete of a subject, topic or
+quiz.
+"""
+import bisect
+import random
+import threading
+from collections import defaultdict
+from itertools import accumulate
+
+from django.conf import settings
+
+from .models import Quiz, Topic
+from .versions import get_version
+
+INDEX_VERSION = 'quiz-index'
+
+_index = None
+_index_lock = threading.Lock()
+
+
+class QuizIndex:
+    """
+    Snapshot of quiz ids grouped into sampling buckets, plus the topic
+    catalog needed to resolve topic and subject filters without a query.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        # topic_id -> (topic name, subject id, subject name)
+        self.topics = {}
+        # topic_id -> [(is_wassce_related, difficulty, class_level, [quiz ids])]
+        self.buckets = defaultdict(list)
+
+    @classmethod
+    def build(cls, version):
+        index = cls(version)
+        topics = Topic.objects.order_by().values_list('id', 'name', 'subject_id', 'subject__name')
+        for topic_id, name, subject_id, subject_name in topics:
+            index.topics[topic_id] = (name, subject_id, subject_name)
+
+        grouped = defaultdict(list)
+        quizzes = Quiz.objects.order_by().values_list(
+            'id', 'topic_id', 'is_wassce_related', 'difficulty', 'class_level'
+        )
+        for quiz_id, topic_id, is_wassce, difficulty, class_level in quizzes.iterator(chunk_size=5000):
+            grouped[(topic_id, is_wassce, difficulty.lower(), class_level.lower())].append(quiz_id)
+
+        for (topic_id, is_wassce, difficulty, class_level), ids in grouped.items():
+            index.buckets[topic_id].append((is_wassce, difficulty, class_level, ids))
+        return index
+
+    def filter_topic_ids(self, topic_ids, subject=None, topic=None):
+        """
+        Narrow ``topic_ids`` by a subject (id or name fragment) and a topic
+        name fragment, matching the ``icontains`` semantics of the ORM.
+        """
+        subject_id = None
+        if subject:
+            try:
+                subject_id = int(subject)
+                subject = None
+            except ValueError:
+                subject = subject.lower()
+        topic = topic.lower() if topic else None
+
+        result = []
+        for topic_id in topic_ids:
+            entry = self.topics.get(topic_id)
+            if entry is None:
+                continue
+            name, entry_subject_id, subject_name = entry
+            if subject_id is not None and entry_subject_id != subject_id:
+                continue
+            if subject and subject not in subject_name.lower():
+                continue
+            if topic and topic not in name.lower():
+                continue
+            result.append(topic_id)
+        return result
+
+    def matching_buckets(self, topic_ids, is_wassce, difficulty=None, class_level=None, quiz_ids=None):
+        """
+        Return the id lists of one stratum that match the given filters.
+        """
+        matches = []
+        for topic_id in topic_ids:
+            for bucket_wassce, bucket_difficulty, bucket_level, ids in self.buckets.get(topic_id, ()):
+                if bucket_wassce != is_wassce:
+                    continue
+                if difficulty and bucket_difficulty != difficulty:
+                    continue
+                if class_level and bucket_level != class_level:
+                    continue
+                if quiz_ids is not None:
+                    ids = [quiz_id for quiz_id in ids if quiz_id in quiz_ids]
+                if ids:
+                    matches.append(ids)
+        return matches
+
+
+def get_index():
+    """
+    Return the quiz index, rebuilding it if the shared version moved on.
+    """
+    global _index
+    version = get_version(INDEX_VERSION)
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                _index = QuizIndex.build(version)
+            index = _index
+    return index
+
+
+def draw(buckets, count):
+    """
+    Draw ``count`` distinct ids uniformly from a list of id lists without
+    concatenating them.
+    """
+    sizes = [len(ids) for ids in buckets]
+    offsets = list(accumulate(sizes))
+    total = offsets[-1] if offsets else 0
+    drawn = []
+    for position in random.sample(range(total), min(count, total)):
+        bucket = bisect.bisect_right(offsets, position)
+        drawn.append(buckets[bucket][position - (offsets[bucket] - sizes[bucket])])
+    return drawn
+
+
+def allocate(size, wassce_ratio, wassce_total, trivial_total):
+    """
+    Split ``size`` between the WASSCE and trivial strata according to
+    ``wassce_ratio``, filling in from the other stratum when one runs short.
+    """
+    wassce_target = round(size * wassce_ratio)
+    trivial_target = size - wassce_target
+    wassce = min(wassce_target, wassce_total)
+    trivial = min(trivial_target, trivial_total)
+
+    if wassce < wassce_target:
+        trivial = min(size - wassce, trivial_total)
+    elif trivial < trivial_target:
+        wassce = min(size - trivial, wassce_total)
+    return wassce, trivial
+
+
+class FeedSample:
+    """Result of a feed draw, along with the stratum sizes it was drawn from."""
+
+    def __init__(self, quizzes, wassce_total, trivial_total, wassce_fetched, trivial_fetched):
+        self.quizzes = quizzes
+        self.wassce_total = wassce_total
+        self.trivial_total = trivial_total
+        self.wassce_fetched = wassce_fetched
+        self.trivial_fetched = trivial_fetched
+
+    @property
+    def total(self):
+        return self.wassce_total + self.trivial_total
+
+
+class QuizSampler:
+    """
+    Stratified random sampler shared by the quiz feed endpoints.
+
+    Args:
+        size (int): Number of quizzes to draw (default: ``QUIZ_FEED_SIZE``)
+        wassce_ratio (float): Share of WASSCE quizzes in a mixed draw
+            (default: ``QUIZ_FEED_WASSCE_RATIO``)
+    """
+
+    def __init__(self, size=None, wassce_ratio=None):
+        self.size = size if size is not None else getattr(settings, 'QUIZ_FEED_SIZE', 10)
+        self.wassce_ratio = (
+            wassce_ratio if wassce_ratio is not None
+            else getattr(settings, 'QUIZ_FEED_WASSCE_RATIO', 0.6)
+        )
+
+    def sample(self, topic_ids, difficulty=None, class_level=None, quiz_ids=None,
+               include_wassce=True, include_trivial=True, index=None):
+        """
+        Draw a random set of quizzes from the given topics.
+
+        Args:
+            topic_ids (list): Topics to draw from
+            difficulty (str): Optional lower-cased difficulty filter
+            class_level (str): Optional lower-cased class level filter
+            quiz_ids (set): Optional set of quiz ids the draw is restricted to
+            include_wassce (bool): Whether WASSCE quizzes may be drawn
+            include_trivial (bool): Whether trivial quizzes may be drawn
+            index (QuizIndex): Index to draw from (default: the shared index)
+
+        Returns:
+            FeedSample: The drawn quizzes in random order and the stratum sizes
+        """
+        index = index or get_index()
+        filters = dict(difficulty=difficulty, class_level=class_level, quiz_ids=quiz_ids)
+        wassce_buckets = index.matching_buckets(topic_ids, True, **filters) if include_wassce else []
+        trivial_buckets = index.matching_buckets(topic_ids, False, **filters) if include_trivial else []
+        wassce_total = sum(len(ids) for ids in wassce_buckets)
+        trivial_total = sum(len(ids) for ids in trivial_buckets)
+
+        ratio = self.wassce_ratio
+        if not include_trivial:
+            ratio = 1.0
+        elif not include_wassce:
+            ratio = 0.0
+        wassce_count, trivial_count = allocate(self.size, ratio, wassce_total, trivial_total)
+
+        ids = draw(wassce_buckets, wassce_count) + draw(trivial_buckets, trivial_count)
+        random.shuffle(ids)
+        return FeedSample(
+            quizzes=load_quizzes(ids),
+            wassce_total=wassce_total,
+            trivial_total=trivial_total,
+            wassce_fetched=wassce_count,
+            trivial_fetched=trivial_count,
+        )
+
+
+def load_quizzes(ids):
+    """
+    Fetch quizzes by id in one query, preserving the order of ``ids``.
+    """
+    if not ids:
+        return []
+    quizzes = Quiz.objects.filter(id__in=ids).select_related('topic', 'topic__subject').order_by()
+    by_id = {quiz.id: quiz for quiz in quizzes}
+    return [by_id[quiz_id] for quiz_id in ids if quiz_id in by_id]
@@ -0,0 +1,269 @@
+"""
+Full-text search over quizzes and questions.
+
+Every quiz and question has a ``SearchDocument`` row holding its searchable
+text: a quiz its title, description, topic and subject names, a question its
+text and explanation.  The documents are indexed by the database:
+
+* PostgreSQL: a generated ``search_vector`` tsvector column (title weighted
+  above body) with a GIN index, ranked with ``ts_rank``.
+* SQLite: an external-content FTS5 table kept in step with the documents by
+  triggers, ranked with ``bm25``.
+
+Both look terms up in an inverted index, so a search costs about the same
+however many documents there are.  Other databases, and SQLite builds without
+FTS5, fall back to ``icontains`` over the documents.
+
+Documents are rewritten from the quiz signals, ``Question.save`` (through
+``post_save``) and the ``bulk_create`` of quizzes and questions; deletes
+cascade.  Like the counters, changes made with ``QuerySet.update()`` or raw
+SQL are not seen; ``manage.py rebuild_search_index`` rewrites everything.
+
+Queries are split into words and every word must match as a prefix, so
+``alg eq`` finds "Algebraic equations".
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+FTS_TABLE = 'quiz_searchdocument_fts'
+# Text search configuration of the PostgreSQL search_vector column
+SEARCH_CONFIG = 'english'
+# Words of a query that are used, the rest is ignored
+MAX_TERMS = 8
+
+_TERM = re.compile(r'\w+')
+_fts_tables = {}
+
+
+def search_terms(query):
+    """Lower-cased words of ``query``."""
+    return _TERM.findall((query or '').lower())[:MAX_TERMS]
+
+
+def quiz_document(quiz):
+    """Unsaved search document of ``quiz``; expects ``topic__subject`` to be selected."""
+    from .models import SearchDocument
+
+    topic = quiz.topic
+    parts = [quiz.description, topic.name if topic else '', topic.subject.name if topic else '']
+    return SearchDocument(kind='quiz', quiz=quiz, title=quiz.title, body='\n'.join(part for part in parts if part))
+
+
+def question_document(question):
+    from .models import SearchDocument
+
+    return SearchDocument(
+        kind='question', quiz_id=question.quiz_id, question=question,
+        title=question.question_text, body=question.explanation
+    )
+
+
+def index_quizzes(quiz_ids):
+    """Rewrite the search documents of ``quiz_ids``."""
+    from .models import Quiz, SearchDocument
+
+    quiz_ids = {quiz_id for quiz_id in quiz_ids if quiz_id is not None}
+    if not quiz_ids:
+        return
+    quizzes = Quiz.objects.filter(pk__in=quiz_ids).select_related('topic__subject').order_by()
+    with transaction.atomic():
+        SearchDocument.objects.filter(kind='quiz', quiz_id__in=quiz_ids).delete()
+        SearchDocument.objects.bulk_create([quiz_document(quiz) for quiz in quizzes])
+
+
+def index_topics(topic_ids):
+    """Rewrite the documents of the quizzes of ``topic_ids``, after a rename."""
+    from .models import Quiz
+
+    index_quizzes(Quiz.objects.filter(topic_id__in=topic_ids).values_list('id', flat=True))
+
+
+def index_questions(question_ids):
+    """Rewrite the search documents of ``question_ids``."""
+    from .models import Question, SearchDocument
+
+    question_ids = {question_id for question_id in question_ids if question_id is not None}
+    if not question_ids:
+        return
+    questions = Question.objects.filter(pk__in=question_ids).only('id', 'quiz_id', 'question_text', 'explanation')
+    with transaction.atomic():
+        SearchDocument.objects.filter(question_id__in=question_ids).delete()
+        SearchDocument.objects.bulk_create([question_document(question) for question in questions])
+
+
+def index_unindexed_questions(quiz_ids):
+    """
+    Index the questions of ``quiz_ids`` that have no document yet, for bulk
+    inserts that do not report the new primary keys.
+    """
+    from .models import Question
+
+    index_questions(
+        Question.objects.filter(quiz_id__in=set(quiz_ids), search_document__isnull=True).values_list('id', flat=True)
+    )
+
+
+def rebuild(chunk_size=2000):
+    """Rewrite every search document.  Returns the number of documents."""
+    from .models import Question, Quiz, SearchDocument
+
+    SearchDocument.objects.all().delete()
+    for model, index in ((Quiz, index_quizzes), (Question, index_questions)):
+        ids = []
+        for pk in model.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=chunk_size):
+            ids.append(pk)
+            if len(ids) >= chunk_size:
+                index(ids)
+                ids = []
+        index(ids)
+    return SearchDocument.objects.count()
+
+
+def search_backend():
+    """'postgresql', 'fts5' or None when searches fall back to ``icontains``."""
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        key = (connection.alias, str(connection.settings_dict['NAME']))
+        if key not in _fts_tables:
+            _fts_tables[key] = FTS_TABLE in connection.introspection.table_names()
+        if _fts_tables[key]:
+            return 'fts5'
+    return None
+
+
+def _match_query(backend, terms):
+    """Full-text query matching every term as a prefix."""
+    if backend == 'postgresql':
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _matching_documents(terms, kind=None):
+    """Documents containing every term, for databases without a search index."""
+    from .models import SearchDocument
+
+    documents = SearchDocument.objects.all()
+    if kind:
+        documents = documents.filter(kind=kind)
+    for term in terms:
+        documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    return documents
+
+
+def ranked_document_ids(query, kind=None, limit=20):
+    """
+    ``[(document id, quiz id, score)]`` of the best matches for ``query``,
+    best first, all of them if ``limit`` is None.  ``kind`` limits the search
+    to quizzes or questions.
+    """
+    terms = search_terms(query)
+    if not terms or (limit is not None and limit < 1):
+        return []
+    backend = search_backend()
+    kind_sql = 'AND d.kind = %s' if kind else ''
+    kind_params = [kind] if kind else []
+    limit_sql = 'LIMIT %s' if limit is not None else ''
+    limit_params = [limit] if limit is not None else []
+
+    if backend == 'postgresql':
+        sql = f"""
+            SELECT d.id, d.quiz_id, ts_rank(d.search_vector, query) AS score
+            FROM quiz_searchdocument d, to_tsquery(%s::regconfig, %s) query
+            WHERE d.search_vector @@ query {kind_sql}
+            ORDER BY score DESC, d.id
+            {limit_sql}
+        """
+        params = [SEARCH_CONFIG, _match_query(backend, terms), *kind_params, *limit_params]
+    elif backend == 'fts5':
+        # Title matches weigh ten times body matches; bm25 is lower for better matches
+        sql = f"""
+            SELECT d.id, d.quiz_id, -bm25({FTS_TABLE}, 10.0, 1.0) AS score
+            FROM {FTS_TABLE} f JOIN quiz_searchdocument d ON d.id = f.rowid
+            WHERE {FTS_TABLE} MATCH %s {kind_sql}
+            ORDER BY score DESC, d.id
+            {limit_sql}
+        """
+        params = [_match_query(backend, terms), *kind_params, *limit_params]
+    else:
+        rows = _matching_documents(terms, kind).order_by('id').values_list('id', 'quiz_id')
+        if limit is not None:
+            rows = rows[:limit]
+        return [(document_id, quiz_id, 0.0) for document_id, quiz_id in rows]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(document_id, quiz_id, float(score)) for document_id, quiz_id, score in cursor.fetchall()]
+
+
+def search(query, kind=None, limit=20):
+    """
+    Ranked search results for ``query``: dictionaries with the ``type``,
+    ``id`` and ``quiz_id`` of the match, its ``title`` and ``score``.
+    """
+    from .models import SearchDocument
+
+    ranked = ranked_document_ids(query, kind=kind, limit=limit)
+    documents = SearchDocument.objects.in_bulk([document_id for document_id, _, _ in ranked])
+    results = []
+    for document_id, _, score in ranked:
+        document = documents.get(document_id)
+        if document is None:
+            continue
+        results.append({
+            'type': document.kind,
+            'id': document.question_id if document.kind == 'question' else document.quiz_id,
+            'quiz_id': document.quiz_id,
+            'title': document.title,
+            'score': round(score, 6),
+        })
+    return results
+
+
+def search_quiz_ids(query, limit=None):
+    """Ids of the quizzes matching ``query``, best first, all of them by default."""
+    return [quiz_id for _, quiz_id, _ in ranked_document_ids(query, kind='quiz', limit=limit)]
+
+
+def matching_quiz_ids(query):
+    """
+    Subquery of the ids of the quizzes matching ``query``, unranked, for
+    ``id__in`` filters that should not load every match into Python.
+    """
+    from .models import SearchDocument
+
+    terms = search_terms(query)
+    if not terms:
+        return SearchDocument.objects.none().values('quiz_id')
+    backend = search_backend()
+    if backend == 'postgresql':
+        return RawSQL(
+            "SELECT d.quiz_id FROM quiz_searchdocument d "
+            "WHERE d.search_vector @@ to_tsquery(%s::regconfig, %s) AND d.kind = %s",
+            [SEARCH_CONFIG, _match_query(backend, terms), 'quiz']
+        )
+    if backend == 'fts5':
+        return RawSQL(
+            f"SELECT d.quiz_id FROM {FTS_TABLE} f JOIN quiz_searchdocument d ON d.id = f.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND d.kind = %s",
+            [_match_query(backend, terms), 'quiz']
+        )
+    return _matching_documents(terms, kind='quiz').values('quiz_id')
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ``SearchFilter`` answering ``?search=`` from the search index instead of
+    ``icontains`` over ``search_fields``.  The view's queryset must be of
+    quizzes.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return queryset.filter(id__in=matching_quiz_ids(' '.join(terms)))
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Subject, Question, Quiz, Topic
+from .models import Subject, Question, Quiz, Topic, GenerationJob
 from django.utils import timezone
 
 class SubjectSerializer(serializers.ModelSerializer):
@@ -12,7 +12,7 @@ class TopicSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Topic
-        fields = ['id', 'name', 'subject', 'subject_name']
+        fields = ['id', 'name', 'subject', 'subject_name', 'quiz_count']
 
 class QuestionSerializer(serializers.ModelSerializer):    
     class Meta:
@@ -20,7 +20,9 @@ class QuestionSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
 class QuizSerializer(serializers.ModelSerializer):
-    question_count = serializers.CharField(source='num_of_questions', read_only=True)
+    # Actual counts, maintained by quiz.counters; num_of_questions is the target size
+    question_count = serializers.IntegerField(source='question_total', read_only=True)
+    ai_question_count = serializers.IntegerField(source='ai_question_total', read_only=True)
     subject_name = serializers.CharField(source='topic.subject.name', read_only=True)
     topic_name = serializers.CharField(source='topic.name', read_only=True)
     
@@ -28,7 +30,28 @@ class QuizSerializer(serializers.ModelSerializer):
         model = Quiz
         fields = ['id', 'title', 'topic_name', 'class_level', 'difficulty', 
                  'duration_minutes', 'description', 'created_at', 'updated_at', 
-                 'question_count', 'subject_name', 'is_wassce_related']
-    
-    def get_question_count(self, obj):
-        return obj.questions.count()
+                 'question_count', 'ai_question_count', 'num_of_questions',
+                 'subject_name', 'is_wassce_related']
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+    questions = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GenerationJob
+        fields = ['id', 'quiz', 'kind', 'status', 'num_questions', 'target_count',
+                 'generated_count', 'progress', 'attempts', 'error', 'failures',
+                 'questions', 'created_at', 'updated_at', 'finished_at']
+
+    def get_progress(self, obj):
+        if not obj.num_questions:
+            return 1.0
+        return round(obj.generated_count / obj.num_questions, 2)
+
+    def get_questions(self, obj):
+        # Partial results: the questions created so far. Buffered questions
+        # are only handed out by generate_next_question.
+        if obj.kind == 'fill_buffer':
+            return []
+        questions = Question.objects.filter(id__in=obj.question_ids).order_by('id')
+        return QuestionSerializer(questions, many=True).data
@@ -1,109 +1,485 @@
-from typing import Dict, Any
-import openai
+from typing import Dict, Any, List, Optional
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from django.conf import settings
+from .dedup import content_hash, index_for_texts
+from .generation_cache import cache_key, get_generation_cache
+from .json_stream import JSONObjectStream, iter_json_array
+from .transports import TransportTimeout, get_transport
 import json
-import os
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionGenerationError(Exception):
+    """
+    Raised when a question could not be generated.
+
+    ``reason`` is one of ``'timeout'``, ``'invalid'`` (the completion was not a
+    valid question) or ``'api'`` (any other error from the API).
+    """
+
+    def __init__(self, message, reason='api'):
+        super().__init__(message)
+        self.reason = reason
+
+
+class GenerationFailure:
+    """A failed call in a batch, in the order the failure was observed."""
+
+    def __init__(self, index: int, reason: str, error: str, elapsed: float):
+        self.index = index
+        self.reason = reason
+        self.error = error
+        self.elapsed = elapsed
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'index': self.index,
+            'reason': self.reason,
+            'error': self.error,
+            'elapsed': round(self.elapsed, 3)
+        }
+
+    def __repr__(self):
+        return f"GenerationFailure(index={self.index}, reason={self.reason!r}, error={self.error!r})"
+
+
+class BatchResult(list):
+    """
+    List of generated questions in completion order, with the failed calls
+    of the batch available as ``failures``.
+    """
+
+    def __init__(self, questions=(), failures=None, elapsed=0.0):
+        super().__init__(questions)
+        self.failures = failures or []
+        self.elapsed = elapsed
+
+
+# Previous questions listed in a prompt as questions not to repeat
+MAX_EXCLUDED_QUESTIONS = 20
+
+SYSTEM_PROMPT = "You are a professional WAEC examination question generator."
+
+QUESTION_FORMAT = """{
+            "question": "the question text",
+            "options": {
+                "A": "option A",
+                "B": "option B",
+                "C": "option C",
+                "D": "option D"
+            },
+            "correct_answer": "the letter of the correct option (A, B, C, or D)",
+            "explanation": "detailed explanation of why the answer is correct"
+        }"""
+
+
+# Fields of a question, in the order the completion writes them
+QUESTION_FIELDS = ('question', 'options', 'correct_answer', 'explanation')
+
+
+def validate_question(question_data: Any) -> Dict[str, Any]:
+    """
+    Check that a decoded completion is a well-formed question.
+
+    Raises:
+        ValueError: If a field, option or the correct answer is missing or invalid
+    """
+    if not isinstance(question_data, dict):
+        raise ValueError("Generated question must be a JSON object")
+
+    # Validate the response structure
+    if not all(field in question_data for field in QUESTION_FIELDS):
+        raise ValueError("Generated question is missing required fields")
+
+    # Validate options
+    if not isinstance(question_data['options'], dict) or \
+            not all(option in question_data['options'] for option in ['A', 'B', 'C', 'D']):
+        raise ValueError("Generated question must have exactly 4 options (A, B, C, D)")
+
+    # Validate correct answer
+    if question_data['correct_answer'] not in ['A', 'B', 'C', 'D']:
+        raise ValueError("Correct answer must be one of: A, B, C, D")
+
+    return question_data
+
 
 class QuizGenerator:
-    def __init__(self):
-        openai.api_key = os.getenv('OPENAI_API_KEY')
-        self.model = "gpt-3.5-turbo"
+    def __init__(self, concurrency: Optional[int] = None, timeout: Optional[float] = None, cache=None,
+                 transport=None):
+        # Completion backend selected by QUIZ_GENERATION_TRANSPORT
+        self.transport = transport or get_transport()
+        # Maximum number of completions in flight for a batch
+        self.concurrency = concurrency or getattr(settings, 'QUIZ_GENERATION_CONCURRENCY', 8)
+        # Per-call timeout in seconds
+        self.timeout = timeout or getattr(settings, 'QUIZ_GENERATION_TIMEOUT', 30)
+        # Questions requested from a single completion by generate_questions
+        self.questions_per_completion = getattr(settings, 'QUIZ_GENERATION_QUESTIONS_PER_COMPLETION', 5)
+        self.max_tokens_per_question = 500
+        # Pools of generated questions per prompt (None when disabled)
+        self.cache = cache if cache is not None else get_generation_cache()
 
-    def generate_question(self, subject: str, topic: str, difficulty: str, class_level: str) -> Dict[str, Any]:
+    def _prompt(self, subject: str, topic: str, difficulty: str, class_level: str, count: Optional[int] = None,
+                exclude_questions: Optional[List[str]] = None) -> str:
         """
-        Generate a single quiz question using OpenAI's API.
-        
-        Args:
-            subject (str): The subject (e.g., "Mathematics", "Physics")
-            topic (str): The specific topic within the subject
-            difficulty (str): The difficulty level (e.g., "easy", "medium", "hard")
-            class_level (str): The class level (e.g., "SS1", "SS2", "SS3")
-            
-        Returns:
-            Dict[str, Any]: A dictionary containing the question, options, correct answer, and explanation
+        Build the user prompt for one question, or for a JSON array of
+        ``count`` questions, optionally listing questions not to repeat.
         """
-        prompt = f"""
-        Generate a {difficulty} difficulty WAEC-style multiple choice question for {class_level} students.
+        if count is None:
+            request = f"Generate a {difficulty} difficulty WAEC-style multiple choice question for {class_level} students."
+            response_format = f"Format the response as a JSON object with the following structure:\n        {QUESTION_FORMAT}"
+            requirement = "The question should"
+        else:
+            request = f"Generate {count} different {difficulty} difficulty WAEC-style multiple choice questions for {class_level} students."
+            response_format = (
+                f"Format the response as a JSON array of exactly {count} {'object' if count == 1 else 'objects'}, with no other text. "
+                f"Each object has the following structure:\n        {QUESTION_FORMAT}"
+            )
+            requirement = "Each question should"
+
+        exclusions = ""
+        if exclude_questions:
+            # Only the most recent questions, to bound the prompt size
+            listed = "\n".join(f"        - {text}" for text in exclude_questions[-MAX_EXCLUDED_QUESTIONS:])
+            exclusions = f"\n        Do not repeat or rephrase any of these previous questions:\n{listed}\n"
+
+        return f"""
+        {request}
         Subject: {subject}
         Topic: {topic}
-        
-        The question should:
+
+        {requirement}:
         1. Be clear and concise
         2. Have exactly 4 options (A, B, C, D)
         3. Have only one correct answer
         4. Include a detailed explanation of the correct answer
         5. Be appropriate for {class_level} level
         6. Follow WAEC examination standards
-        
-        Format the response as a JSON object with the following structure:
-        {{
-            "question": "the question text",
-            "options": {{
-                "A": "option A",
-                "B": "option B",
-                "C": "option C",
-                "D": "option D"
-            }},
-            "correct_answer": "the letter of the correct option (A, B, C, or D)",
-            "explanation": "detailed explanation of why the answer is correct"
-        }}
+        {exclusions}
+        {response_format}
+        """
+
+    def generate_question(self, subject: str, topic: str, difficulty: str, class_level: str,
+                          timeout: Optional[float] = None,
+                          exclude_questions: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Generate a single quiz question using OpenAI's API.
+
+        Args:
+            subject (str): The subject (e.g., "Mathematics", "Physics")
+            topic (str): The specific topic within the subject
+            difficulty (str): The difficulty level (e.g., "easy", "medium", "hard")
+            class_level (str): The class level (e.g., "SS1", "SS2", "SS3")
+            timeout (float): Timeout for the API call in seconds (default: ``self.timeout``)
+            exclude_questions (List[str]): Previous question texts the new question must not repeat
+
+        Returns:
+            Dict[str, Any]: A dictionary containing the question, options, correct answer, and explanation
+
+        Raises:
+            QuestionGenerationError: If the API call fails, times out or returns an invalid question
         """
+        key = cache_key(subject, topic, difficulty, class_level)
+        if self.cache is not None:
+            cached = self.cache.get(key, exclude=index_for_texts(exclude_questions) if exclude_questions else None)
+            if cached is not None:
+                return cached
 
+        timeout = timeout or self.timeout
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a professional WAEC examination question generator."},
-                    {"role": "user", "content": prompt}
-                ],
+            content = self.transport.complete(
+                messages=self._question_messages(subject, topic, difficulty, class_level, exclude_questions),
+                max_tokens=self.max_tokens_per_question,
                 temperature=0.7,
-                max_tokens=500
+                timeout=timeout
             )
+            question_data = self._parse_question(content)
+        except Exception as e:
+            raise self._generation_error(e, timeout)
 
-            # Extract and parse the JSON response
-            content = response.choices[0].message.content
-            question_data = json.loads(content)
+        if self.cache is not None:
+            self.cache.add(key, [question_data])
+        return question_data
 
-            # Validate the response structure
-            required_fields = ['question', 'options', 'correct_answer', 'explanation']
-            if not all(field in question_data for field in required_fields):
-                raise ValueError("Generated question is missing required fields")
+    async def agenerate_question(self, subject: str, topic: str, difficulty: str, class_level: str,
+                                 timeout: Optional[float] = None,
+                                 exclude_questions: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Coroutine version of ``generate_question`` for async views.  The
+        completion is awaited, so no thread waits on the API; the cache is
+        read and written on the default executor.
+        """
+        key = cache_key(subject, topic, difficulty, class_level)
+        if self.cache is not None:
+            exclude = index_for_texts(exclude_questions) if exclude_questions else None
+            cached = await sync_to_async(self.cache.get, thread_sensitive=False)(key, exclude=exclude)
+            if cached is not None:
+                return cached
 
-            # Validate options
-            if not all(option in question_data['options'] for option in ['A', 'B', 'C', 'D']):
-                raise ValueError("Generated question must have exactly 4 options (A, B, C, D)")
+        timeout = timeout or self.timeout
+        try:
+            content = await self.transport.acomplete(
+                messages=self._question_messages(subject, topic, difficulty, class_level, exclude_questions),
+                max_tokens=self.max_tokens_per_question,
+                temperature=0.7,
+                timeout=timeout
+            )
+            question_data = self._parse_question(content)
+        except Exception as e:
+            raise self._generation_error(e, timeout)
 
-            # Validate correct answer
-            if question_data['correct_answer'] not in ['A', 'B', 'C', 'D']:
-                raise ValueError("Correct answer must be one of: A, B, C, D")
+        if self.cache is not None:
+            await sync_to_async(self.cache.add, thread_sensitive=False)(key, [question_data])
+        return question_data
 
-            return question_data
+    async def astream_question(self, subject: str, topic: str, difficulty: str, class_level: str,
+                               timeout: Optional[float] = None,
+                               exclude_questions: Optional[List[str]] = None):
+        """
+        Generate a question like ``agenerate_question`` from a streamed
+        completion, yielding ``(field, value)`` for every field of
+        ``QUESTION_FIELDS`` as soon as it has been written, so the question
+        text can be shown long before the explanation is complete.  A cached
+        question is yielded all at once.
 
+        Raises:
+            QuestionGenerationError: If the API call fails, times out or
+                returns an invalid question, possibly after some fields
+                were yielded
+        """
+        key = cache_key(subject, topic, difficulty, class_level)
+        if self.cache is not None:
+            exclude = index_for_texts(exclude_questions) if exclude_questions else None
+            cached = await sync_to_async(self.cache.get, thread_sensitive=False)(key, exclude=exclude)
+            if cached is not None:
+                for field in QUESTION_FIELDS:
+                    yield field, cached[field]
+                return
+
+        timeout = timeout or self.timeout
+        question_data = {}
+        try:
+            chunks = await self.transport.acomplete(
+                messages=self._question_messages(subject, topic, difficulty, class_level, exclude_questions),
+                max_tokens=self.max_tokens_per_question,
+                temperature=0.7,
+                timeout=timeout,
+                stream=True
+            )
+            stream = JSONObjectStream()
+            async for chunk in chunks:
+                for field, value in stream.feed(chunk):
+                    if field in QUESTION_FIELDS and field not in question_data:
+                        question_data[field] = json.loads(value)
+                        yield field, question_data[field]
+            validate_question(question_data)
         except Exception as e:
-            # Log the error and raise a more specific exception
-            print(f"Error generating question: {str(e)}")
-            raise Exception(f"Failed to generate question: {str(e)}")
+            raise self._generation_error(e, timeout)
+
+        if self.cache is not None:
+            await sync_to_async(self.cache.add, thread_sensitive=False)(key, [question_data])
+
+    def _question_messages(self, subject, topic, difficulty, class_level, exclude_questions=None):
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": self._prompt(subject, topic, difficulty, class_level,
+                                                     exclude_questions=exclude_questions)}
+        ]
+
+    @staticmethod
+    def _parse_question(content):
+        # Parse the JSON response, then validate the fields, options and answer
+        return validate_question(json.loads(content))
 
-    def generate_questions_batch(self, subject: str, topic: str, difficulty: str, class_level: str, count: int) -> list:
+    @staticmethod
+    def _generation_error(error, timeout):
+        """The ``QuestionGenerationError`` to raise for ``error``, logged."""
+        if isinstance(error, TransportTimeout):
+            logger.warning("Question generation timed out after %ss: %s", timeout, error)
+            return QuestionGenerationError(f"Failed to generate question: {str(error)}", reason='timeout')
+        if isinstance(error, ValueError):
+            # json.JSONDecodeError is a ValueError too
+            logger.warning("Generated question was invalid: %s", error)
+            return QuestionGenerationError(f"Failed to generate question: {str(error)}", reason='invalid')
+        logger.exception("Error generating question")
+        return QuestionGenerationError(f"Failed to generate question: {str(error)}", reason='api')
+
+    def generate_questions_batch(self, subject: str, topic: str, difficulty: str, class_level: str, count: int,
+                                 concurrency: Optional[int] = None, timeout: Optional[float] = None) -> BatchResult:
         """
-        Generate multiple quiz questions in a batch.
-        
+        Generate multiple quiz questions concurrently.
+
+        Up to ``concurrency`` completions run at once on a thread pool, so a
+        batch takes roughly ``ceil(count / concurrency)`` round trips.
+
         Args:
             subject (str): The subject
             topic (str): The specific topic
             difficulty (str): The difficulty level
             class_level (str): The class level
             count (int): Number of questions to generate
-            
+            concurrency (int): Maximum calls in flight (default: ``self.concurrency``)
+            timeout (float): Per-call timeout in seconds (default: ``self.timeout``)
+
         Returns:
-            list: A list of question dictionaries
+            BatchResult: The question dictionaries in completion order, with
+            a ``GenerationFailure`` in ``failures`` for every call that failed
         """
-        questions = []
-        for _ in range(count):
-            try:
-                question = self.generate_question(subject, topic, difficulty, class_level)
-                questions.append(question)
-            except Exception as e:
-                print(f"Error generating question in batch: {str(e)}")
-                continue
-        return questions 
\ No newline at end of file
+        concurrency = max(1, min(concurrency or self.concurrency, count or 1))
+        timeout = timeout or self.timeout
+        result = BatchResult()
+        if count <= 0:
+            return result
+
+        started = time.monotonic()
+        # Calls queue behind each other once the pool is busy, so the batch as
+        # a whole gets one timeout per wave plus some slack
+        deadline = timeout * math.ceil(count / concurrency) + 1
+
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='quiz-generation')
+        futures = {
+            executor.submit(self.generate_question, subject, topic, difficulty, class_level, timeout): index
+            for index in range(count)
+        }
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                try:
+                    result.append(future.result())
+                except QuestionGenerationError as e:
+                    result.failures.append(
+                        GenerationFailure(futures[future], e.reason, str(e), time.monotonic() - started)
+                    )
+        except FuturesTimeoutError:
+            for future, index in futures.items():
+                if not future.done():
+                    future.cancel()
+                    result.failures.append(
+                        GenerationFailure(index, 'timeout', 'Batch deadline exceeded', time.monotonic() - started)
+                    )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        result.elapsed = time.monotonic() - started
+        if result.failures:
+            logger.warning(
+                "Generated %d of %d questions for %s - %s; failures: %s",
+                len(result), count, subject, topic, [failure.as_dict() for failure in result.failures]
+            )
+        return result
+
+    def generate_questions(self, subject: str, topic: str, difficulty: str, class_level: str, num_questions: int,
+                           max_rounds: int = 3, timeout: Optional[float] = None,
+                           use_cache: bool = False, exclude=None) -> BatchResult:
+        """
+        Generate several questions with as few completions as possible.
+
+        Each completion asks for up to ``questions_per_completion`` questions
+        as a JSON array and is streamed, so every question is decoded and
+        validated as soon as it is complete.  Larger requests are split over
+        concurrent completions.  Items that are missing or invalid are
+        requested again, for at most ``max_rounds`` rounds.
+
+        Args:
+            subject (str): The subject
+            topic (str): The specific topic
+            difficulty (str): The difficulty level
+            class_level (str): The class level
+            num_questions (int): Number of questions to generate
+            max_rounds (int): Maximum number of request rounds
+            timeout (float): Per-completion timeout in seconds (default: ``self.timeout``)
+            use_cache (bool): Serve questions from the generation cache first.
+                Generated questions are added to the cache either way.
+            exclude (NearDuplicateIndex): Questions the cache must not serve,
+                e.g. the stored questions of the topic
+
+        Returns:
+            BatchResult: Up to ``num_questions`` validated questions in the
+            order they were completed, with the rejected items in ``failures``
+        """
+        timeout = timeout or self.timeout
+        result = BatchResult()
+        started = time.monotonic()
+        key = cache_key(subject, topic, difficulty, class_level)
+
+        if use_cache and self.cache is not None:
+            # A full pool rotates, so stop once it serves a question again
+            served = set()
+            for _ in range(min(num_questions, self.cache.pool_size)):
+                cached = self.cache.get(key, exclude=exclude)
+                if cached is None or content_hash(cached['question']) in served:
+                    break
+                served.add(content_hash(cached['question']))
+                result.append(cached)
+        cached_count = len(result)
+
+        for _ in range(max_rounds):
+            missing = num_questions - len(result)
+            if missing <= 0:
+                break
+
+            sizes = [
+                min(self.questions_per_completion, missing - offset)
+                for offset in range(0, missing, self.questions_per_completion)
+            ]
+            with ThreadPoolExecutor(max_workers=min(len(sizes), self.concurrency),
+                                    thread_name_prefix='quiz-generation') as executor:
+                futures = [
+                    executor.submit(self._stream_questions, subject, topic, difficulty, class_level, size, timeout)
+                    for size in sizes
+                ]
+                for future in as_completed(futures):
+                    questions, failures = future.result()
+                    result.extend(questions)
+                    result.failures.extend(failures)
+
+        del result[num_questions:]
+        if self.cache is not None:
+            self.cache.add(key, result[cached_count:])
+        result.elapsed = time.monotonic() - started
+        if result.failures:
+            logger.warning(
+                "Generated %d of %d questions for %s - %s; failures: %s",
+                len(result), num_questions, subject, topic, [failure.as_dict() for failure in result.failures]
+            )
+        return result
+
+    def _stream_questions(self, subject: str, topic: str, difficulty: str, class_level: str, count: int,
+                          timeout: float):
+        """
+        Request ``count`` questions in one streamed completion and return the
+        valid questions along with a failure for every rejected item.
+        """
+        questions, failures = [], []
+        started = time.monotonic()
+        try:
+            chunks = self.transport.complete(
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": self._prompt(subject, topic, difficulty, class_level, count)}
+                ],
+                max_tokens=self.max_tokens_per_question * count,
+                temperature=0.7,
+                timeout=timeout,
+                stream=True
+            )
+            for position, item in enumerate(iter_json_array(chunks)):
+                try:
+                    if isinstance(item, ValueError):
+                        raise item
+                    questions.append(validate_question(item))
+                except ValueError as e:
+                    failures.append(GenerationFailure(position, 'invalid', str(e), time.monotonic() - started))
+                if len(questions) >= count:
+                    break
+
+        except TransportTimeout as e:
+            failures.append(GenerationFailure(len(questions), 'timeout', str(e), time.monotonic() - started))
+        except Exception as e:
+            logger.exception("Error generating questions")
+            failures.append(GenerationFailure(len(questions), 'api', str(e), time.monotonic() - started))
+
+        return questions, failures
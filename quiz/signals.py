@@ -0,0 +1,66 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .catalog import CATALOG_VERSION
+from .counters import adjust_quiz_counts
+from .models import Subject, Topic, Quiz, Question
+from .sampling import INDEX_VERSION
+from .search import index_questions, index_quizzes, index_topics
+from .versions import bump_version_on_commit
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def invalidate_catalog(sender, **kwargs):
+    """
+    Signal handler to rebuild the feed sampling index and drop the cached
+    catalog responses once catalog changes are committed.
+    """
+    bump_version_on_commit(INDEX_VERSION, CATALOG_VERSION)
+
+
+@receiver(post_save, sender=Quiz)
+def count_saved_quiz(sender, instance, created, **kwargs):
+    """
+    Signal handler to keep the topic and subject quiz counters up to date.
+    """
+    previous_topic_id = getattr(instance, '_loaded_topic_id', instance.topic_id)
+    if created:
+        adjust_quiz_counts({instance.topic_id: 1})
+    elif previous_topic_id != instance.topic_id:
+        adjust_quiz_counts({previous_topic_id: -1, instance.topic_id: 1})
+    instance._loaded_topic_id = instance.topic_id
+
+
+@receiver(post_delete, sender=Quiz)
+def count_deleted_quiz(sender, instance, **kwargs):
+    adjust_quiz_counts({instance.topic_id: -1})
+
+
+@receiver(post_save, sender=Quiz)
+def index_saved_quiz(sender, instance, **kwargs):
+    """
+    Signal handler to keep the search documents up to date.
+    """
+    index_quizzes([instance.pk])
+
+
+@receiver(post_save, sender=Question)
+def index_saved_question(sender, instance, **kwargs):
+    index_questions([instance.pk])
+
+
+@receiver(post_save, sender=Topic)
+def index_saved_topic(sender, instance, created, **kwargs):
+    # Quiz documents include the topic and subject names
+    if not created:
+        index_topics([instance.pk])
+
+
+@receiver(post_save, sender=Subject)
+def index_saved_subject(sender, instance, created, **kwargs):
+    if not created:
+        index_topics(instance.topics.values_list('id', flat=True))
@@ -0,0 +1,151 @@
+"""
+Streaming NDJSON responses.
+
+List endpoints that can grow without bound offer a streaming mode, picked
+with ``Accept: application/x-ndjson``, ``?format=ndjson`` or ``?stream=1``.
+The queryset is read with ``.iterator()`` in chunks of
+``QUIZ_STREAM_CHUNK_SIZE`` rows and every row is written as one JSON object
+per line, so a worker holds one chunk in memory however large the list is.
+
+Endpoints whose response is built while a completion is written can answer
+with Server-Sent Events instead, picked with ``Accept: text/event-stream`` or
+``?stream=1``.  Every event carries a JSON object; a failed request is sent
+as one ``error`` event.
+
+Django reads the whole body of a ``StreamingHttpResponse`` before sending it
+when the iterator does not match the server: a sync iterator under ASGI, an
+async one under WSGI.  NDJSON streams therefore pick the iterator from the
+request and stream under both gunicorn (WSGI) and uvicorn (ASGI).  Event
+streams are produced by async views and only stream under uvicorn
+(``backend.asgi:application``); gunicorn sends them in one piece at the end.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+EVENT_STREAM_MEDIA_TYPE = 'text/event-stream'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept ``application/x-ndjson``.  Streamed
+    responses bypass it; anything else (errors, mostly) is rendered as a
+    single line.
+    """
+    media_type = NDJSON_MEDIA_TYPE
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, cls=JSONEncoder, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def sse_event(event, data):
+    """One Server-Sent Event named ``event`` with ``data`` as JSON."""
+    return f'event: {event}\ndata: {json.dumps(data, cls=JSONEncoder, ensure_ascii=False)}\n\n'
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept ``text/event-stream``.  Streamed
+    responses bypass it; anything else is rendered as an ``error`` event.
+    """
+    media_type = EVENT_STREAM_MEDIA_TYPE
+    format = 'sse'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return sse_event('error', data).encode('utf-8')
+
+
+# Renderers of views that can stream
+STREAMING_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+EVENT_STREAM_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
+
+
+def wants_stream(request):
+    """Whether ``request`` asked for a streamed NDJSON response."""
+    if request.query_params.get('stream') in ('1', 'true'):
+        return True
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.format == NDJSONRenderer.format
+
+
+def wants_events(request):
+    """Whether ``request`` asked for a Server-Sent Events response."""
+    if request.query_params.get('stream') in ('1', 'true'):
+        return True
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.format == EventStreamRenderer.format
+
+
+def ndjson_lines(queryset, serializer, chunk_size):
+    """Yield the rows of ``queryset`` as NDJSON, one chunk of lines at a time."""
+    encoder = JSONEncoder(ensure_ascii=False)
+    lines = []
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        lines.append(encoder.encode(serializer.to_representation(instance)))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+async def andjson_lines(queryset, serializer, chunk_size):
+    """
+    ``ndjson_lines`` as an async iterator.  Every chunk is read and serialized
+    on the request's thread, which keeps the database cursor open between
+    chunks.
+    """
+    lines = ndjson_lines(queryset, serializer, chunk_size)
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(lines, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(lines.close)()
+
+
+def served_by_asgi(request):
+    """Whether ``request``, a Django or DRF request, came in through ASGI."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def stream_ndjson(request, queryset, serializer, chunk_size=None):
+    """
+    Stream ``queryset`` serialized row by row with ``serializer``, anything
+    with a ``to_representation`` method (an unbound serializer instance or a
+    ``FastSerializer``), reused for every row.
+    """
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'QUIZ_STREAM_CHUNK_SIZE', 500)
+    lines = andjson_lines if served_by_asgi(request) else ndjson_lines
+    return StreamingHttpResponse(lines(queryset, serializer, chunk_size), content_type=NDJSON_MEDIA_TYPE)
+
+
+def stream_events(events):
+    """
+    Stream the ``(event, data)`` pairs of the async iterator ``events`` as
+    Server-Sent Events, each sent as soon as it is produced under ASGI.
+    """
+    async def messages():
+        async for event, data in events:
+            yield sse_event(event, data)
+
+    response = StreamingHttpResponse(messages(), content_type=EVENT_STREAM_MEDIA_TYPE)
+    response['Cache-Control'] = 'no-cache'
+    # Keep proxies such as nginx from buffering the events
+    response['X-Accel-Buffering'] = 'no'
+    return response
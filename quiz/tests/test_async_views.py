@@ -0,0 +1,93 @@
+import asyncio
+import json
+import time
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from accounts.tokens import ProfileRefreshToken
+from ..dedup import clear_topic_indexes
+from ..models import Subject, Topic, Quiz, BufferedQuestion
+from ..views import GenerateNextQuestionView
+from .test_services import QUESTION
+
+
+@override_settings(
+    QUIZ_GENERATION_TRANSPORT='fake', QUIZ_GENERATION_FAKE={'latency': 0.2}, QUIZ_GENERATION_CACHE_POOL_SIZE=0
+)
+class GenerateNextQuestionViewTest(TestCase):
+    def setUp(self):
+        clear_topic_indexes()
+        cache.clear()
+        maths = Subject.objects.create(name='Mathematics')
+        topic = Topic.objects.create(name='Algebra', subject=maths)
+        self.quiz = Quiz.objects.create(title='Algebra', topic=topic, class_level='Grade 10', difficulty='Easy')
+        user = User.objects.create_user(username='student', password='pass12345')
+        self.token = str(ProfileRefreshToken.for_user(user).access_token)
+        self.url = f'/api/quizzes/{self.quiz.id}/generate_next_question/'
+
+    def post(self, url=None, **headers):
+        headers = {'Authorization': f'Bearer {self.token}', **headers}
+        return self.async_client.post(url or self.url, {}, content_type='application/json', headers=headers)
+
+    async def read_events(self, response):
+        """The ``(event, data, seconds since the request)`` of an event stream."""
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events, buffered = [], ''
+        async for chunk in response.streaming_content:
+            buffered += chunk.decode('utf-8')
+            while '\n\n' in buffered:
+                message, buffered = buffered.split('\n\n', 1)
+                event, data = (line.split(': ', 1)[1] for line in message.splitlines())
+                events.append((event, json.loads(data), time.monotonic() - self.started))
+        return events
+
+    def test_view_is_async(self):
+        self.assertTrue(GenerateNextQuestionView.view_is_async)
+
+    async def test_live_generations_wait_concurrently(self):
+        started = time.monotonic()
+        responses = await asyncio.gather(*(self.post() for _ in range(20)))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertEqual({response.json()['source'] for response in responses}, {'generated'})
+        # 20 completions of 0.2s each, awaited side by side rather than one after another
+        self.assertLess(elapsed, 2)
+
+    async def test_buffered_question_and_idempotent_retry(self):
+        await BufferedQuestion.objects.acreate(quiz=self.quiz, payload=QUESTION)
+        first = await self.post(**{'Idempotency-Key': 'a'})
+        retry = await self.post(**{'Idempotency-Key': 'a'})
+        self.assertEqual(first.json()['source'], 'buffer')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+    async def test_unknown_quiz_and_anonymous_requests(self):
+        response = await self.post('/api/quizzes/0/generate_next_question/')
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.post(self.url, {}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(QUIZ_GENERATION_FAKE={'latency': 1.0})
+    async def test_generated_question_streams_field_by_field(self):
+        self.started = time.monotonic()
+        events = await self.read_events(await self.post(Accept='text/event-stream'))
+
+        self.assertEqual(
+            [event for event, _, _ in events], ['question', 'options', 'correct_answer', 'explanation', 'done']
+        )
+        done = events[-1][1]
+        self.assertEqual(done['source'], 'generated')
+        self.assertEqual(events[0][1], {'question': done['question']})
+        # The question text is written in the first part of the completion
+        self.assertLess(events[0][2], events[-1][2] / 2)
+
+    async def test_stored_question_and_errors_as_events(self):
+        await BufferedQuestion.objects.acreate(quiz=self.quiz, payload=QUESTION)
+        self.started = time.monotonic()
+        events = await self.read_events(await self.post(f'{self.url}?stream=1'))
+        self.assertEqual(events[-1][:2], ('done', dict(QUESTION, source='buffer')))
+
+        response = await self.post('/api/quizzes/0/generate_next_question/', Accept='text/event-stream')
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(response.content.startswith(b'event: error\ndata: '))
@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from ..models import Subject, Topic, Quiz, Question
+from .test_services import numbered_question
+
+
+class QuestionBankTest(TestCase):
+    def setUp(self):
+        topic = Topic.objects.create(name='Algebra', subject=Subject.objects.create(name='Mathematics'))
+        self.quiz = Quiz.objects.create(title='Algebra', topic=topic, class_level='Grade 10', difficulty='Easy')
+        Question.objects.bulk_create([
+            Question.from_generated(self.quiz, numbered_question(number)) for number in range(5)
+        ])
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command(*args, stdout=out)
+        return out.getvalue()
+
+    def assert_round_trip(self, name):
+        self.run_command('export_questions', self.path(name))
+        exported = sorted(Question.objects.values_list('question_text', 'correct_answer', 'is_ai_generated'))
+        Subject.objects.all().delete()
+
+        output = self.run_command('import_questions', self.path(name), '--batch-size', '2')
+        self.assertIn('Imported 5 questions', output)
+        self.assertEqual(sorted(Question.objects.values_list('question_text', 'correct_answer', 'is_ai_generated')), exported)
+        quiz = Quiz.objects.get(topic__name='Algebra', topic__subject__name='Mathematics')
+        self.assertEqual((quiz.title, quiz.difficulty, quiz.question_total), ('Algebra', 'Easy', 5))
+
+        # Importing again only finds duplicates
+        output = self.run_command('import_questions', self.path(name))
+        self.assertIn('Imported 0 questions', output)
+        self.assertIn('5 duplicates', output)
+        self.assertEqual(Question.objects.count(), 5)
+
+    def test_jsonl_round_trip(self):
+        self.assert_round_trip('bank.jsonl')
+
+    def test_csv_round_trip(self):
+        self.assert_round_trip('bank.csv')
+
+    def test_export_to_standard_output(self):
+        lines = self.run_command('export_questions', '-').splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual({json.loads(line)['subject'] for line in lines}, {'Mathematics'})
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        self.run_command('export_questions', self.path('bank.jsonl'))
+        with open(self.path('bank.jsonl'), 'a') as bank:
+            bank.write('not json\n')
+            bank.write('{"subject": "Mathematics", "topic": "Algebra", "difficulty": "Easy", "question": "Q?", '
+                       '"option_a": "1", "option_b": "2", "option_c": "3", "option_d": "4", "correct_answer": "E"}\n')
+            bank.write('{"subject": "Physics", "topic": "Optics", "difficulty": "Hard", "question": "Q?", '
+                       '"option_a": "1", "option_b": "2", "option_c": "3", "option_d": "4", "correct_answer": "A"}\n')
+        Question.objects.all().delete()
+
+        output = self.run_command('import_questions', self.path('bank.jsonl'), '--no-create')
+        self.assertIn('Imported 5 questions', output)
+        self.assertIn('line 6: not a JSON object', output)
+        self.assertIn('line 7: correct_answer', output)
+        self.assertIn('line 8: unknown quiz Physics / Optics (Hard)', output)
+        self.assertFalse(Subject.objects.filter(name='Physics').exists())
@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from ..models import Subject, Quiz, Question
+
+
+class BenchmarkCommandsTest(TestCase):
+    def test_seed_and_run(self):
+        # The sampling index and catalog are rebuilt once the seed commits
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                'seed_benchmark_data', subjects=2, topics=3, quizzes=12, questions=4, users=2, user_topics=4,
+                batch_size=10, stdout=StringIO()
+            )
+        self.assertEqual(Subject.objects.count(), 2)
+        self.assertEqual(Quiz.objects.count(), 12)
+        self.assertEqual(Question.objects.count(), 48)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            call_command('run_benchmarks', iterations=3, warmup=1, memory_iterations=1, output=path, stdout=StringIO())
+            with open(path) as output:
+                results = json.load(output)
+
+        self.assertEqual(results['dataset']['quizzes'], 12)
+        for name in ['random_mixed_quizzes', 'quiz_list', 'topics_by_subject', 'quiz_question']:
+            endpoint = results['endpoints'][name]
+            self.assertEqual(endpoint['status_codes'], [200])
+            self.assertLessEqual(endpoint['latency_ms']['p50'], endpoint['latency_ms']['p99'])
+            self.assertGreaterEqual(endpoint['queries']['max'], endpoint['queries']['median'])
+
+    def test_seeding_is_reproducible(self):
+        options = dict(subjects=1, topics=2, quizzes=4, questions=2, users=1, stdout=StringIO())
+        call_command('seed_benchmark_data', **options)
+        first = list(Question.objects.order_by('id').values_list('question_text', flat=True))
+        call_command('seed_benchmark_data', clear=True, **options)
+        second = list(Question.objects.order_by('id').values_list('question_text', flat=True))
+        self.assertEqual(len(second), 8)
+        self.assertEqual(
+            [text.split(':', 1)[1] for text in first], [text.split(':', 1)[1] for text in second]
+        )
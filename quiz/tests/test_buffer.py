@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from .. import buffer
+from ..dedup import clear_topic_indexes
+from ..generation_cache import GenerationCache, cache_key
+from ..jobs import run_next_job
+from ..models import Subject, Topic, Quiz, Question, BufferedQuestion, GenerationJob
+from ..services import QuizGenerator
+from ..transports import FakeTransport
+from .test_jobs import StubGenerator
+from .test_services import QUESTION, numbered_question
+
+
+@override_settings(QUIZ_BUFFER_LOW_WATER=2, QUIZ_BUFFER_TARGET=3)
+class QuestionBufferTest(TestCase):
+    def setUp(self):
+        clear_topic_indexes()
+        cache.clear()
+        maths = Subject.objects.create(name='Mathematics')
+        topic = Topic.objects.create(name='Algebra', subject=maths)
+        self.quiz = Quiz.objects.create(title='Algebra', topic=topic, class_level='Grade 10', difficulty='Easy')
+        self.user = User.objects.create_user(username='student', password='pass12345', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/quizzes/{self.quiz.id}/generate_next_question/'
+
+    def test_buffer_hit_and_refill(self):
+        for number in range(3):
+            BufferedQuestion.objects.create(quiz=self.quiz, payload=dict(QUESTION, question=f'Buffered {number}'))
+
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.data['source'], 'buffer')
+        self.assertEqual(response.data['question'], 'Buffered 0')
+        self.assertFalse(GenerationJob.objects.exists())
+
+        # Dropping below the low-water mark queues one refill job
+        self.client.post(self.url, {}, format='json')
+        self.client.post(self.url, {}, format='json')
+        job = GenerationJob.objects.get(kind='fill_buffer')
+        self.assertEqual(job.target_count, 3)
+
+        run_next_job('test-worker', StubGenerator([numbered_question(number) for number in range(3)]))
+        self.assertEqual(BufferedQuestion.objects.filter(quiz=self.quiz).count(), 3)
+        self.assertEqual(self.quiz.questions.count(), 0)
+
+    def test_refills_from_a_full_generation_pool(self):
+        pool = GenerationCache(pool_size=3)
+        pool.add(cache_key('Mathematics', 'Algebra', 'Easy', 'Grade 10'), [numbered_question(number) for number in range(3)])
+        generator = QuizGenerator(cache=pool, transport=FakeTransport())
+
+        # Pooled questions already in the buffer are not served again, so
+        # later refills generate live instead of failing as duplicates
+        buffered = []
+        for _ in range(3):
+            BufferedQuestion.objects.all().delete()
+            GenerationJob.objects.create(quiz=self.quiz, kind='fill_buffer', num_questions=3, target_count=3)
+            job = run_next_job('test-worker', generator)
+            self.assertEqual(job.status, 'completed')
+            buffered += [payload['question'] for payload in BufferedQuestion.objects.values_list('payload', flat=True)]
+
+        self.assertEqual(len(set(buffered)), 9)
+        self.assertEqual(pool.stats()['hits'], 3)
+
+    def test_falls_back_to_unseen_bank_question(self):
+        Question.from_generated(self.quiz, dict(QUESTION, question='Seen')).save()
+        Question.from_generated(self.quiz, dict(QUESTION, question='Unseen')).save()
+
+        response = self.client.post(self.url, {'previous_questions': [{'question': 'Seen'}]}, format='json')
+        self.assertEqual(response.data['source'], 'bank')
+        self.assertEqual(response.data['question'], 'Unseen')
+
+        stats = self.client.get(f'/api/quizzes/{self.quiz.id}/buffer_stats/').data['quiz']
+        self.assertEqual((stats['buffer'], stats['bank'], stats['requests']), (0, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.0)
+
+    def test_outcomes_are_shared_through_the_database(self):
+        other = Quiz.objects.create(title='Algebra', topic=self.quiz.topic, class_level='Grade 10', difficulty='Hard')
+        for outcome in ('buffer', 'buffer', 'generated'):
+            buffer.record_outcome(self.quiz.id, outcome)
+        buffer.record_outcome(other.id, 'bank')
+
+        stats = buffer.get_stats(self.quiz)
+        self.assertEqual((stats['buffer'], stats['bank'], stats['generated']), (2, 0, 1))
+        self.assertEqual(stats['hit_rate'], 0.667)
+        self.assertEqual(buffer.get_stats()['requests'], 4)
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ..catalog import CATALOG_VERSION
+from ..models import Subject, Topic
+from ..versions import deferred_bumps, get_version
+
+
+class CatalogCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.maths = Subject.objects.create(name='Mathematics')
+        Topic.objects.create(name='Algebra', subject=self.maths)
+        Topic.objects.create(name='Geometry', subject=self.maths)
+        Subject.objects.create(name='Physics')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='student', password='pass12345'))
+
+    def test_by_subject_is_served_from_cache(self):
+        first = self.client.get('/api/topics/by_subject/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([group['subject']['name'] for group in first.json()], ['Mathematics', 'Physics'])
+        self.assertEqual([topic['name'] for topic in first.json()[0]['topics']], ['Algebra', 'Geometry'])
+
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/topics/by_subject/')
+        self.assertEqual(second.content, first.content)
+
+    def test_changes_invalidate_the_cache(self):
+        self.client.get('/api/subjects/')
+        self.client.get('/api/topics/?subject=Mathematics')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Topic.objects.create(name='Calculus', subject=self.maths)
+            self.maths.name = 'Further Mathematics'
+            self.maths.save()
+
+        names = [subject['name'] for subject in self.client.get('/api/subjects/').json()]
+        self.assertIn('Further Mathematics', names)
+        topics = self.client.get('/api/topics/?subject=Mathematics').json()
+        self.assertEqual(sorted(topic['name'] for topic in topics), ['Algebra', 'Calculus', 'Geometry'])
+
+    def test_changes_bump_the_version_once_on_commit(self):
+        version = get_version(CATALOG_VERSION)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with deferred_bumps():
+                for name in ('Calculus', 'Statistics', 'Vectors'):
+                    Topic.objects.create(name=name, subject=self.maths)
+            self.assertEqual(get_version(CATALOG_VERSION), version)
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(get_version(CATALOG_VERSION), version)
+
+    def test_query_parameters_are_cached_separately(self):
+        self.assertEqual(len(self.client.get('/api/topics/?search=Algebra').json()), 1)
+        self.assertEqual(len(self.client.get('/api/topics/').json()), 2)
@@ -0,0 +1,85 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from ..models import Subject, Topic, Quiz, Question
+from ..serializers import QuizSerializer
+from .test_services import numbered_question
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.maths = Subject.objects.create(name='Mathematics')
+        self.algebra = Topic.objects.create(name='Algebra', subject=self.maths)
+        self.geometry = Topic.objects.create(name='Geometry', subject=self.maths)
+        self.quiz = Quiz.objects.create(title='Algebra', topic=self.algebra, class_level='Grade 10', difficulty='Easy')
+
+    def counts(self):
+        self.quiz.refresh_from_db()
+        self.algebra.refresh_from_db()
+        self.geometry.refresh_from_db()
+        self.maths.refresh_from_db()
+        return (self.quiz.question_total, self.quiz.ai_question_total,
+                self.algebra.quiz_count, self.geometry.quiz_count, self.maths.quiz_count)
+
+    def test_question_counters(self):
+        Question.from_generated(self.quiz, numbered_question(1)).save()
+        authored = Question.from_generated(self.quiz, numbered_question(2))
+        authored.is_ai_generated = False
+        authored.save()
+        Question.objects.bulk_create([Question.from_generated(self.quiz, numbered_question(n)) for n in (3, 4)])
+        # Conflicting rows are skipped, and the counters recounted
+        Question.objects.bulk_create(
+            [Question.from_generated(self.quiz, numbered_question(n)) for n in (4, 5)], ignore_conflicts=True
+        )
+        self.assertEqual(self.counts()[:2], (5, 4))
+
+        authored.delete()
+        Question.objects.filter(question_text__contains='3 + 3').delete()
+        self.assertEqual(self.counts()[:2], (3, 3))
+
+    def test_quiz_counters(self):
+        Quiz.objects.bulk_create([
+            Quiz(title='Shapes', topic=self.geometry, class_level='Grade 10', difficulty='Medium'),
+            Quiz(title='Angles', topic=self.geometry, class_level='Grade 10', difficulty='Hard'),
+        ])
+        self.assertEqual(self.counts()[2:], (1, 2, 3))
+
+        self.quiz.topic = self.geometry
+        self.quiz.save()
+        self.assertEqual(self.counts()[2:], (0, 3, 3))
+
+        Quiz.objects.filter(title='Angles').delete()
+        self.assertEqual(self.counts()[2:], (0, 2, 2))
+
+    def test_saving_stale_instances_keeps_counters(self):
+        stale_quiz = Quiz.objects.get(pk=self.quiz.pk)
+        stale_topic = Topic.objects.get(pk=self.geometry.pk)
+        Question.from_generated(self.quiz, numbered_question(1)).save()
+        Quiz.objects.create(title='Shapes', topic=self.geometry, class_level='Grade 10', difficulty='Easy')
+
+        stale_quiz.title = 'Renamed'
+        stale_quiz.save()
+        stale_topic.name = 'Shapes and space'
+        stale_topic.save()
+        self.assertEqual(self.counts(), (1, 1, 1, 1, 2))
+
+    def test_reconcile_fixes_drift(self):
+        Question.from_generated(self.quiz, numbered_question(1)).save()
+        Quiz.objects.filter(pk=self.quiz.pk).update(question_total=7)
+        Topic.objects.filter(pk=self.algebra.pk).update(quiz_count=0)
+
+        output = StringIO()
+        call_command('reconcile_counters', stdout=output)
+        self.assertIn('1 quizzes, 1 topics, 0 subjects', output.getvalue())
+        self.assertEqual(self.counts(), (1, 1, 1, 0, 1))
+
+        output = StringIO()
+        call_command('reconcile_counters', stdout=output)
+        self.assertIn('All counters are correct', output.getvalue())
+
+    def test_list_shows_actual_count_without_extra_queries(self):
+        Question.objects.bulk_create([Question.from_generated(self.quiz, numbered_question(n)) for n in range(3)])
+        quiz = Quiz.objects.select_related('topic__subject').get(pk=self.quiz.pk)
+        with self.assertNumQueries(0):
+            data = QuizSerializer(quiz).data
+        self.assertEqual((data['question_count'], data['ai_question_count']), (3, 3))
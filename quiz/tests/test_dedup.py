@@ -0,0 +1,97 @@
+from importlib import import_module
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from ..dedup import NearDuplicateIndex, clear_topic_indexes, content_hash, index_for_texts
+from ..jobs import run_next_job
+from ..models import Subject, Topic, Quiz, Question, BufferedQuestion, GenerationJob
+from .test_jobs import StubGenerator
+from .test_services import QUESTION, numbered_question
+
+PHOTOSYNTHESIS = 'Which of the following gases is released by green plants during the process of photosynthesis?'
+
+
+class NearDuplicateIndexTest(SimpleTestCase):
+    def test_exact_duplicates_ignore_case_and_punctuation(self):
+        self.assertEqual(content_hash('What is 2 + 2?'), content_hash('what is 2+2'))
+        self.assertNotEqual(content_hash('What is 2 + 2?'), content_hash('What is 2 + 3?'))
+
+    def test_reworded_question_is_a_near_duplicate(self):
+        index = NearDuplicateIndex(threshold=0.5)
+        index.add('original', PHOTOSYNTHESIS)
+        key, score = index.find(
+            'Which of the following gases is released by green plants during photosynthesis?'
+        )
+        self.assertEqual(key, 'original')
+        self.assertGreaterEqual(score, 0.5)
+
+    def test_different_question_is_not_a_duplicate(self):
+        index = index_for_texts([PHOTOSYNTHESIS])
+        self.assertFalse(index.is_duplicate('Solve for x in the equation 3x + 5 = 20 and give your answer.'))
+
+
+class DuplicateRejectionTest(TestCase):
+    def setUp(self):
+        clear_topic_indexes()
+        cache.clear()
+        maths = Subject.objects.create(name='Mathematics')
+        topic = Topic.objects.create(name='Algebra', subject=maths)
+        self.quiz = Quiz.objects.create(title='Algebra', topic=topic, class_level='Grade 10', difficulty='Easy')
+        self.user = User.objects.create_user(username='student', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_exact_duplicates_are_blocked_by_the_database(self):
+        Question.from_generated(self.quiz, QUESTION).save()
+        Question.objects.bulk_create(
+            [Question.from_generated(self.quiz, dict(QUESTION, question='WHAT is 2 + 2'))], ignore_conflicts=True
+        )
+        self.assertEqual(self.quiz.questions.count(), 1)
+
+    def test_migration_deletes_legacy_duplicates_without_a_hash(self):
+        Question.from_generated(self.quiz, QUESTION).save()
+        duplicate = Question.from_generated(self.quiz, numbered_question(1))
+        duplicate.save()
+        legacy = Question.from_generated(self.quiz, numbered_question(2))
+        legacy.save()
+        # Rows 0013 left unhashed because an older row had the same text
+        Question.objects.filter(pk=duplicate.pk).update(question_text='WHAT is 2 + 2', content_hash=None)
+        Question.objects.filter(pk=legacy.pk).update(content_hash=None)
+
+        migration = import_module('quiz.migrations.0022_delete_legacy_duplicate_questions')
+        migration.delete_duplicate_questions(apps, None)
+
+        self.assertFalse(Question.objects.filter(pk=duplicate.pk).exists())
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.content_hash, content_hash(numbered_question(2)['question']))
+        legacy.explanation = 'Edited'
+        legacy.save()
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.question_total, 2)
+
+    def test_job_rejects_duplicates_of_stored_questions(self):
+        Question.from_generated(self.quiz, numbered_question(1)).save()
+        GenerationJob.objects.create(quiz=self.quiz, kind='fill_quiz', num_questions=2)
+
+        generator = StubGenerator([numbered_question(1), numbered_question(2)], [numbered_question(3)])
+        job = run_next_job('test-worker', generator)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(generator.requested, [2, 1])
+        self.assertEqual([failure['reason'] for failure in job.failures], ['duplicate'])
+        self.assertEqual(self.quiz.questions.count(), 3)
+
+    def test_buffer_skips_questions_the_student_has_seen(self):
+        BufferedQuestion.objects.create(quiz=self.quiz, payload=dict(QUESTION, question=PHOTOSYNTHESIS))
+        BufferedQuestion.objects.create(quiz=self.quiz, payload=numbered_question(1))
+
+        response = self.client.post(
+            f'/api/quizzes/{self.quiz.id}/generate_next_question/',
+            {'previous_questions': [{'question': PHOTOSYNTHESIS.upper()}]},
+            format='json'
+        )
+        self.assertEqual(response.data['source'], 'buffer')
+        self.assertEqual(response.data['question'], numbered_question(1)['question'])
+        # The skipped question stays buffered for other students
+        self.assertEqual(BufferedQuestion.objects.get(quiz=self.quiz).payload['question'], PHOTOSYNTHESIS)
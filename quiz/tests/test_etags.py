@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ..models import Subject, Topic, Quiz, Question
+from .test_services import numbered_question
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        maths = Subject.objects.create(name='Mathematics')
+        self.topic = Topic.objects.create(name='Algebra', subject=maths)
+        self.quiz = Quiz.objects.create(title='Algebra', topic=self.topic, class_level='Grade 10', difficulty='Easy')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='student', password='pass12345'))
+
+    def revalidate(self, url):
+        """Fetch ``url``, then fetch it again with the returned ETag."""
+        etag = self.client.get(url)['ETag']
+        return etag, self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_catalog_revalidation(self):
+        etag, response = self.revalidate('/api/topics/by_subject/')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Topic.objects.create(name='Geometry', subject=self.topic.subject)
+        response = self.client.get('/api/topics/by_subject/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_quiz_detail_revalidation(self):
+        url = f'/api/quizzes/{self.quiz.id}/'
+        etag, response = self.revalidate(url)
+        self.assertEqual(response.status_code, 304)
+
+        self.topic.name = 'Linear Algebra'
+        self.topic.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_quiz_questions_revalidation(self):
+        Question.from_generated(self.quiz, numbered_question(1)).save()
+        url = f'/api/quizzes/{self.quiz.id}/questions/'
+        etag, response = self.revalidate(url)
+        self.assertEqual(response.status_code, 304)
+
+        question = self.quiz.questions.get()
+        question.explanation = 'Corrected explanation'
+        question.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['explanation'], 'Corrected explanation')
+
+    def test_missing_quiz_is_404(self):
+        self.assertEqual(self.client.get('/api/quizzes/999/').status_code, 404)
@@ -0,0 +1,60 @@
+from decimal import Decimal
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from ..benchmarks import benchmark_serializers
+from ..fast_serializers import question_serializer, quiz_serializer
+from ..models import Subject, Topic, Quiz, Question
+from ..renderers import FastJSONRenderer
+from ..serializers import QuestionSerializer, QuizSerializer
+from .test_services import numbered_question
+
+
+class FastSerializerTest(TestCase):
+    def setUp(self):
+        topic = Topic.objects.create(name='Algèbre', subject=Subject.objects.create(name='Mathematics'))
+        self.quiz = Quiz.objects.create(title='Algebra', topic=topic, class_level='Grade 10', difficulty='Easy')
+        Quiz.objects.create(title='No topic', class_level='Grade 12', difficulty='Hard')
+        Question.objects.bulk_create([
+            Question.from_generated(self.quiz, numbered_question(number)) for number in range(3)
+        ])
+
+    def assert_same_output(self, fast_serializer, serializer_class, queryset):
+        instances = list(queryset)
+        expected = serializer_class(instances, many=True).data
+        actual = fast_serializer.many(instances)
+        self.assertEqual([list(row.items()) for row in actual], [list(row.items()) for row in expected])
+        self.assertEqual(FastJSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_quizzes_match_drf(self):
+        # Includes a quiz without a topic, whose topic and subject names DRF leaves out
+        self.assert_same_output(quiz_serializer, QuizSerializer, Quiz.objects.select_related('topic__subject'))
+
+    def test_questions_match_drf(self):
+        self.assert_same_output(question_serializer, QuestionSerializer, Question.objects.all())
+
+    @override_settings(TIME_ZONE='Africa/Accra')
+    def test_datetimes_follow_the_current_timezone(self):
+        with timezone.override('Asia/Tokyo'):
+            self.assert_same_output(question_serializer, QuestionSerializer, Question.objects.all())
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            'text': 'Ẹ kú àárọ̀   "quoted" \n', 'lazy': gettext_lazy('Not found.'), 'amount': Decimal('1.5'),
+            'when': timezone.now(), 'items': [1, True, None, {'nested': []}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        indented = 'application/json; indent=2'
+        self.assertEqual(FastJSONRenderer().render(data, indented), JSONRenderer().render(data, indented))
+
+    def test_floats_match_json_renderer(self):
+        data = {'scores': [0.5, 1e16, 1e-05, 0.0, -2.5e20, 123456789012345.6]}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        with self.assertRaises(ValueError):
+            FastJSONRenderer().render({'score': float('nan')})
+
+    def test_benchmark_reports_identical_output(self):
+        results = benchmark_serializers(sizes=(5,), iterations=1)['results']
+        self.assertTrue(results['quiz'][5]['identical'])
+        self.assertTrue(results['question'][5]['identical'])
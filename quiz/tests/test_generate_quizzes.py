@@ -0,0 +1,55 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase
+from ..models import Subject, Topic, Quiz
+
+
+class GenerateQuizzesTest(TestCase):
+    def setUp(self):
+        self.maths = Subject.objects.create(name='Mathematics')
+        self.topics = [Topic.objects.create(name=f'Topic {number}', subject=self.maths) for number in range(5)]
+
+    def generate(self, *args):
+        out = StringIO()
+        call_command('generate_quizzes', *args, stdout=out)
+        return out.getvalue()
+
+    def test_creates_three_quizzes_per_topic_in_chunks(self):
+        output = self.generate('--batch-size', '2')
+        self.assertEqual(Quiz.objects.count(), 15)
+        self.assertIn('2/5 topics', output)
+        self.assertIn('5/5 topics: 15 created, 0 updated', output)
+        self.assertEqual(
+            sorted(Quiz.objects.filter(topic=self.topics[0]).values_list('difficulty', 'num_of_questions')),
+            [('Easy', 10), ('Hard', 20), ('Medium', 15)]
+        )
+        self.topics[0].refresh_from_db()
+        self.maths.refresh_from_db()
+        self.assertEqual((self.topics[0].quiz_count, self.maths.quiz_count), (3, 15))
+
+    def test_rerun_updates_instead_of_duplicating(self):
+        self.generate()
+        quiz = Quiz.objects.get(topic=self.topics[0], difficulty='Easy')
+        Topic.objects.filter(pk=self.topics[0].pk).update(name='Renamed')
+
+        output = self.generate()
+        self.assertIn('0 created, 15 updated', output)
+        self.assertEqual(Quiz.objects.count(), 15)
+        quiz.refresh_from_db()
+        self.assertIn('Renamed', quiz.title)
+        self.maths.refresh_from_db()
+        self.assertEqual(self.maths.quiz_count, 15)
+
+    def test_resumes_after_partial_run(self):
+        Quiz.objects.create(
+            title='Old', topic=self.topics[0], class_level='Grade 10', difficulty='Easy', is_wassce_related=True
+        )
+        output = self.generate()
+        self.assertIn('14 created, 1 updated', output)
+        self.assertEqual(Quiz.objects.count(), 15)
+
+    def test_uniqueness_is_enforced(self):
+        self.generate()
+        with self.assertRaises(IntegrityError):
+            Quiz.objects.create(title='Copy', topic=self.topics[0], class_level='Grade 10', difficulty='Easy')
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase
+from ..dedup import index_for_texts
+from ..generation_cache import GenerationCache, cache_key
+from ..services import QuizGenerator
+from .test_services import completion, numbered_question
+
+
+class GenerationCacheTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'generations.sqlite3')
+
+    def test_pool_serves_hits_in_rotation_once_full(self):
+        cache = GenerationCache(pool_size=2)
+        key = cache_key('Mathematics', 'Algebra', 'Easy', 'Grade 10')
+        cache.add(key, [numbered_question(1)])
+        self.assertIsNone(cache.get(key))
+
+        cache.add(key, [numbered_question(2)])
+        served = [cache.get(key)['question'] for _ in range(3)]
+        self.assertEqual(served, [numbered_question(n)['question'] for n in (1, 2, 1)])
+        # Questions the caller has seen are skipped
+        exclude = index_for_texts([numbered_question(2)['question']])
+        self.assertEqual(cache.get(key, exclude=exclude)['question'], numbered_question(1)['question'])
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (4, 1, 2))
+
+    def test_keys_are_normalized(self):
+        self.assertEqual(
+            cache_key('Mathematics', ' Algebra ', 'Easy', 'Grade 10'),
+            cache_key('mathematics', 'algebra', 'EASY', 'grade  10')
+        )
+
+    def test_lru_and_ttl_eviction(self):
+        cache = GenerationCache(pool_size=1, max_keys=2)
+        for name in ('a', 'b', 'c'):
+            cache.add(name, [numbered_question(1)])
+        self.assertEqual(list(cache.pools), ['b', 'c'])
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+        cache.ttl = 0
+        self.assertIsNone(cache.get('c'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_entries_survive_a_restart(self):
+        GenerationCache(pool_size=2, path=self.path).add('key', [numbered_question(1), numbered_question(2), numbered_question(3)])
+        cache = GenerationCache(pool_size=2, path=self.path)
+        self.assertEqual(cache.get('key')['question'], numbered_question(2)['question'])
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_generator_uses_cache(self):
+        cache = GenerationCache(pool_size=2)
+        responses = iter([completion(json.dumps(numbered_question(n))) for n in (1, 2)])
+        with mock.patch('quiz.transports.openai.ChatCompletion.create', side_effect=lambda **kwargs: next(responses)) as create:
+            generator = QuizGenerator(cache=cache)
+            questions = [generator.generate_question('Mathematics', 'Algebra', 'Easy', 'Grade 10') for _ in range(3)]
+        self.assertEqual(create.call_count, 2)
+        self.assertEqual(questions[2], questions[0])
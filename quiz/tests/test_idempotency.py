@@ -0,0 +1,73 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ..dedup import clear_topic_indexes
+from ..jobs import claim_job, coalesce_generation
+from ..models import Subject, Topic, Quiz, GenerationJob, IdempotencyKey
+
+
+class SingleFlightTest(TestCase):
+    def setUp(self):
+        clear_topic_indexes()
+        maths = Subject.objects.create(name='Mathematics')
+        topic = Topic.objects.create(name='Algebra', subject=maths)
+        self.quiz = Quiz.objects.create(title='Algebra', topic=topic, class_level='Grade 10', difficulty='Easy')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='student', password='pass12345'))
+
+    def generate(self, num_questions, **headers):
+        return self.client.post(
+            f'/api/quizzes/{self.quiz.id}/generate_questions/', {'num_questions': num_questions}, format='json', **headers
+        )
+
+    def test_concurrent_requests_share_one_job(self):
+        first, second = self.generate(5), self.generate(5)
+        self.assertEqual(first.data['job_id'], second.data['job_id'])
+        self.assertEqual((first.data['coalesced'], second.data['coalesced']), (False, True))
+        self.assertEqual(GenerationJob.objects.count(), 1)
+
+    def test_pending_job_is_raised_to_the_larger_target(self):
+        self.generate(5)
+        job = GenerationJob.objects.get(pk=self.generate(8).data['job_id'])
+        self.assertEqual((job.num_questions, job.target_count), (8, 8))
+
+        claim_job('worker')
+        job = GenerationJob.objects.get(pk=self.generate(12).data['job_id'])
+        self.assertEqual(job.target_count, 8)
+
+    def test_finished_jobs_do_not_block_new_ones(self):
+        job, created = coalesce_generation(self.quiz, 3, target_count=3)
+        GenerationJob.objects.filter(pk=job.pk).update(status='completed')
+        other, created = coalesce_generation(self.quiz, 3, target_count=3)
+        self.assertTrue(created)
+        self.assertNotEqual(other.pk, job.pk)
+
+    def test_retries_with_a_key_replay_the_response(self):
+        first = self.generate(5, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        GenerationJob.objects.update(status='completed')
+        retry = self.generate(5, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        self.assertEqual(retry.status_code, 202)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(GenerationJob.objects.count(), 1)
+
+    def test_key_reused_for_another_request_is_refused(self):
+        self.generate(5, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        self.assertEqual(self.generate(6, HTTP_IDEMPOTENCY_KEY='attempt-1').status_code, 422)
+
+    def test_retry_while_the_first_request_runs_is_a_conflict(self):
+        self.generate(5, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        # As the row looks before the first request has finished
+        IdempotencyKey.objects.update(status_code=None, response=None)
+        self.assertEqual(self.generate(5, HTTP_IDEMPOTENCY_KEY='attempt-1').status_code, 409)
+
+    def test_expired_keys_are_pruned(self):
+        self.generate(5, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        output = StringIO()
+        call_command('prune_idempotency_keys', stdout=output)
+        self.assertIn('Pruned 1 expired idempotency keys', output.getvalue())
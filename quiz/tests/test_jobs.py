@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ..dedup import clear_topic_indexes
+from ..jobs import claim_job, run_next_job
+from ..models import Subject, Topic, Quiz, Question, GenerationJob
+from ..services import BatchResult, GenerationFailure
+from .test_services import QUESTION, numbered_question
+
+
+class StubGenerator:
+    """Returns canned batches instead of calling OpenAI"""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+        self.requested = []
+
+    def generate_questions(self, num_questions, **kwargs):
+        self.requested.append(num_questions)
+        questions = self.batches.pop(0) if self.batches else []
+        return BatchResult(questions[:num_questions], [GenerationFailure(0, 'invalid', 'bad', 0.1)] if not questions else [])
+
+
+class GenerationJobTest(TestCase):
+    def setUp(self):
+        clear_topic_indexes()
+        maths = Subject.objects.create(name='Mathematics')
+        topic = Topic.objects.create(name='Algebra', subject=maths)
+        self.quiz = Quiz.objects.create(
+            title='Algebra', topic=topic, class_level='Grade 10', difficulty='Easy', is_wassce_related=False
+        )
+        self.user = User.objects.create_user(username='student', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_generate_questions_is_queued(self):
+        Question.from_generated(self.quiz, QUESTION).save()
+        response = self.client.post(f'/api/quizzes/{self.quiz.id}/generate_questions/', {'num_questions': 3}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['existing_count'], 1)
+
+        job = GenerationJob.objects.get(pk=response.data['job_id'])
+        self.assertEqual((job.num_questions, job.target_count, job.status), (2, 3, 'pending'))
+
+        generator = StubGenerator([numbered_question(1)], [numbered_question(2)])
+        job = run_next_job('test-worker', generator)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(generator.requested, [2, 1])
+        self.assertEqual(self.quiz.questions.count(), 3)
+        self.quiz.refresh_from_db()
+        self.assertTrue(self.quiz.is_wassce_related)
+
+        response = self.client.get(response.data['status_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['progress'], 1.0)
+        self.assertEqual(len(response.data['questions']), 2)
+
+    def test_job_fails_after_max_attempts(self):
+        response = self.client.post('/api/questions/generate_for_quiz/', {'quiz_id': self.quiz.id}, format='json')
+        self.assertEqual(response.status_code, 202)
+
+        generator = StubGenerator()
+        job = run_next_job('test-worker', generator)
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.attempts, job.max_attempts)
+        self.assertEqual(len(generator.requested), job.max_attempts)
+        self.assertEqual(job.failures[0]['reason'], 'invalid')
+
+    def test_job_is_claimed_once(self):
+        GenerationJob.objects.create(quiz=self.quiz, kind='single_question', num_questions=1)
+        self.assertIsNotNone(claim_job('first'))
+        self.assertIsNone(claim_job('second'))
+
+    def test_target_count_prevents_overshoot(self):
+        job = GenerationJob.objects.create(quiz=self.quiz, kind='fill_quiz', num_questions=2, target_count=2)
+        Question.from_generated(self.quiz, numbered_question(1)).save()
+        Question.from_generated(self.quiz, numbered_question(2)).save()
+        generator = StubGenerator([numbered_question(3), numbered_question(4)])
+        job = run_next_job('test-worker', generator)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(generator.requested, [])
+        self.assertEqual(self.quiz.questions.count(), 2)
+
+    def test_jobs_are_private_to_requester(self):
+        job = GenerationJob.objects.create(quiz=self.quiz, kind='single_question', num_questions=1)
+        response = self.client.get(f'/api/generation-jobs/{job.id}/')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ..models import Subject, Topic, Quiz, Question
+from .test_services import numbered_question
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        maths = Subject.objects.create(name='Mathematics')
+        # A topic holds one quiz per difficulty and type
+        self.quizzes = [
+            Quiz.objects.create(
+                title=f'Quiz {number}', topic=Topic.objects.create(name=f'Topic {number}', subject=maths),
+                class_level='Grade 10', difficulty='Easy',
+                is_wassce_related=number % 3 == 0
+            )
+            for number in range(25)
+        ]
+        # Ties on created_at are broken by id
+        Quiz.objects.filter(id__in=[quiz.id for quiz in self.quizzes[5:15]]).update(created_at=timezone.now())
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='student', password='pass12345'))
+
+    def collect(self, url):
+        ids, pages = [], 0
+        while url:
+            data = self.client.get(url).json()
+            ids.extend(item['id'] for item in data['results'])
+            url = data['next']
+            pages += 1
+        return ids, pages
+
+    def test_pages_cover_every_quiz_once(self):
+        ids, pages = self.collect('/api/quizzes/?page_size=7')
+        self.assertEqual(pages, 4)
+        expected = Quiz.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_client_ordering_is_paginated_by_keyset(self):
+        ids, _ = self.collect('/api/quizzes/?ordering=title&page_size=10')
+        self.assertEqual(ids, list(Quiz.objects.order_by('title', 'id').values_list('id', flat=True)))
+
+    def test_metadata_comes_from_one_query(self):
+        first = self.client.get('/api/quizzes/?page_size=5').json()
+        self.assertEqual(first['metadata'], {'total_quizzes': 25, 'wassce_quizzes': 9})
+
+        # Deeper pages cost the same: the page query and the cached metadata
+        with self.assertNumQueries(1):
+            self.client.get(first['next'])
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get('/api/quizzes/?cursor=garbage').status_code, 404)
+
+    def test_questions_are_paginated(self):
+        Question.objects.bulk_create([
+            Question.from_generated(self.quizzes[0], numbered_question(number)) for number in range(5)
+        ])
+        ids, pages = self.collect('/api/questions/?page_size=2')
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, sorted(ids))
@@ -0,0 +1,136 @@
+import re
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ..models import GenerationJob, Quiz, Subject, Topic
+from ..sampling import get_index
+from ..search import search_backend
+
+# SQLite reports a full table read as a bare "SCAN <table>"; with an index it
+# is "SCAN <table> USING [COVERING] INDEX", "SEARCH ..." or a virtual table
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (\w+)(?! USING| VIRTUAL TABLE)\s*$')
+POSTGRES_FULL_SCAN = re.compile(r'\bSeq Scan on (\w+)')
+
+
+def query_plan(sql, params=()):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Seeded tables are small enough that a sequential scan is the
+            # cheapest plan; only one that has no usable index is wanted
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryRecorder:
+    """
+    ``connection.execute_wrapper`` that keeps the SQL of every query with its
+    parameters, so the plan is asked for the query as it ran.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many:
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def full_scans(plan):
+    """Tables that ``plan`` reads in full."""
+    pattern = POSTGRES_FULL_SCAN if connection.vendor == 'postgresql' else SQLITE_FULL_SCAN
+    return {match.group(1) for line in plan for match in [pattern.search(line)] if match}
+
+
+class QueryPlanTest(TestCase):
+    """
+    Every query the hot endpoints run, against seeded data, must be answered
+    from an index.  Add the index (or a deliberate exception) when one fails.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_benchmark_data', subjects=3, topics=8, quizzes=60, questions=5, users=1, user_topics=6,
+            stdout=StringIO()
+        )
+        cls.user = User.objects.get(username='benchmark_user_0')
+        cls.quiz = Quiz.objects.order_by('id').first()
+        cls.subject = Subject.objects.order_by('id').first()
+        cls.topic = Topic.objects.order_by('id').first()
+
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('Plans are only checked on SQLite and PostgreSQL')
+        cache.clear()
+        # Built once per catalog version and looked up once per process, not per request
+        get_index()
+        search_backend()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertIndexed(self, url, allowed=()):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertTrue(recorder.queries, url)
+        for sql, params in recorder.queries:
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = query_plan(sql, params)
+            scanned = full_scans(plan) - set(allowed)
+            self.assertFalse(scanned, '{} reads {} in full:\n{}\n{}'.format(url, ', '.join(sorted(scanned)), sql, '\n'.join(plan)))
+
+    def test_quiz_list(self):
+        self.assertIndexed('/api/quizzes/?page_size=5')
+        self.assertIndexed('/api/quizzes/?is_wassce=true&page_size=5')
+        self.assertIndexed('/api/quizzes/?ordering=title&page_size=5')
+        next_page = self.client.get('/api/quizzes/?is_wassce=false&page_size=5').json()['next']
+        self.assertIndexed(next_page)
+
+    def test_quiz_search(self):
+        self.assertIndexed('/api/quizzes/?search=benchmark&page_size=5')
+        self.assertIndexed('/api/search/?q=benchmark')
+
+    def test_quiz_detail(self):
+        self.assertIndexed(f'/api/quizzes/{self.quiz.id}/')
+        self.assertIndexed(f'/api/quizzes/{self.quiz.id}/question/?count=3')
+        self.assertIndexed(f'/api/quizzes/{self.quiz.id}/questions/')
+
+    def test_feeds(self):
+        self.assertIndexed('/api/quizzes/random_mixed_quizzes/')
+        self.assertIndexed('/api/quizzes/random_mixed_quizzes/?difficulty=easy&search=benchmark')
+        self.assertIndexed('/api/quizzes/random_wassce_quizzes/')
+        self.assertIndexed('/api/quizzes/random_trivial_quizzes/')
+
+    def test_topics_of_a_subject(self):
+        self.assertIndexed(f'/api/topics/?subject={self.subject.id}')
+        self.assertIndexed(f'/api/topics/{self.topic.id}/')
+
+    def test_catalog_reads_whole_tables_by_design(self):
+        self.assertIndexed('/api/subjects/', allowed=['quiz_subject'])
+        self.assertIndexed('/api/topics/by_subject/', allowed=['quiz_subject', 'quiz_topic'])
+        # The LIKE pattern is a parameter holding "%"
+        self.assertIndexed('/api/topics/?search=Alg', allowed=['quiz_subject', 'quiz_topic'])
+
+    def test_unfinished_jobs_of_a_quiz(self):
+        queryset = GenerationJob.objects.filter(quiz=self.quiz, kind='fill_buffer', status__in=['pending', 'running'])
+        sql, params = queryset.query.sql_with_params()
+        plan = query_plan(sql, params)
+        self.assertFalse(full_scans(plan), '\n'.join(plan))
+
+    def test_sampling_index_reads_only_the_feed_index(self):
+        queryset = Quiz.objects.order_by().values_list('id', 'topic_id', 'is_wassce_related', 'difficulty', 'class_level')
+        sql, params = queryset.query.sql_with_params()
+        plan = query_plan(sql, params)
+        self.assertFalse(full_scans(plan), '\n'.join(plan))
+        if connection.vendor == 'sqlite':
+            self.assertIn('COVERING INDEX quiz_feed_idx', '\n'.join(plan))
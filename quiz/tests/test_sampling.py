@@ -0,0 +1,104 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from ..models import Subject, Topic, Quiz
+from ..sampling import QuizSampler, allocate, draw, get_index
+
+
+def make_quiz(topic, is_wassce_related=True, difficulty='Easy', class_level='Grade 10'):
+    return Quiz.objects.create(
+        title=f'{topic.name} quiz',
+        topic=topic,
+        class_level=class_level,
+        difficulty=difficulty,
+        is_wassce_related=is_wassce_related
+    )
+
+
+class AllocationTest(TestCase):
+    def test_default_split(self):
+        self.assertEqual(allocate(10, 0.6, 50, 50), (6, 4))
+
+    def test_fills_in_from_other_stratum(self):
+        self.assertEqual(allocate(10, 0.6, 2, 50), (2, 8))
+        self.assertEqual(allocate(10, 0.6, 50, 1), (9, 1))
+        self.assertEqual(allocate(10, 0.6, 3, 4), (3, 4))
+
+    def test_draw_is_distinct_across_buckets(self):
+        drawn = draw([[1, 2], [3], [4, 5, 6]], 6)
+        self.assertEqual(sorted(drawn), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(draw([], 3), [])
+
+
+class QuizSamplerTest(TestCase):
+    def setUp(self):
+        # The index is rebuilt once the writes commit
+        with self.captureOnCommitCallbacks(execute=True):
+            maths = Subject.objects.create(name='Mathematics')
+            physics = Subject.objects.create(name='Physics')
+            self.algebra = Topic.objects.create(name='Algebra', subject=maths)
+            self.optics = Topic.objects.create(name='Optics', subject=physics)
+            # A topic holds one quiz per difficulty and type, so spread them over several
+            self.maths_topics = [self.algebra] + [
+                Topic.objects.create(name=f'Algebra {number}', subject=maths) for number in range(1, 8)
+            ]
+            for topic in self.maths_topics:
+                make_quiz(topic, is_wassce_related=True)
+                make_quiz(topic, is_wassce_related=False, difficulty='Hard')
+            make_quiz(self.optics, is_wassce_related=True)
+
+    def test_stratified_sample(self):
+        sample = QuizSampler(size=10, wassce_ratio=0.6).sample([topic.id for topic in self.maths_topics])
+        self.assertEqual(len(sample.quizzes), 10)
+        self.assertEqual(sum(quiz.is_wassce_related for quiz in sample.quizzes), 6)
+        self.assertEqual((sample.wassce_total, sample.trivial_total), (8, 8))
+        self.assertEqual(len({quiz.id for quiz in sample.quizzes}), 10)
+
+    def test_filters(self):
+        sample = QuizSampler().sample([self.algebra.id, self.optics.id], difficulty='hard')
+        self.assertEqual(sample.wassce_total, 0)
+        self.assertTrue(all(quiz.difficulty == 'Hard' for quiz in sample.quizzes))
+
+    def test_index_follows_writes(self):
+        index = get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_quiz(self.optics, is_wassce_related=False)
+            # Uncommitted rows are not indexed yet
+            self.assertIs(get_index(), index)
+        self.assertIsNot(get_index(), index)
+        sample = QuizSampler().sample([self.optics.id], include_wassce=False)
+        self.assertEqual(sample.trivial_total, 1)
+
+    def test_filters_topics_by_subject(self):
+        index = get_index()
+        self.assertEqual(index.filter_topic_ids([self.algebra.id, self.optics.id], subject='math'), [self.algebra.id])
+
+
+@override_settings(QUIZ_FEED_SIZE=10, QUIZ_FEED_WASSCE_RATIO=0.6)
+class MixedFeedTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            maths = Subject.objects.create(name='Mathematics')
+            topics = [Topic.objects.create(name=f'Algebra {number}', subject=maths) for number in range(4)]
+            for difficulty in ['Easy', 'Medium', 'Hard']:
+                make_quiz(topics[0], is_wassce_related=True, difficulty=difficulty)
+                for topic in topics:
+                    make_quiz(topic, is_wassce_related=False, difficulty=difficulty)
+        self.user = User.objects.create_user(username='student', password='pass12345')
+        self.user.profile.set_selected_topics(
+            {'Mathematics': [topic.name for topic in topics]}, [topic.id for topic in topics]
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_mixed_feed_fills_in_and_counts(self):
+        get_index()  # warm the index so the request only loads the drawn rows
+        self.user = User.objects.select_related('profile').get(pk=self.user.pk)
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/quizzes/random_mixed_quizzes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['wassce_fetched'], 3)
+        self.assertEqual(response.data['trivial_fetched'], 7)
+        self.assertEqual(response.data['total_quizzes'], 15)
+        self.assertEqual(response.data['fetched_count'], 10)
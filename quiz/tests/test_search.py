@@ -0,0 +1,92 @@
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from ..models import Subject, Topic, Quiz, Question, SearchDocument
+from ..search import matching_quiz_ids, search, search_backend, search_quiz_ids
+from .test_services import numbered_question
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        maths = Subject.objects.create(name='Mathematics')
+        self.algebra = Topic.objects.create(name='Algebra', subject=maths)
+        self.optics = Topic.objects.create(name='Optics', subject=Subject.objects.create(name='Physics'))
+        self.equations = Quiz.objects.create(
+            title='Quadratic equations', topic=self.algebra, class_level='Grade 11', difficulty='Medium',
+            description='Factorising and completing the square'
+        )
+        self.lenses = Quiz.objects.create(
+            title='Lenses and mirrors', topic=self.optics, class_level='Grade 12', difficulty='Hard'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='student', password='pass12345'))
+
+    @override_settings(QUIZ_SEARCH_MAX_RESULTS=1)
+    def test_only_the_search_endpoint_is_capped(self):
+        # "Mathematics" and "mirrors"
+        self.assertEqual(len(self.client.get('/api/search/?q=m&limit=5').json()['results']), 1)
+        self.assertEqual(sorted(search_quiz_ids('m')), [self.equations.id, self.lenses.id])
+        self.assertEqual(len(self.client.get('/api/quizzes/?search=m').json()['results']), 2)
+
+    def test_uses_fts5_on_sqlite(self):
+        self.assertEqual(search_backend(), 'fts5')
+
+    def test_ranked_search_over_quizzes_and_questions(self):
+        question = Question.from_generated(self.lenses, numbered_question(1))
+        question.question_text = 'Which lens converges parallel rays of light?'
+        question.save()
+
+        results = self.client.get('/api/search/?q=lens').json()['results']
+        self.assertEqual(
+            [(result['type'], result['id']) for result in results],
+            [('quiz', self.lenses.id), ('question', question.id)]
+        )
+        self.assertEqual(results[1]['quiz_id'], self.lenses.id)
+
+        # Prefixes of every word must match, in any field of the document
+        self.assertEqual(search_quiz_ids('quad squ'), [self.equations.id])
+        self.assertEqual(search_quiz_ids('mathematics'), [self.equations.id])
+        self.assertEqual(search('lens', kind='question')[0]['id'], question.id)
+
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+        self.assertEqual(self.client.get('/api/search/?q=lens&type=topic').status_code, 400)
+
+    def test_documents_follow_changes(self):
+        self.equations.title = 'Simultaneous equations'
+        self.equations.save()
+        self.assertEqual(search_quiz_ids('simultaneous'), [self.equations.id])
+        self.assertEqual(search_quiz_ids('quadratic'), [])
+
+        self.optics.name = 'Geometrical optics'
+        self.optics.save()
+        self.assertEqual(search_quiz_ids('geometrical'), [self.lenses.id])
+
+        Question.objects.bulk_create([Question.from_generated(self.equations, numbered_question(2))])
+        self.assertEqual(len(search(numbered_question(2)['question'], kind='question')), 1)
+
+        self.lenses.delete()
+        self.assertEqual(search_quiz_ids('lenses'), [])
+
+    def test_quiz_list_search_parameter(self):
+        response = self.client.get('/api/quizzes/?search=optics')
+        self.assertEqual([quiz['id'] for quiz in response.json()['results']], [self.lenses.id])
+
+    def test_matches_filter_in_a_subquery(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(sorted(Quiz.objects.filter(id__in=matching_quiz_ids('m')).values_list('id', flat=True)),
+                             [self.equations.id, self.lenses.id])
+        self.assertFalse(Quiz.objects.filter(id__in=matching_quiz_ids('!!')).exists())
+        with mock.patch('quiz.search.search_backend', return_value=None):
+            self.assertEqual(list(Quiz.objects.filter(id__in=matching_quiz_ids('quad squ')).values_list('id', flat=True)),
+                             [self.equations.id])
+
+    def test_rebuild_command(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(search_quiz_ids('lenses'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 2 search documents (fts5)', out.getvalue())
+        self.assertEqual(search_quiz_ids('lenses'), [self.lenses.id])
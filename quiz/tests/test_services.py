@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from ..json_stream import JSONArrayStream, JSONObjectStream, iter_json_array
+from ..services import QuizGenerator
+
+QUESTION = {
+    'question': 'What is 2 + 2?',
+    'options': {'A': '3', 'B': '4', 'C': '5', 'D': '6'},
+    'correct_answer': 'B',
+    'explanation': '2 + 2 = 4'
+}
+
+
+def numbered_question(number):
+    """A valid question whose text is distinct from every other number."""
+    return dict(QUESTION, question=f'Question {number}: what is {number} + {number}?')
+
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@override_settings(QUIZ_GENERATION_CACHE_POOL_SIZE=0)
+class GenerateQuestionsBatchTest(SimpleTestCase):
+    def test_batch_runs_concurrently(self):
+        in_flight = []
+        lock = threading.Lock()
+
+        def create(**kwargs):
+            with lock:
+                in_flight.append(1)
+            time.sleep(0.2)
+            return completion(json.dumps(QUESTION))
+
+        with mock.patch('quiz.transports.openai.ChatCompletion.create', side_effect=create):
+            result = QuizGenerator(concurrency=10).generate_questions_batch(
+                'Mathematics', 'Algebra', 'Easy', 'Grade 10', count=10
+            )
+
+        self.assertEqual(len(result), 10)
+        self.assertEqual(result.failures, [])
+        self.assertLess(result.elapsed, 1.0)
+
+    def test_failures_are_reported(self):
+        calls = iter([json.dumps(QUESTION), 'not json', json.dumps(QUESTION)])
+
+        def create(**kwargs):
+            return completion(next(calls))
+
+        with mock.patch('quiz.transports.openai.ChatCompletion.create', side_effect=create):
+            result = QuizGenerator(concurrency=1).generate_questions_batch(
+                'Mathematics', 'Algebra', 'Easy', 'Grade 10', count=3
+            )
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual(len(result.failures), 1)
+        self.assertEqual(result.failures[0].reason, 'invalid')
+        self.assertEqual(result.failures[0].index, 1)
+
+    def test_per_call_timeout_is_passed_to_api(self):
+        with mock.patch('quiz.transports.openai.ChatCompletion.create', return_value=completion(json.dumps(QUESTION))) as create:
+            QuizGenerator(timeout=5).generate_questions_batch('Mathematics', 'Algebra', 'Easy', 'Grade 10', count=2)
+        self.assertEqual(create.call_args.kwargs['request_timeout'], 5)
+
+
+def stream(content, size=7):
+    """Split a completion into streamed chunks like the API does."""
+    for start in range(0, len(content), size):
+        yield {'choices': [{'delta': {'content': content[start:start + size]}}]}
+
+
+class JSONArrayStreamTest(SimpleTestCase):
+    def test_items_complete_as_they_stream(self):
+        text = '```json\n[{"a": "x]}", "b": [1, {"c": "\\"}"}]}, {"a": 2}]\n```'
+        stream_parser = JSONArrayStream()
+        seen = []
+        for char in text:
+            seen.extend(stream_parser.feed(char))
+            if char == '}' and len(seen) == 1 and stream_parser._depth == 0:
+                # The first item is available before the array is closed
+                self.assertFalse(stream_parser.finished)
+        self.assertEqual([json.loads(item) for item in seen], [{'a': 'x]}', 'b': [1, {'c': '"}'}]}, {'a': 2}])
+        self.assertTrue(stream_parser.finished)
+
+    def test_truncated_item_is_not_emitted(self):
+        self.assertEqual(list(iter_json_array(['[{"a": 1}, {"a": '])), [{'a': 1}])
+
+
+class JSONObjectStreamTest(SimpleTestCase):
+    def test_members_complete_as_they_stream(self):
+        stream_parser = JSONObjectStream()
+        question = stream_parser.feed('```json\n{"question": "Is \\"a, b\\" {x}?", "opt')
+        self.assertEqual(question, [('question', '"Is \\"a, b\\" {x}?"')])
+        self.assertEqual(stream_parser.feed('ions": {"A": "}"}, "n": 1'), [('options', '{"A": "}"}')])
+        # Numbers end at the next comma or brace
+        self.assertEqual(stream_parser.feed('2 }'), [('n', '12')])
+        self.assertTrue(stream_parser.finished)
+
+
+@override_settings(QUIZ_GENERATION_CACHE_POOL_SIZE=0)
+class GenerateQuestionsTest(SimpleTestCase):
+    def test_single_completion_for_several_questions(self):
+        content = json.dumps([QUESTION] * 3)
+        with mock.patch('quiz.transports.openai.ChatCompletion.create', return_value=stream(content)) as create:
+            result = QuizGenerator().generate_questions('Mathematics', 'Algebra', 'Easy', 'Grade 10', num_questions=3)
+        self.assertEqual(len(result), 3)
+        self.assertEqual(create.call_count, 1)
+        self.assertTrue(create.call_args.kwargs['stream'])
+
+    def test_only_invalid_items_are_requested_again(self):
+        invalid = dict(QUESTION, correct_answer='E')
+        responses = iter([
+            stream(json.dumps([QUESTION, invalid, QUESTION])),
+            stream(json.dumps([QUESTION])),
+        ])
+        with mock.patch('quiz.transports.openai.ChatCompletion.create', side_effect=lambda **kwargs: next(responses)) as create:
+            result = QuizGenerator().generate_questions('Mathematics', 'Algebra', 'Easy', 'Grade 10', num_questions=3)
+        self.assertEqual(len(result), 3)
+        self.assertEqual([failure.reason for failure in result.failures], ['invalid'])
+        self.assertIn('JSON array of exactly 1 object,', create.call_args_list[1].kwargs['messages'][1]['content'])
+
+    def test_rounds_are_bounded(self):
+        with mock.patch('quiz.transports.openai.ChatCompletion.create', side_effect=lambda **kwargs: stream('[]')) as create:
+            result = QuizGenerator().generate_questions('Mathematics', 'Algebra', 'Easy', 'Grade 10', num_questions=2, max_rounds=2)
+        self.assertEqual(len(result), 0)
+        self.assertEqual(create.call_count, 2)
@@ -0,0 +1,63 @@
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from accounts.tokens import ProfileRefreshToken
+from ..models import Subject, Topic, Quiz, Question
+from ..serializers import QuestionSerializer
+from .test_services import numbered_question
+
+
+class NDJSONStreamingTest(TestCase):
+    def setUp(self):
+        topic = Topic.objects.create(name='Algebra', subject=Subject.objects.create(name='Mathematics'))
+        self.quiz = Quiz.objects.create(title='Algebra', topic=topic, class_level='Grade 10', difficulty='Easy')
+        Question.objects.bulk_create([
+            Question.from_generated(self.quiz, numbered_question(number)) for number in range(7)
+        ])
+        self.user = User.objects.create_user(username='student', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def read_lines(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+
+    def expected(self):
+        return json.loads(json.dumps(QuestionSerializer(Question.objects.order_by('id'), many=True).data))
+
+    def test_quiz_questions_stream_with_accept_header(self):
+        url = f'/api/quizzes/{self.quiz.id}/questions/'
+        with self.settings(QUIZ_STREAM_CHUNK_SIZE=3):
+            response = self.client.get(url, HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(self.read_lines(response), self.expected())
+
+        # The streamed and the JSON response do not share an ETag
+        self.assertNotEqual(response['ETag'], self.client.get(url)['ETag'])
+
+    def test_question_list_streams_every_question(self):
+        response = self.client.get('/api/questions/?stream=1')
+        self.assertFalse(response.is_async)
+        self.assertEqual(self.read_lines(response), self.expected())
+
+        # Without streaming the list is still paginated
+        self.assertEqual(len(self.client.get('/api/questions/?page_size=5').json()['results']), 5)
+
+    async def test_asgi_requests_get_an_async_stream(self):
+        # A sync iterator would be read in full before anything is sent
+        token = await sync_to_async(lambda: str(ProfileRefreshToken.for_user(self.user).access_token))()
+        with self.settings(QUIZ_STREAM_CHUNK_SIZE=3):
+            response = await self.async_client.get('/api/questions/?stream=1', headers={'Authorization': f'Bearer {token}'})
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)
+        lines = b''.join(chunks).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line) for line in lines], await sync_to_async(self.expected)())
+
+    def test_errors_are_rendered_as_a_line(self):
+        response = self.client.get('/api/quizzes/0/questions/', HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', json.loads(response.content))
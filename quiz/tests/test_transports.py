@@ -0,0 +1,66 @@
+import os
+import tempfile
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+from ..generation_cache import GenerationCache
+from ..services import QuizGenerator
+from ..transports import CassetteNotFound, FakeTransport, RecordingTransport, ReplayTransport
+
+ARGS = ('Mathematics', 'Algebra', 'Easy', 'Grade 10')
+
+
+def generator(transport):
+    return QuizGenerator(transport=transport, cache=GenerationCache())
+
+
+class FakeTransportTest(SimpleTestCase):
+    def test_questions_are_valid_and_repeatable(self):
+        first = generator(FakeTransport(seed=1)).generate_questions(*ARGS, num_questions=7)
+        second = generator(FakeTransport(seed=1)).generate_questions(*ARGS, num_questions=7)
+        self.assertEqual(len(first), 7)
+        self.assertEqual(first.failures, [])
+        self.assertEqual(sorted(q['question'] for q in first), sorted(q['question'] for q in second))
+
+    def test_errors_and_timeouts_follow_the_configured_rates(self):
+        result = generator(FakeTransport(error_rate=0.5, timeout_rate=0.5)).generate_questions_batch(*ARGS, count=4)
+        self.assertEqual(len(result), 0)
+        self.assertEqual({failure.reason for failure in result.failures} - {'api', 'timeout'}, set())
+
+        result = generator(FakeTransport(latency=0.2)).generate_questions_batch(*ARGS, count=1, timeout=0.05)
+        self.assertEqual([failure.reason for failure in result.failures], ['timeout'])
+
+    @override_settings(QUIZ_GENERATION_TRANSPORT='fake', QUIZ_GENERATION_FAKE={'seed': 1})
+    def test_generators_share_the_sequence(self):
+        first = QuizGenerator(cache=GenerationCache()).generate_question(*ARGS)
+        second = QuizGenerator(cache=GenerationCache()).generate_question(*ARGS)
+        self.assertNotEqual(first['question'], second['question'])
+
+    def test_async_completions_match_sync_ones(self):
+        question = generator(FakeTransport(seed=1)).generate_question(*ARGS)
+        self.assertEqual(async_to_sync(generator(FakeTransport(seed=1)).agenerate_question)(*ARGS), question)
+
+        async def stream():
+            chunks = await FakeTransport(seed=1).acomplete([{'role': 'user', 'content': 'Hello'}], 10, stream=True)
+            return ''.join([chunk async for chunk in chunks])
+        messages = [{'role': 'user', 'content': 'Hello'}]
+        self.assertEqual(async_to_sync(stream)(), ''.join(FakeTransport(seed=1).complete(messages, 10, stream=True)))
+
+
+class CassetteTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_recorded_completions_are_replayed(self):
+        recorded = generator(RecordingTransport(self.directory, inner=FakeTransport())).generate_questions(
+            *ARGS, num_questions=3
+        )
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+        replayed = generator(ReplayTransport(self.directory)).generate_questions(*ARGS, num_questions=3)
+        self.assertEqual(list(replayed), list(recorded))
+
+    def test_unknown_request_fails(self):
+        with self.assertRaises(CassetteNotFound):
+            ReplayTransport(self.directory).complete([{'role': 'user', 'content': 'Hello'}], max_tokens=10)
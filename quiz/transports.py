@@ -0,0 +1,335 @@
+"""
+Transports that turn a chat prompt into a completion for ``QuizGenerator``.
+
+``QUIZ_GENERATION_TRANSPORT`` selects one of:
+
+``openai``
+    The OpenAI chat completions API (the default).
+``fake``
+    Deterministic, schema-valid questions generated locally, with the
+    latency and error distribution configured in ``QUIZ_GENERATION_FAKE``.
+    For load tests and profiling without network access.
+``record``
+    Calls OpenAI and writes every completion to a cassette file in
+    ``QUIZ_GENERATION_CASSETTE_DIR``.
+``replay``
+    Serves completions from the cassettes, rotating through the takes
+    recorded for each request.  Unknown requests raise ``CassetteNotFound``.
+
+``get_transport`` hands every generator of the process the same fake or
+replay transport, so repeating a prompt moves on through its sequence instead
+of starting it over with each generator.
+
+A transport's ``complete`` returns the completion text, or an iterator of
+text chunks when ``stream`` is true.  ``acomplete`` is its coroutine for
+async views, returning an async iterator of chunks when streaming, so a
+request waiting on the API holds no thread.  Timeouts are raised as
+``TransportTimeout`` and any other API failure as ``TransportError``.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import openai
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+class TransportError(Exception):
+    pass
+
+
+class TransportTimeout(TransportError):
+    pass
+
+
+class CassetteNotFound(TransportError):
+    pass
+
+
+class OpenAITransport:
+    def __init__(self, model='gpt-3.5-turbo'):
+        openai.api_key = os.getenv('OPENAI_API_KEY')
+        self.model = model
+
+    def complete(self, messages, max_tokens, temperature=0.7, timeout=None, stream=False):
+        try:
+            response = openai.ChatCompletion.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=stream,
+                request_timeout=timeout
+            )
+        except openai.error.Timeout as e:
+            raise TransportTimeout(str(e)) from e
+        if not stream:
+            return response.choices[0].message.content
+        return self._chunks(response)
+
+    async def acomplete(self, messages, max_tokens, temperature=0.7, timeout=None, stream=False):
+        # acreate makes the request with aiohttp
+        try:
+            response = await openai.ChatCompletion.acreate(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=stream,
+                request_timeout=timeout
+            )
+        except openai.error.Timeout as e:
+            raise TransportTimeout(str(e)) from e
+        if not stream:
+            return response.choices[0].message.content
+        return self._achunks(response)
+
+    @staticmethod
+    def _chunks(response):
+        try:
+            for chunk in response:
+                if chunk['choices']:
+                    yield chunk['choices'][0]['delta'].get('content') or ''
+        except openai.error.Timeout as e:
+            raise TransportTimeout(str(e)) from e
+
+    @staticmethod
+    async def _achunks(response):
+        try:
+            async for chunk in response:
+                if chunk['choices']:
+                    yield chunk['choices'][0]['delta'].get('content') or ''
+        except openai.error.Timeout as e:
+            raise TransportTimeout(str(e)) from e
+
+
+def _chunked(content, size=16):
+    for start in range(0, len(content), size):
+        yield content[start:start + size]
+
+
+async def _achunked(content, size=16):
+    for chunk in _chunked(content, size):
+        yield chunk
+
+
+FAKE_WORDS = (
+    'angle area atom balance cell charge circle current density energy equation force fraction function '
+    'gradient graph heat interest island light market mass matrix motion nation number oxygen percentage '
+    'pressure prime probability profit radius ratio reaction river sample sequence set slope solution '
+    'speed square temperature triangle vector velocity volume wave weight'
+).split()
+
+
+class FakeTransport:
+    """
+    Offline stand-in for the API.
+
+    Args:
+        latency (float): Seconds every completion takes, spread over the chunks of a stream
+        jitter (float): Extra random latency of up to this many seconds
+        error_rate (float): Share of completions that fail with an API error
+        timeout_rate (float): Share of completions that time out
+        invalid_rate (float): Share of questions with an invalid correct answer
+        seed (int): Seed of the random sequence, so runs are repeatable
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, timeout_rate=0.0, invalid_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.invalid_rate = invalid_rate
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def question(self, rng, topic, label):
+        words = ' '.join(rng.choice(FAKE_WORDS) for _ in range(8))
+        correct_answer = 'E' if rng.random() < self.invalid_rate else rng.choice('ABCD')
+        return {
+            'question': f'{topic} question {label}: which statement about {words} is correct?',
+            'options': {letter: f'Statement {letter} about {topic}' for letter in 'ABCD'},
+            'correct_answer': correct_answer,
+            'explanation': f'Statement {correct_answer} is correct.'
+        }
+
+    def complete(self, messages, max_tokens, temperature=0.7, timeout=None, stream=False):
+        rng, call, delay, roll, timed_out = self._draw(messages, max_tokens, temperature, timeout, stream)
+        if stream:
+            return self._stream(messages, rng, call, delay, roll, timed_out)
+        time.sleep(delay)
+        return self._content(messages, rng, call, roll, timed_out)
+
+    async def acomplete(self, messages, max_tokens, temperature=0.7, timeout=None, stream=False):
+        rng, call, delay, roll, timed_out = self._draw(messages, max_tokens, temperature, timeout, stream)
+        if stream:
+            return self._astream(messages, rng, call, delay, roll, timed_out)
+        await asyncio.sleep(delay)
+        return self._content(messages, rng, call, roll, timed_out)
+
+    def _stream(self, messages, rng, call, delay, roll, timed_out):
+        # Like the API, a stream sends the text as it is written, so the
+        # latency is spread over the chunks
+        try:
+            chunks = list(_chunked(self._content(messages, rng, call, roll, timed_out)))
+        except TransportError:
+            time.sleep(delay)
+            raise
+        for chunk in chunks:
+            time.sleep(delay / len(chunks))
+            yield chunk
+
+    async def _astream(self, messages, rng, call, delay, roll, timed_out):
+        try:
+            chunks = list(_chunked(self._content(messages, rng, call, roll, timed_out)))
+        except TransportError:
+            await asyncio.sleep(delay)
+            raise
+        for chunk in chunks:
+            await asyncio.sleep(delay / len(chunks))
+            yield chunk
+
+    def _draw(self, messages, max_tokens, temperature, timeout, stream):
+        """
+        The random sequence of a call, its number, how long it waits, the roll
+        that decides whether it fails and whether it times out.
+        """
+        # Every call draws from its own sequence, seeded by the prompt and how
+        # often it was requested, so results do not depend on thread timing
+        key = request_key(messages, max_tokens, temperature, stream)
+        with self.lock:
+            call = self.calls[key] = self.calls.get(key, 0) + 1
+        rng = random.Random(f'{self.seed}:{key}:{call}')
+        delay = self.latency + rng.uniform(0, self.jitter)
+        roll = rng.random()
+        timed_out = roll < self.timeout_rate or bool(timeout and delay > timeout)
+        return rng, call, min(delay, timeout) if timeout else delay, roll, timed_out
+
+    def _content(self, messages, rng, call, roll, timed_out):
+        if timed_out:
+            raise TransportTimeout(f'Fake completion {call} timed out')
+        if roll < self.timeout_rate + self.error_rate:
+            raise TransportError(f'Fake completion {call} failed')
+
+        prompt = messages[-1]['content']
+        topic = re.search(r'Topic: (.*)', prompt)
+        topic = topic.group(1).strip() if topic else 'General'
+        count = re.search(r'JSON array of exactly (\d+)', prompt)
+        if count:
+            questions = [self.question(rng, topic, f'{call}.{number}') for number in range(int(count.group(1)))]
+            return json.dumps(questions)
+        return json.dumps(self.question(rng, topic, call))
+
+
+def request_key(messages, max_tokens, temperature, stream):
+    request = json.dumps(
+        {'messages': messages, 'max_tokens': max_tokens, 'temperature': temperature, 'stream': stream},
+        sort_keys=True
+    )
+    return hashlib.sha1(request.encode('utf-8')).hexdigest()
+
+
+class RecordingTransport:
+    """Passes completions through from ``inner`` and appends them to cassettes."""
+
+    def __init__(self, directory, inner=None):
+        self.directory = directory
+        self.inner = inner or OpenAITransport()
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def complete(self, messages, max_tokens, temperature=0.7, timeout=None, stream=False):
+        response = self.inner.complete(messages, max_tokens, temperature, timeout, stream)
+        # Streams are recorded whole and re-chunked on replay
+        content = ''.join(response) if stream else response
+        self.save(request_key(messages, max_tokens, temperature, stream), messages, content)
+        return _chunked(content) if stream else content
+
+    async def acomplete(self, messages, max_tokens, temperature=0.7, timeout=None, stream=False):
+        response = await self.inner.acomplete(messages, max_tokens, temperature, timeout, stream)
+        content = ''.join([chunk async for chunk in response]) if stream else response
+        self.save(request_key(messages, max_tokens, temperature, stream), messages, content)
+        return _achunked(content) if stream else content
+
+    def save(self, key, messages, content):
+        path = os.path.join(self.directory, f'{key}.json')
+        with self.lock:
+            if os.path.exists(path):
+                with open(path) as cassette_file:
+                    cassette = json.load(cassette_file)
+            else:
+                cassette = {'messages': messages, 'responses': []}
+            cassette['responses'].append(content)
+            with open(path, 'w') as cassette_file:
+                json.dump(cassette, cassette_file, indent=2)
+
+
+class ReplayTransport:
+    """Serves recorded completions, rotating through the takes of each request."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.served = {}
+
+    def complete(self, messages, max_tokens, temperature=0.7, timeout=None, stream=False):
+        content = self._content(request_key(messages, max_tokens, temperature, stream))
+        return _chunked(content) if stream else content
+
+    async def acomplete(self, messages, max_tokens, temperature=0.7, timeout=None, stream=False):
+        content = self._content(request_key(messages, max_tokens, temperature, stream))
+        return _achunked(content) if stream else content
+
+    def _content(self, key):
+        path = os.path.join(self.directory, f'{key}.json')
+        try:
+            with open(path) as cassette_file:
+                responses = json.load(cassette_file)['responses']
+        except FileNotFoundError:
+            raise CassetteNotFound(f'No cassette recorded for request {key}')
+
+        with self.lock:
+            take = self.served.get(key, 0)
+            self.served[key] = take + 1
+        return responses[take % len(responses)]
+
+
+# Fake and replay transports shared by the process, by name
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_transport(name=None):
+    """
+    Return the transport named ``name`` (default: ``QUIZ_GENERATION_TRANSPORT``).
+    """
+    name = name or getattr(settings, 'QUIZ_GENERATION_TRANSPORT', 'openai')
+    directory = getattr(settings, 'QUIZ_GENERATION_CASSETTE_DIR', 'cassettes')
+    if name == 'openai':
+        return OpenAITransport()
+    if name == 'record':
+        return RecordingTransport(directory)
+    if name not in ('fake', 'replay'):
+        raise ValueError(f"Unknown generation transport '{name}'")
+    with _shared_lock:
+        if name not in _shared:
+            if name == 'fake':
+                _shared[name] = FakeTransport(**getattr(settings, 'QUIZ_GENERATION_FAKE', {}))
+            else:
+                _shared[name] = ReplayTransport(directory)
+        return _shared[name]
+
+
+@receiver(setting_changed)
+def reset_shared_transports(setting, **kwargs):
+    if setting.startswith('QUIZ_GENERATION_'):
+        with _shared_lock:
+            _shared.clear()
@@ -1,13 +1,21 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SubjectViewSet, QuizViewSet, QuestionViewSet, TopicViewSet
+from .views import (
+    SubjectViewSet, QuizViewSet, QuestionViewSet, TopicViewSet, GenerationJobViewSet, SearchViewSet,
+    GenerateNextQuestionView
+)
 
 router = DefaultRouter()
 router.register(r'subjects', SubjectViewSet)
 router.register(r'topics', TopicViewSet)
 router.register(r'quizzes', QuizViewSet, basename='quiz')
 router.register(r'questions', QuestionViewSet)
+router.register(r'generation-jobs', GenerationJobViewSet, basename='generation-job')
+router.register(r'search', SearchViewSet, basename='search')
 
 urlpatterns = [
+    # Async view, so it is routed by hand rather than as a QuizViewSet action
+    path('quizzes/<int:pk>/generate_next_question/', GenerateNextQuestionView.as_view(),
+         name='quiz-generate-next-question'),
     path('', include(router.urls)),
 ] 
\ No newline at end of file
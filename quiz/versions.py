@@ -0,0 +1,134 @@
+"""
+Version stamps shared between worker processes.
+
+In-process caches (the quiz sampling index, rendered catalog responses, ...)
+remember the stamp they were built against and rebuild when it changes.  The
+stamps live in the ``versions`` cache, which defaults to a file based cache so
+that every gunicorn worker on the host sees a bump made by any of them.
+
+Bumps that follow a database write go through ``bump_version_on_commit`` so a
+worker never rebuilds against rows that are not committed yet.  Requests and
+the management commands that write the catalog run inside
+``deferred_bumps()``, which turns every bump made during them into a single
+bump of each stamp at the end.
+"""
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Stamps to bump when the outermost deferred_bumps() block exits
+_deferred = ContextVar('deferred_versions', default=None)
+
+
+def _store():
+    return caches[getattr(settings, 'QUIZ_VERSION_CACHE', 'default')]
+
+
+def _key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    """
+    Return the current stamp for ``name``, creating one if none exists yet.
+    """
+    store = _store()
+    version = store.get(_key(name))
+    if version is None:
+        # add() only writes when the key is missing, so concurrent workers
+        # agree on a single initial stamp
+        store.add(_key(name), uuid.uuid4().hex, None)
+        version = store.get(_key(name))
+    return version
+
+
+def bump_version(name):
+    """
+    Invalidate everything built against the current stamp for ``name``.
+    """
+    return set_version(name, uuid.uuid4().hex)
+
+
+def bump_versions(names):
+    for name in names:
+        bump_version(name)
+
+
+def bump_version_on_commit(*names):
+    """
+    Bump ``names`` once the current transaction commits, or when the
+    enclosing ``deferred_bumps()`` block exits.
+    """
+    pending = _deferred.get()
+    if pending is not None:
+        pending.update(names)
+    else:
+        transaction.on_commit(partial(bump_versions, names))
+
+
+def _bump_deferred(pending):
+    if pending:
+        transaction.on_commit(partial(bump_versions, sorted(pending)))
+
+
+@contextmanager
+def deferred_bumps():
+    """
+    Collect the ``bump_version_on_commit()`` calls made inside the block and
+    bump each stamp once after it, on commit.  Nested blocks join the
+    outermost one.
+    """
+    if _deferred.get() is not None:
+        yield
+        return
+    pending = set()
+    token = _deferred.set(pending)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+        _bump_deferred(pending)
+
+
+@asynccontextmanager
+async def adeferred_bumps():
+    """
+    ``deferred_bumps()`` for async code.  The bumps are made on the thread
+    that runs the sync code of the request, whose transaction they follow.
+    """
+    if _deferred.get() is not None:
+        yield
+        return
+    pending = set()
+    token = _deferred.set(pending)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+        await sync_to_async(_bump_deferred)(pending)
+
+
+def read_version(name):
+    """
+    Return the current stamp for ``name``, or None if there is none.
+    """
+    return _store().get(_key(name))
+
+
+def set_version(name, version):
+    """
+    Publish ``version`` as the stamp for ``name``, for stamps that mirror a
+    value kept elsewhere (a row's version column).
+    """
+    _store().set(_key(name), version, None)
+    return version
+
+
+def clear_version(name):
+    _store().delete(_key(name))
@@ -1,22 +1,60 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Count, Q
-from .models import Subject, Question, Quiz, Topic
-from .serializers import SubjectSerializer, QuestionSerializer, QuizSerializer, TopicSerializer
-from .services import QuizGenerator
+from django.db.models import Count, Max, Q
+from rest_framework.reverse import reverse
+from rest_framework.permissions import IsAdminUser
+from .models import Subject, Question, Quiz, Topic, GenerationJob
+from .serializers import SubjectSerializer, QuestionSerializer, QuizSerializer, TopicSerializer, GenerationJobSerializer
+from .services import QUESTION_FIELDS, QuizGenerator
+from .async_views import AsyncAPIView
+from .jobs import coalesce_generation, enqueue_generation
+from .idempotency import idempotent
+from .pagination import KeysetPagination, QuestionKeysetPagination
+from . import buffer, fast_serializers
+from .catalog import CATALOG_VERSION, cached_catalog_response
+from .etags import conditional_response, make_etag
+from .dedup import index_for_texts
+from .generation_cache import get_generation_cache
+from .sampling import QuizSampler, get_index
+from .search import FullTextSearchFilter, matching_quiz_ids, search
+from .streaming import (
+    EVENT_STREAM_RENDERER_CLASSES, STREAMING_RENDERER_CLASSES, stream_events, stream_ndjson, wants_events, wants_stream
+)
+from .versions import get_version
 from django.db import models
-from django.shortcuts import get_object_or_404
-import random
+from django.shortcuts import aget_object_or_404, get_object_or_404
+import hashlib
 
 # Create your views here.
 
+def job_accepted_response(request, job, **extra):
+    """
+    202 response pointing the client at the status of a queued generation job
+    """
+    return Response({
+        'message': f'Queued generation of {job.num_questions} new question(s)',
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': reverse('generation-job-detail', args=[job.id], request=request),
+        **extra
+    }, status=status.HTTP_202_ACCEPTED)
+
 class SubjectViewSet(viewsets.ModelViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
 
+    def list(self, request, *args, **kwargs):
+        return cached_catalog_response(self, request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_catalog_response(self, request, super().retrieve, *args, **kwargs)
+
 class TopicViewSet(viewsets.ModelViewSet):
     queryset = Topic.objects.all()
     serializer_class = TopicSerializer
@@ -44,28 +82,40 @@ class TopicViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        return cached_catalog_response(self, request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_catalog_response(self, request, super().retrieve, *args, **kwargs)
+
     @action(detail=False, methods=['get'])
     def by_subject(self, request):
         """
         Get all topics grouped by subject
         """
+        return cached_catalog_response(self, request, self._topics_by_subject)
+
+    def _topics_by_subject(self, request):
         try:
-            # Get all subjects with their topics
-            subjects = Subject.objects.prefetch_related('topics').all()
-            
+            # Get all subjects, then serialize every topic in a single pass
+            subjects = Subject.objects.all()
+            topics = Topic.objects.select_related('subject').order_by('subject_id', 'id')
+            topic_data = self.get_serializer(topics, many=True).data
+
             # Prepare the response data
-            response_data = []
-            for subject in subjects:
-                topics = subject.topics.all()
-                topic_serializer = self.get_serializer(topics, many=True)
-                
-                response_data.append({
+            grouped = {subject.id: [] for subject in subjects}
+            for topic in topic_data:
+                grouped[topic['subject']].append(topic)
+            response_data = [
+                {
                     'subject': {
                         'id': subject.id,
                         'name': subject.name
                     },
-                    'topics': topic_serializer.data
-                })
+                    'topics': grouped[subject.id]
+                }
+                for subject in subjects
+            ]
             
             return Response(response_data)
             
@@ -75,10 +125,35 @@ class TopicViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+def quiz_list_metadata(queryset):
+    """
+    Quiz counts for a filtered quiz list, from one conditional aggregate that
+    is cached briefly per filter and catalog version.
+    """
+    counts_query = queryset.order_by()
+    key = 'quiz-list-metadata:{}:{}'.format(
+        get_version(CATALOG_VERSION),
+        hashlib.md5(str(counts_query.query).encode('utf-8')).hexdigest()
+    )
+    metadata = cache.get(key)
+    if metadata is None:
+        counts = counts_query.aggregate(
+            total_quizzes=Count('id'),
+            wassce_quizzes=Count('id', filter=Q(is_wassce_related=True))
+        )
+        metadata = {
+            'total_quizzes': counts['total_quizzes'],
+            'wassce_quizzes': counts['wassce_quizzes']
+        }
+        cache.set(key, metadata, getattr(settings, 'QUIZ_LIST_METADATA_TIMEOUT', 60))
+    return metadata
+
 class QuizViewSet(viewsets.ModelViewSet):
     queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    # ?search= is answered by the full-text index, which covers these fields and the description
+    filter_backends = [FullTextSearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'topic__name', 'topic__subject__name']
     ordering_fields = ['created_at', 'title']
     ordering = ['-created_at']  # Default ordering
@@ -97,6 +172,23 @@ class QuizViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get quiz details, answering 304 when the client's ETag still matches
+        the quiz and the names of its topic and subject
+        """
+        try:
+            quiz_state = self.get_queryset().filter(pk=kwargs['pk']).values_list(
+                'updated_at', 'topic__name', 'topic__subject__name'
+            ).first()
+        except (ValueError, TypeError):
+            quiz_state = None
+        if quiz_state is None:
+            # Let the default lookup produce the 404
+            return super().retrieve(request, *args, **kwargs)
+        etag = make_etag('quiz', kwargs['pk'], *quiz_state, request.accepted_renderer.format)
+        return conditional_response(request, etag, super().retrieve, *args, **kwargs)
+
     @action(detail=False, methods=['get'])
     def random_wassce_quizzes(self, request):
         """
@@ -106,46 +198,27 @@ class QuizViewSet(viewsets.ModelViewSet):
             # Get user's selected topics from their profile
             user_profile = request.user.profile
             selected_topics = user_profile.selected_topics
+            topic_ids = user_profile.selected_topic_ids
 
-            if not selected_topics:
+            if not topic_ids:
                 return Response(
                     {'error': 'No topics selected. Please complete the onboarding process.'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Start with base query for WASSCE quizzes
-            wassce_quizzes = Quiz.objects.filter(
-                is_wassce_related=True
-            ).select_related('topic', 'topic__subject')
-
-            # Build a Q object for topic filtering
-            topic_filter = Q()
-            for subject_name, topic_names in selected_topics.items():
-                # Add OR conditions for each subject's topics
-                subject_filter = Q(topic__subject__name=subject_name) & Q(topic__name__in=topic_names)
-                topic_filter |= subject_filter
-
-            # Apply the topic filter
-            wassce_quizzes = wassce_quizzes.filter(topic_filter)
+            # Draw from the sampling index instead of ordering the join randomly
+            sample = QuizSampler().sample(topic_ids, include_trivial=False)
             
-            # Get total count of filtered WASSCE quizzes
-            total_count = wassce_quizzes.count()
-            
-            if total_count == 0:
+            if sample.wassce_total == 0:
                 return Response(
                     {'error': 'No WASSCE quizzes available for your selected topics'}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Get up to 10 random quizzes
-            random_count = min(10, total_count)
-            random_quizzes = wassce_quizzes.order_by('?')[:random_count]
-            
-            serializer = self.get_serializer(random_quizzes, many=True)
             return Response({
-                'quizzes': serializer.data,
-                'total_wassce_quizzes': total_count,
-                'fetched_count': random_count,
+                'quizzes': fast_serializers.quiz_serializer.many(sample.quizzes),
+                'total_wassce_quizzes': sample.wassce_total,
+                'fetched_count': len(sample.quizzes),
                 'selected_topics': selected_topics  # Include selected topics in response for debugging
             })
             
@@ -164,46 +237,27 @@ class QuizViewSet(viewsets.ModelViewSet):
             # Get user's selected topics from their profile
             user_profile = request.user.profile
             selected_topics = user_profile.selected_topics
+            topic_ids = user_profile.selected_topic_ids
 
-            if not selected_topics:
+            if not topic_ids:
                 return Response(
                     {'error': 'No topics selected. Please complete the onboarding process.'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Start with base query for trivial quizzes
-            trivial_quizzes = Quiz.objects.filter(
-                is_wassce_related=False
-            ).select_related('topic', 'topic__subject')
-
-            # Build a Q object for topic filtering
-            topic_filter = Q()
-            for subject_name, topic_names in selected_topics.items():
-                # Add OR conditions for each subject's topics
-                subject_filter = Q(topic__subject__name=subject_name) & Q(topic__name__in=topic_names)
-                topic_filter |= subject_filter
-
-            # Apply the topic filter
-            trivial_quizzes = trivial_quizzes.filter(topic_filter)
+            # Draw from the sampling index instead of ordering the join randomly
+            sample = QuizSampler().sample(topic_ids, include_wassce=False)
             
-            # Get total count of filtered trivial quizzes
-            total_count = trivial_quizzes.count()
-            
-            if total_count == 0:
+            if sample.trivial_total == 0:
                 return Response(
                     {'error': 'No trivial quizzes available for your selected topics'}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Get up to 10 random quizzes
-            random_count = min(10, total_count)
-            random_quizzes = trivial_quizzes.order_by('?')[:random_count]
-            
-            serializer = self.get_serializer(random_quizzes, many=True)
             return Response({
-                'quizzes': serializer.data,
-                'total_trivial_quizzes': total_count,
-                'fetched_count': random_count,
+                'quizzes': fast_serializers.quiz_serializer.many(sample.quizzes),
+                'total_trivial_quizzes': sample.trivial_total,
+                'fetched_count': len(sample.quizzes),
                 'selected_topics': selected_topics  # Include selected topics in response for debugging
             })
             
@@ -217,7 +271,8 @@ class QuizViewSet(viewsets.ModelViewSet):
     def random_mixed_quizzes(self, request):
         """
         Get 10 random quizzes mixed from both WASSCE and non-WASSCE quizzes.
-        The mix will be approximately 60% WASSCE and 40% non-WASSCE quizzes.
+        The mix follows QUIZ_FEED_WASSCE_RATIO (60% WASSCE and 40% non-WASSCE
+        by default), filling in from the other type when one runs short.
         Quizzes are filtered by user's selected topics and additional search criteria.
         
         Query Parameters:
@@ -231,25 +286,16 @@ class QuizViewSet(viewsets.ModelViewSet):
             # Get user's selected topics from their profile
             user_profile = request.user.profile
             selected_topics = user_profile.selected_topics
+            topic_ids = user_profile.selected_topic_ids
 
-            if not selected_topics:
+            if not topic_ids:
                 return Response(
                     {'error': 'No topics selected. Please complete the onboarding process.'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Get all quizzes with related fields
-            all_quizzes = Quiz.objects.all().select_related('topic', 'topic__subject')
-            
-            # Build topic filter from user's selected topics
-            topic_filter = Q()
-            for subject_name, topic_names in selected_topics.items():
-                # Add OR conditions for each subject's topics
-                subject_filter = Q(topic__subject__name=subject_name) & Q(topic__name__in=topic_names)
-                topic_filter |= subject_filter
-
-            # Apply the topic filter
-            all_quizzes = all_quizzes.filter(topic_filter)
+            # The sampling index resolves topic and subject filters in memory
+            index = get_index()
             
             # Apply search filters if provided
             subject = request.query_params.get('subject')
@@ -258,47 +304,43 @@ class QuizViewSet(viewsets.ModelViewSet):
             difficulty = request.query_params.get('difficulty')
             class_level = request.query_params.get('class_level')
             
-            # Filter by subject (accepts both name and ID)
-            if subject:
-                try:
-                    # Try to convert to integer for ID search
-                    subject_id = int(subject)
-                    all_quizzes = all_quizzes.filter(topic__subject__id=subject_id)
-                except ValueError:
-                    # If not an integer, search by name
-                    all_quizzes = all_quizzes.filter(topic__subject__name__icontains=subject)
-            
-            # Filter by topic
-            if topic:
-                all_quizzes = all_quizzes.filter(topic__name__icontains=topic)
+            # Filter by subject (accepts both name and ID) and topic
+            topic_ids = index.filter_topic_ids(topic_ids, subject=subject, topic=topic)
             
             # Filter by difficulty
+            difficulty_filter = None
             if difficulty:
                 difficulty = difficulty.lower()
                 if difficulty in ['easy', 'medium', 'hard']:
-                    all_quizzes = all_quizzes.filter(difficulty__iexact=difficulty)
+                    difficulty_filter = difficulty
             
             # Filter by class level
+            class_level_filter = None
             if class_level:
                 class_level = class_level.lower()
                 valid_levels = ['grade 10', 'grade 11', 'grade 12']
                 if class_level in valid_levels:
-                    all_quizzes = all_quizzes.filter(class_level__iexact=class_level)
-            
-            # Apply general search
-            if search_query:
-                all_quizzes = all_quizzes.filter(
-                    models.Q(title__icontains=search_query) |
-                    models.Q(topic__name__icontains=search_query) |
-                    models.Q(topic__subject__name__icontains=search_query)
+                    class_level_filter = class_level
+            
+            # Apply general search through the full-text index, in SQL so
+            # only the matches in the selected topics are loaded
+            quiz_ids = None
+            if search_query and topic_ids:
+                quiz_ids = set(
+                    Quiz.objects
+                    .filter(topic_id__in=topic_ids, id__in=matching_quiz_ids(search_query))
+                    .values_list('id', flat=True)
                 )
             
-            # Get total counts after applying filters
-            total_count = all_quizzes.count()
-            wassce_count = all_quizzes.filter(is_wassce_related=True).count()
-            trivial_count = total_count - wassce_count
+            sample = QuizSampler().sample(
+                topic_ids,
+                difficulty=difficulty_filter,
+                class_level=class_level_filter,
+                quiz_ids=quiz_ids,
+                index=index
+            )
             
-            if total_count == 0:
+            if sample.total == 0:
                 return Response({
                     'error': 'No quizzes found matching the search criteria',
                     'filters_applied': {
@@ -311,40 +353,14 @@ class QuizViewSet(viewsets.ModelViewSet):
                     }
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Calculate how many of each type to fetch
-            # We'll try to get 6 WASSCE and 4 non-WASSCE quizzes
-            wassce_to_fetch = min(6, wassce_count)
-            trivial_to_fetch = min(4, trivial_count)
-            
-            # If we don't have enough of one type, adjust the other
-            if wassce_to_fetch < 6:
-                trivial_to_fetch = min(10 - wassce_to_fetch, trivial_count)
-            elif trivial_to_fetch < 4:
-                wassce_to_fetch = min(10 - trivial_to_fetch, wassce_count)
-            
-            # Fetch random WASSCE quizzes
-            wassce_quizzes = all_quizzes.filter(
-                is_wassce_related=True
-            ).order_by('?')[:wassce_to_fetch]
-            
-            # Fetch random non-WASSCE quizzes
-            trivial_quizzes = all_quizzes.filter(
-                is_wassce_related=False
-            ).order_by('?')[:trivial_to_fetch]
-            
-            # Combine and shuffle the results
-            combined_quizzes = list(wassce_quizzes) + list(trivial_quizzes)
-            random.shuffle(combined_quizzes)
-            
-            serializer = self.get_serializer(combined_quizzes, many=True)
             return Response({
-                'quizzes': serializer.data,
-                'total_quizzes': total_count,
-                'wassce_quizzes': wassce_count,
-                'trivial_quizzes': trivial_count,
-                'fetched_count': len(combined_quizzes),
-                'wassce_fetched': wassce_to_fetch,
-                'trivial_fetched': trivial_to_fetch,
+                'quizzes': fast_serializers.quiz_serializer.many(sample.quizzes),
+                'total_quizzes': sample.total,
+                'wassce_quizzes': sample.wassce_total,
+                'trivial_quizzes': sample.trivial_total,
+                'fetched_count': len(sample.quizzes),
+                'wassce_fetched': sample.wassce_fetched,
+                'trivial_fetched': sample.trivial_fetched,
                 'filters_applied': {
                     'subject': subject,
                     'topic': topic,
@@ -363,35 +379,19 @@ class QuizViewSet(viewsets.ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         """
-        Get list of quizzes with metadata
+        Get list of quizzes with metadata, one keyset page at a time
+        (follow ``next`` to get the following page)
         """
         queryset = self.filter_queryset(self.get_queryset())
         
         # Get counts for metadata
-        total_quizzes = queryset.count()
-        wassce_quizzes = queryset.filter(is_wassce_related=True).count()
+        metadata = quiz_list_metadata(queryset)
         
         # Paginate results
         page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            response = self.get_paginated_response(serializer.data)
-            response.data.update({
-                'metadata': {
-                    'total_quizzes': total_quizzes,
-                    'wassce_quizzes': wassce_quizzes
-                }
-            })
-            return response
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({
-            'results': serializer.data,
-            'metadata': {
-                'total_quizzes': total_quizzes,
-                'wassce_quizzes': wassce_quizzes
-            }
-        })
+        response = self.get_paginated_response(fast_serializers.quiz_serializer.many(page))
+        response.data['metadata'] = metadata
+        return response
     
     @action(detail=True, methods=['get'])
     def question(self, request, pk=None):
@@ -413,7 +413,7 @@ class QuizViewSet(viewsets.ModelViewSet):
                 )
                 
             # Get total available questions
-            available_count = quiz.questions.count()
+            available_count = quiz.question_total
             if available_count == 0:
                 return Response(
                     {'error': 'No questions available in this quiz'}, 
@@ -424,13 +424,12 @@ class QuizViewSet(viewsets.ModelViewSet):
             count = min(count, available_count)
             
             # Fetch random questions
-            questions = quiz.questions.order_by('?')[:count]
-            serializer = QuestionSerializer(questions, many=True)
+            questions = fast_serializers.question_serializer.many(quiz.questions.order_by('?')[:count])
             
             return Response({
-                'questions': serializer.data,
+                'questions': questions,
                 'total_questions': available_count,
-                'fetched_count': len(serializer.data)
+                'fetched_count': len(questions)
             })
             
         except ValueError:
@@ -445,7 +444,15 @@ class QuizViewSet(viewsets.ModelViewSet):
             )
     
     @action(detail=True, methods=['post'])
+    @idempotent
     def generate_questions(self, request, pk=None):
+        """
+        Make sure the quiz has num_questions questions.
+        Returns the existing questions when there are enough, otherwise
+        queues a generation job and returns 202 with its id. Requests made
+        while a job for the quiz is queued or running share that job.
+        Send an Idempotency-Key header to have retries replay the response.
+        """
         quiz = self.get_object()
         
         # Validate num_questions parameter
@@ -470,7 +477,7 @@ class QuizViewSet(viewsets.ModelViewSet):
                 )
 
             # Check existing questions count
-            existing_questions_count = quiz.questions.count()
+            existing_questions_count = quiz.question_total
             
             # If we already have enough questions, return them
             if existing_questions_count >= num_questions:
@@ -482,87 +489,72 @@ class QuizViewSet(viewsets.ModelViewSet):
                     'source': 'existing'
                 }, status=status.HTTP_200_OK)
             
-            # Calculate how many new questions we need
-            questions_needed = num_questions - existing_questions_count
-                
-            quiz_generator = QuizGenerator()
-            generated_questions_data = []
-            
-            # Keep generating until we have exactly the requested number
-            while len(generated_questions_data) < questions_needed:
-                remaining = questions_needed - len(generated_questions_data)
-                batch = quiz_generator.generate_questions(
-                    subject=quiz.topic.subject.name,
-                    topic=quiz.topic.name,
-                    difficulty=quiz.difficulty,
-                    class_level=quiz.class_level,
-                    num_questions=remaining
-                )
-                generated_questions_data.extend(batch)
-            
-            # Ensure we don't exceed the requested number
-            generated_questions_data = generated_questions_data[:questions_needed]
-            
-            # Set quiz as WASSCE related since we're generating WASSCE questions
-            quiz.is_wassce_related = True
-            quiz.save()
-                    
-            # Create questions in bulk
-            questions_to_create = []
-            for question_data in generated_questions_data:
-                questions_to_create.append(
-                    Question(
-                        quiz=quiz,
-                        question_text=question_data['question'],
-                        option_a=question_data['options']['A'],
-                        option_b=question_data['options']['B'],
-                        option_c=question_data['options']['C'],
-                        option_d=question_data['options']['D'],
-                        correct_answer=question_data['correct_answer'],
-                        explanation=question_data['explanation'],
-                        is_ai_generated=True
-                    )
-                )
-            
-            # Bulk create the questions
-            created_questions = Question.objects.bulk_create(questions_to_create)
-            
-            if len(created_questions) != questions_needed:
-                return Response({
-                    'error': f'Failed to generate exact number of new questions. Requested: {questions_needed}, Generated: {len(created_questions)}'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            # Combine existing and new questions
-            all_questions = list(quiz.questions.all()[:existing_questions_count]) + list(created_questions)
-            serializer = QuestionSerializer(all_questions, many=True)
-            
-            return Response({
-                'message': f'Successfully retrieved {existing_questions_count} existing questions and generated {len(created_questions)} new questions',
-                'questions': serializer.data,
-                'source': 'mixed',
-                'existing_count': existing_questions_count,
-                'generated_count': len(created_questions)
-            }, status=status.HTTP_201_CREATED)
+            # Queue the missing questions for the generation workers, or join the job already queued
+            job, created = coalesce_generation(
+                quiz,
+                num_questions - existing_questions_count,
+                kind='fill_quiz',
+                target_count=num_questions,
+                requested_by=request.user
+            )
+            return job_accepted_response(request, job, existing_count=existing_questions_count, coalesced=not created)
             
         except Exception as e:
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-    
-    @action(detail=True, methods=['get'])
+
+    @action(detail=True, methods=['get'], renderer_classes=STREAMING_RENDERER_CLASSES)
     def questions(self, request, pk=None):
-        """Get all questions for a quiz"""
+        """
+        Get all questions for a quiz. Send ``Accept: application/x-ndjson``
+        or ``?stream=1`` to stream them one JSON object per line.
+        """
         quiz = self.get_object()
-        questions = quiz.questions.all()
-        serializer = QuestionSerializer(questions, many=True)
-        return Response(serializer.data)
+        # Any added, removed or edited question changes one of these
+        state = quiz.questions.aggregate(count=Count('id'), last_id=Max('id'), last_updated=Max('updated_at'))
+        etag = make_etag('quiz-questions', quiz.pk, state['count'], state['last_id'], state['last_updated'],
+                         request.accepted_renderer.format, wants_stream(request))
+        return conditional_response(request, etag, self._questions, quiz)
 
-    @action(detail=True, methods=['post'])
-    def generate_next_question(self, request, pk=None):
+    def _questions(self, request, quiz):
+        if wants_stream(request):
+            return stream_ndjson(request, quiz.questions.order_by('id'), fast_serializers.question_serializer)
+        return Response(fast_serializers.question_serializer.many(quiz.questions.all()))
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAdminUser])
+    def buffer_stats(self, request, pk=None):
+        """
+        Ready-question buffer depth and hit/miss counters for this quiz, and
+        the generation cache counters of this process
+        """
+        quiz = self.get_object()
+        generation_cache = get_generation_cache()
+        return Response({
+            'quiz': buffer.get_stats(quiz),
+            'all_quizzes': buffer.get_stats(),
+            'generation_cache': generation_cache.stats() if generation_cache is not None else None
+        })
+
+class GenerateNextQuestionView(AsyncAPIView):
+    """
+    ``POST /api/quizzes/{pk}/generate_next_question/``, an async view: while
+    a question is generated on the spot the request awaits the completion
+    instead of holding a worker thread.  Serve it with uvicorn
+    (``backend.asgi:application``); under gunicorn it runs one request per
+    thread and its event streams are sent in one piece.
+    """
+    renderer_classes = EVENT_STREAM_RENDERER_CLASSES
+
+    @idempotent
+    async def post(self, request, pk=None):
         """
-        Generate a single question on-the-fly without storing in database.
-        This is designed for real-time quiz progression.
+        Serve the next question for real-time quiz progression.
+        Questions come from the quiz's buffer of pre-generated questions,
+        which is refilled in the background. When the buffer is empty a
+        stored question the student has not seen is returned instead, and
+        only as a last resort is a question generated on the spot.
         
         Request body:
         {
@@ -575,8 +567,16 @@ class QuizViewSet(viewsets.ModelViewSet):
                 // ... more previous questions if any
             ]
         }
+
+        Send ``Accept: text/event-stream`` or ``?stream=1`` to get the question
+        as Server-Sent Events: a ``question``, ``options``, ``correct_answer``
+        and ``explanation`` event, each as soon as the field has been written,
+        then ``done`` with the whole response, or ``error``.  A question
+        generated on the spot is streamed from the completion, so the student
+        can read it long before the explanation is complete.  Streamed
+        responses are not stored for Idempotency-Key replays.
         """
-        quiz = self.get_object()
+        quiz = await aget_object_or_404(Quiz.objects.select_related('topic', 'topic__subject'), pk=pk)
         
         try:
             if not quiz.topic:
@@ -587,31 +587,33 @@ class QuizViewSet(viewsets.ModelViewSet):
 
             # Get previous questions from request
             previous_questions = request.data.get('previous_questions', [])
+            seen_texts = [
+                q['question'] for q in previous_questions
+                if isinstance(q, dict) and q.get('question')
+            ]
+            # Near-duplicate index of what the student has already answered
+            seen_index = index_for_texts(seen_texts)
+
+            # Serve a pre-generated question, falling back to an unseen bank
+            # question and only then to a live generation
+            question_data, source = await sync_to_async(self._stored_question)(quiz, seen_texts, seen_index)
+            if question_data is None and wants_events(request):
+                return stream_events(self._generated_question_events(quiz, seen_texts, seen_index))
+            if question_data is None:
+                question_data = await self._generate_unseen_question(quiz, seen_texts, seen_index)
+                source = 'generated'
+
+            await sync_to_async(self._record_request)(quiz, source)
+            if wants_events(request):
+                return stream_events(self._question_events(question_data, source))
             
-            # Create a prompt that includes previous questions to avoid duplicates
-            previous_questions_text = ""
-            if previous_questions:
-                previous_questions_text = "\nPrevious questions:\n"
-                for q in previous_questions:
-                    previous_questions_text += f"- {q['question']}\n"
-
-            # Initialize quiz generator
-            quiz_generator = QuizGenerator()
-            
-            # Generate a single question
-            question_data = quiz_generator.generate_question(
-                subject=quiz.topic.subject.name,
-                topic=quiz.topic.name,
-                difficulty=quiz.difficulty,
-                class_level=quiz.class_level
-            )
-            
-            # Return the generated question directly
+            # Return the question directly
             return Response({
                 'question': question_data['question'],
                 'options': question_data['options'],
                 'correct_answer': question_data['correct_answer'],
-                'explanation': question_data['explanation']
+                'explanation': question_data['explanation'],
+                'source': source
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -620,17 +622,98 @@ class QuizViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @staticmethod
+    def _stored_question(quiz, seen_texts, seen_index):
+        """A buffered question, else an unseen bank question, and its source"""
+        question_data = buffer.pop_question(quiz, exclude=seen_index)
+        if question_data is not None:
+            return question_data, 'buffer'
+        return buffer.pick_bank_question(quiz, seen_texts, exclude=seen_index), 'bank'
+
+    @staticmethod
+    def _record_request(quiz, source):
+        buffer.record_outcome(quiz.id, source)
+        buffer.ensure_refill(quiz)
+
+    @staticmethod
+    async def _question_events(question_data, source):
+        for field in QUESTION_FIELDS:
+            yield field, {field: question_data[field]}
+        yield 'done', {**{field: question_data[field] for field in QUESTION_FIELDS}, 'source': source}
+
+    @classmethod
+    async def _generated_question_events(cls, quiz, seen_texts, seen_index, tries=3):
+        """
+        Events of a question generated on the spot, streamed field by field
+        from the completion.  A question text the student has already seen
+        is dropped before anything is sent and generated again.
+        """
+        quiz_generator = QuizGenerator()
+        try:
+            for _ in range(tries):
+                question_data = {}
+                fields = quiz_generator.astream_question(
+                    subject=quiz.topic.subject.name,
+                    topic=quiz.topic.name,
+                    difficulty=quiz.difficulty,
+                    class_level=quiz.class_level,
+                    exclude_questions=seen_texts
+                )
+                async for field, value in fields:
+                    if field == 'question' and seen_index.is_duplicate(value):
+                        await fields.aclose()
+                        break
+                    question_data[field] = value
+                    yield field, {field: value}
+                else:
+                    await sync_to_async(cls._record_request)(quiz, 'generated')
+                    yield 'done', {**question_data, 'source': 'generated'}
+                    return
+            raise Exception(f'Could not generate a question that differs from the previous questions after {tries} attempts')
+        except Exception as e:
+            yield 'error', {'error': str(e)}
+
+    @staticmethod
+    async def _generate_unseen_question(quiz, seen_texts, seen_index, tries=3):
+        """
+        Generate a question live, regenerating it while it is a near-duplicate
+        of one the student has already seen.
+        """
+        quiz_generator = QuizGenerator()
+        for _ in range(tries):
+            question_data = await quiz_generator.agenerate_question(
+                subject=quiz.topic.subject.name,
+                topic=quiz.topic.name,
+                difficulty=quiz.difficulty,
+                class_level=quiz.class_level,
+                exclude_questions=seen_texts
+            )
+            if not seen_index.is_duplicate(question_data['question']):
+                return question_data
+        raise Exception(f'Could not generate a question that differs from the previous questions after {tries} attempts')
+
 class QuestionViewSet(viewsets.ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
+    pagination_class = QuestionKeysetPagination
+    renderer_classes = STREAMING_RENDERER_CLASSES
     
     def get_queryset(self):
-        return Question.objects.filter(
-            models.Q(expires_at__isnull=True) | 
-            models.Q(expires_at__gt=timezone.now())
-        )
+        # Questions no longer expire (the expires_at column was dropped)
+        return Question.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Keyset paginated questions, or every question streamed as NDJSON
+        with ``Accept: application/x-ndjson`` or ``?stream=1``
+        """
+        if wants_stream(request):
+            queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+            return stream_ndjson(request, queryset, fast_serializers.question_serializer)
+        return super().list(request, *args, **kwargs)
     
     @action(detail=False, methods=['post'])
+    @idempotent
     def generate_for_quiz(self, request):
         quiz_id = request.data.get('quiz_id')
         
@@ -648,33 +731,65 @@ class QuestionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        quiz_generator = QuizGenerator()
         try:
-            question_data = quiz_generator.generate_question(
-                subject=quiz.topic.subject.name,
-                topic=quiz.topic.name,
-                difficulty=quiz.difficulty,
-                class_level=quiz.class_level
-            )
-            
-            # Create question
-            question = Question.objects.create(
-                quiz=quiz,
-                question_text=question_data['question'],
-                option_a=question_data['options']['A'],
-                option_b=question_data['options']['B'],
-                option_c=question_data['options']['C'],
-                option_d=question_data['options']['D'],
-                correct_answer=question_data['correct_answer'],
-                explanation=question_data['explanation'],
-                is_ai_generated=True
-            )
-            
-            serializer = self.get_serializer(question)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            job = enqueue_generation(quiz, 1, kind='single_question', requested_by=request.user)
+            return job_accepted_response(request, job)
             
         except Exception as e:
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+class GenerationJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status, progress and partial results of question generation jobs
+    """
+    serializer_class = GenerationJobSerializer
+
+    def get_queryset(self):
+        queryset = GenerationJob.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(requested_by=self.request.user)
+        return queryset
+
+class SearchViewSet(viewsets.ViewSet):
+    """
+    Ranked full-text search over quiz titles, descriptions and question text.
+
+    Query Parameters:
+    - q: Search words, each matched as a word prefix
+    - type: Only return quizzes or questions (quiz, question)
+    - limit: Number of results (default 20, at most QUIZ_SEARCH_MAX_RESULTS)
+    """
+
+    def list(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'The q parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        kind = request.query_params.get('type') or None
+        if kind not in (None, 'quiz', 'question'):
+            return Response(
+                {'error': 'type must be quiz or question'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            return Response(
+                {'error': 'limit must be a valid number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, getattr(settings, 'QUIZ_SEARCH_MAX_RESULTS', 100)))
+
+        results = search(query, kind=kind, limit=limit)
+        return Response({
+            'query': query,
+            'count': len(results),
+            'results': results
+        })